@@ -0,0 +1,110 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Dict, List, Optional
+from pathlib import Path
+import os
+import tempfile
+
+from app.core.profiling import profile_store, valid_token
+from app.core.security import valid_admin_token
+from app.core.serialization import FastJSONResponse, dumps
+from app.db.bulk import BULK_DATASETS_BY_FILENAME, BulkImportError, import_datasets, iter_dataset, iter_json_array_bytes
+from app.db.mirror import mirror
+from app.db.session import engine
+from app.services.cv_extraction import UPLOAD_CHUNK_SIZE
+
+router = APIRouter()
+
+def _require_database():
+    if engine is None:
+        raise HTTPException(status_code=503, detail="No database configured, set DATABASE_URL")
+
+def _require_admin_token(token: Optional[str]):
+    if not valid_admin_token(token):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token header is required")
+
+def _require_profiling_token(token: Optional[str]):
+    if not valid_token(token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token header is required")
+
+@router.post("/import")
+async def import_data(files: List[UploadFile] = File(...), x_admin_token: Optional[str] = Header(None)):
+    """
+    Bulk import fake_data-style JSON files into the database, each file named after its
+    dataset (users.json, jobs.json...). Uploads are copied to disk in chunks and streamed
+    into batched inserts. For very large migrations prefer `python -m app.db.bulk import`.
+    Invalid records are skipped and counted by reason. When a file is malformed or the database
+    rejects a batch, the import stops with 422 or 409 and the report of what was written.
+    """
+    _require_admin_token(x_admin_token)
+    _require_database()
+    unknown = [file.filename for file in files if file.filename not in BULK_DATASETS_BY_FILENAME]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown datasets: {', '.join(map(str, unknown))}")
+
+    paths: Dict[str, Path] = {}
+    try:
+        for file in files:
+            fd, path = tempfile.mkstemp(suffix=f"-{file.filename}")
+            paths[file.filename] = Path(path)
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            await file.close()
+
+        try:
+            report = await import_datasets(engine, paths)
+        except BulkImportError as e:
+            # The batches written before the failure are kept, report them
+            return FastJSONResponse(status_code=e.status_code, content={"detail": e.detail, "datasets": e.report})
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        # What was written, if anything, is reloaded by the next request of this worker
+        mirror.invalidate()
+        for path in paths.values():
+            os.unlink(path)
+    return {"datasets": report}
+
+@router.get("/export/{dataset}")
+async def export_data(
+    dataset: str,
+    export_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Stream every row of a dataset (e.g. users.json) as fake_data-style records, read in batches.
+    Password hashes are left out, `python -m app.db.bulk export --include-password-hashes` has them.
+    """
+    _require_admin_token(x_admin_token)
+    _require_database()
+    if dataset not in BULK_DATASETS_BY_FILENAME:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset {dataset}")
+
+    records = iter_dataset(engine, dataset)
+    if export_format == "ndjson":
+        async def ndjson_lines():
+            async for record in records:
+                yield dumps(record) + b"\n"
+
+        name = dataset[:-len(".json")] + ".ndjson"
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers={"Content-Disposition": f'attachment; filename="{name}"'})
+    return StreamingResponse(iter_json_array_bytes(records), media_type="application/json", headers={"Content-Disposition": f'attachment; filename="{dataset}"'})
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """List the stored profiling reports, newest first"""
+    _require_profiling_token(x_profile_token)
+    return {"profiles": profile_store.list()}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """Download a profiling report, as collapsed stacks for speedscope or flamegraph.pl"""
+    _require_profiling_token(x_profile_token)
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=f"profile-{profile_id}.txt")
@@ -1,122 +1,415 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Body
-from typing import List, Optional, Dict, Any
-import json
-from pathlib import Path
-import os
-from datetime import datetime
-
-router = APIRouter()
-
-# Helper function to load data
-def load_data(filename):
-    try:
-        file_path = Path(f"fake_data/{filename}")
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {filename}: {e}")
-        return []
-
-# Initialize AI service with data
-from app.services.ai_service import AIService
-ai_service = AIService()
-
-@router.post("/analyze-cv")
-async def analyze_cv(
-    cv_text: str = Body(...),
-):
-    """Analyze CV text and extract structured information"""
-    try:
-        # Use OpenAI if available, otherwise use rule-based approach
-        analysis = ai_service.analyze_cv_with_openai(cv_text)
-        return analysis
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing CV: {str(e)}")
-
-@router.post("/match-jobs")
-async def match_jobs(
-    cv_analysis: Dict[str, Any] = Body(...),
-    job_id: Optional[int] = None
-):
-    """Match CV against jobs"""
-    try:
-        matches = ai_service.match_jobs_with_openai(cv_analysis, job_id)
-        return matches
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error matching jobs: {str(e)}")
-
-@router.post("/generate-email")
-async def generate_email(
-    template_id: str = Body(...),
-    context: Dict[str, Any] = Body(...)
-):
-    """Generate a personalized email based on template and context"""
-    try:
-        result = ai_service.generate_email_with_openai(template_id, context)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating email: {str(e)}")
-
-@router.get("/email-templates")
-async def get_email_templates():
-    """Get available email templates"""
-    templates = load_data("email_templates.json")
-    
-    # Format for frontend
-    formatted_templates = [
-        {
-            "id": template["id"],
-            "name": template["id"].replace("_", " ").title(),
-            "subject": template["subject"],
-            "description": f"Template for {template['id'].replace('_', ' ')}",
-            "placeholders": extract_placeholders(template["template"])
-        }
-        for template in templates
-    ]
-    
-    return formatted_templates
-
-@router.get("/candidates/{candidate_id}/email-context")
-async def get_candidate_email_context(candidate_id: str):
-    """Get candidate data for email context"""
-    # Load data
-    candidates = load_data("candidate_profiles.json")
-    users = load_data("users.json")
-    skills_data = load_data("skills.json")
-    
-    # Find candidate
-    candidate = next((c for c in candidates if str(c["id"]) == candidate_id), None)
-    if not candidate:
-        raise HTTPException(status_code=404, detail="Candidate not found")
-    
-    # Find user
-    user = next((u for u in users if u["id"] == candidate["user_id"]), None)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Create skill lookup
-    skill_lookup = {skill["id"]: skill["name"] for skill in skills_data}
-    skill_names = [skill_lookup.get(skill_id, f"Skill-{skill_id}") for skill_id in candidate.get("skill_ids", [])]
-    
-    # Create context
-    context = {
-        "candidate_id": str(candidate["id"]),
-        "candidate_name": f"{user['first_name']} {user['last_name']}",
-        "first_name": user["first_name"],
-        "last_name": user["last_name"],
-        "email": user["email"],
-        "job_title": candidate.get("experience", [{}])[0].get("title", "the position") if candidate.get("experience") else "the position",
-        "company_name": "Our Company",
-        "skills": skill_names,
-        "matching_skills": skill_names,
-        "consultant_name": "Recruitment Consultant",
-        "cv_analysis": "Professional with experience in " + ", ".join(skill_names)
-    }
-    
-    return context
-
-# Helper function to extract placeholders from template
-def extract_placeholders(template: str) -> List[str]:
-    import re
-    pattern = r"{{([^}]+)}}"
-    return list(set(re.findall(pattern, template)))
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Iterable
+import asyncio
+import os
+from datetime import datetime
+
+from app.api.v1.deps import lookup_records, require_mirror
+from app.core.config import settings
+from app.core.metrics import ai_fallbacks
+from app.core.serialization import dumps
+from app.services.cv_extraction import MULTIPART_OVERHEAD, CVExtractionError, extract_cv_text, receive_cv_upload
+from app.services.process_pool import run_in_process
+from app.services.task_queue import FINAL_STATES, TaskQueueFull, task_queue
+
+router = APIRouter()
+
+# Initialize AI service with data
+from app.services.ai_service import AIService, analyze_cv_in_worker
+ai_service = AIService()
+
+@router.post("/analyze-cv")
+async def analyze_cv(
+    cv_text: str = Body(...),
+):
+    """Analyze CV text and extract structured information"""
+    try:
+        # Use OpenAI if available, otherwise use rule-based approach
+        analysis = await ai_service.analyze_cv_with_openai_async(cv_text)
+        return analysis
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing CV: {str(e)}")
+
+@router.post(
+    "/analyze-cv/upload",
+    # The body is parsed by the endpoint, documented here as the form it expects
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}},
+    }}}}},
+)
+async def analyze_cv_upload(request: Request):
+    """
+    Analyze an uploaded CV (PDF, DOCX or TXT), sent as the `file` field of a form. The upload
+    is written to a temporary file while it is received, up to CV_UPLOAD_MAX_BYTES, and its
+    text extracted in a worker process, off the event loop.
+    """
+    # Reject oversized uploads before reading them when the client announces their size
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.CV_UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"A CV file may be at most {settings.CV_UPLOAD_MAX_BYTES} bytes")
+
+    try:
+        filename, cv_format, path = await receive_cv_upload(
+            request.headers.get("content-type", ""), request.stream(), settings.CV_UPLOAD_MAX_BYTES
+        )
+    except CVExtractionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    try:
+        cv_text = await run_in_process(extract_cv_text, path, cv_format, settings.CV_UPLOAD_MAX_PAGES)
+    except CVExtractionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        os.unlink(path)
+
+    if not cv_text:
+        raise HTTPException(status_code=422, detail="No text could be extracted from the file")
+
+    try:
+        analysis = await ai_service.analyze_cv_async(cv_text)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing CV: {str(e)}")
+    return {"filename": filename, "text": cv_text, "analysis": analysis}
+
+@router.post("/analyze-cv/batch")
+async def analyze_cv_batch(
+    cvs: List[Dict[str, Any]] = Body(...),
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$")
+):
+    """
+    Analyze many CVs ({"id": optional reference, "cv_text": ...}) concurrently.
+    Each result is streamed back as soon as it is ready, as NDJSON or server-sent events.
+    """
+    if len(cvs) > settings.CV_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch accepts at most {settings.CV_BATCH_MAX_ITEMS} CVs")
+
+    async def analyze(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"index": index, "id": item.get("id")}
+        cv_text = item.get("cv_text")
+        if not isinstance(cv_text, str) or not cv_text.strip():
+            return {**result, "error": "cv_text is required"}
+        try:
+            return {**result, "analysis": await ai_service.analyze_cv_async(cv_text)}
+        except Exception as e:
+            return {**result, "error": f"Error analyzing CV: {str(e)}"}
+
+    results = run_bounded(cvs, analyze, settings.CV_BATCH_CONCURRENCY)
+    return stream_results(results, stream_format)
+
+@router.get("/analyze-cv/cache-stats")
+async def get_cv_analysis_cache_stats():
+    """Hit/miss counters of the CV analysis cache"""
+    return ai_service.cv_cache.stats()
+
+@router.post("/match-jobs", dependencies=[Depends(require_mirror)])
+async def match_jobs(
+    cv_analysis: Dict[str, Any] = Body(...),
+    job_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Match CV against jobs, optionally returning only the `limit` best matches"""
+    try:
+        matches = await ai_service.match_jobs_with_openai_async(cv_analysis, job_id, top_k=limit)
+        return matches
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error matching jobs: {str(e)}")
+
+@router.post("/match-jobs/semantic", dependencies=[Depends(require_mirror)])
+async def match_jobs_semantic(
+    cv_analysis: Dict[str, Any] = Body(...),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Match CV against jobs with the offline embedding index, no LLM call involved"""
+    try:
+        # The index may need (re)building when jobs changed, keep that off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, ai_service.match_jobs_semantic, cv_analysis, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error matching jobs: {str(e)}")
+
+@router.post("/generate-email")
+async def generate_email(
+    template_id: str = Body(...),
+    context: Dict[str, Any] = Body(...)
+):
+    """Generate a personalized email based on template and context"""
+    try:
+        result = await ai_service.generate_email_with_openai_async(template_id, context)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating email: {str(e)}")
+
+@router.post("/tasks", status_code=202)
+async def submit_task(
+    kind: str = Body(...),
+    payload: Dict[str, Any] = Body(...),
+    priority: int = Body(0, ge=-10, le=10)
+):
+    """
+    Run an AI operation (analyze-cv, match-jobs or generate-email, with the body of the
+    matching endpoint as payload) in the background. Returns the task to poll right away.
+    """
+    if kind == "match-jobs":
+        # Matches against every job, in memory
+        require_mirror()
+    try:
+        return task_queue.submit(kind, payload, priority).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/tasks/stats")
+async def get_task_stats():
+    """Number of background tasks by status"""
+    return task_queue.stats()
+
+@router.get("/tasks/{task_id}")
+async def get_task(task_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Status and result of a background task, waiting up to `wait` seconds for it to finish"""
+    task = task_queue.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if wait:
+        await task_queue.wait(task, wait)
+    return task.to_dict()
+
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """Server-sent events with the task on every status change, until it is finished"""
+    task = task_queue.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def events():
+        while True:
+            changed = task.changed
+            yield b"event: status\ndata: " + dumps(task.to_dict()) + b"\n\n"
+            if task.status in FINAL_STATES:
+                break
+            await changed.wait()
+        yield b"event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.delete("/tasks/{task_id}")
+async def cancel_task(task_id: str):
+    """Cancel a queued or running background task"""
+    task = task_queue.cancel(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task.to_dict()
+
+@router.get("/email-templates")
+async def get_email_templates():
+    """Get available email templates"""
+    templates = ai_service.email_templates.values()
+    
+    # Format for frontend
+    formatted_templates = [
+        {
+            "id": template.id,
+            "name": template.id.replace("_", " ").title(),
+            "subject": template.subject.source,
+            "description": f"Template for {template.id.replace('_', ' ')}",
+            "placeholders": template.body.placeholders
+        }
+        for template in templates
+    ]
+    
+    return formatted_templates
+
+@router.get("/candidates/{candidate_id}/email-context")
+async def get_candidate_email_context(candidate_id: str):
+    """Get candidate data for email context"""
+    # Find candidate
+    candidate = (await lookup_records("candidate_profiles.json", [candidate_id])).get(candidate_id)
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    
+    # Find user
+    user = (await lookup_records("users.json", [candidate["user_id"]])).get(str(candidate["user_id"]))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Resolve skill names
+    skills = await _skills_by_id([candidate])
+    return build_email_context(candidate, user, skills)
+
+@router.post("/generate-email/batch")
+async def generate_email_batch(
+    template_id: str = Body(...),
+    candidate_ids: List[str] = Body(...),
+    job_id: Optional[int] = Body(None),
+    context: Dict[str, Any] = Body({}),
+    polish: bool = Body(False),
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$")
+):
+    """
+    Mail-merge a template for many candidates, optionally about one job. `context` holds
+    values shared by every email (e.g. consultant_name). Emails are rendered from the
+    template, or personalized by the LLM when `polish` is set, and streamed back as
+    NDJSON or server-sent events.
+    """
+    if len(candidate_ids) > settings.EMAIL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch accepts at most {settings.EMAIL_BATCH_MAX_ITEMS} candidates")
+
+    template = ai_service.email_templates.get(template_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template with ID {template_id} not found")
+
+    job = employer = None
+    if job_id is not None:
+        job = (await lookup_records("jobs.json", [job_id])).get(str(job_id))
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        employer = (await lookup_records("employer_profiles.json", [job["employer_id"]])).get(str(job["employer_id"]))
+
+    # Resolve every context up front, by id: from the same snapshots, or a few queries per dataset
+    candidates = await lookup_records("candidate_profiles.json", candidate_ids)
+    users = await lookup_records("users.json", [candidate["user_id"] for candidate in candidates.values()])
+    skills = await _skills_by_id(candidates.values())
+
+    def merge_context(index: int, candidate_id: str) -> Dict[str, Any]:
+        result = {"index": index, "candidate_id": candidate_id}
+        candidate = candidates.get(str(candidate_id))
+        if not candidate:
+            return {**result, "error": "Candidate not found"}
+        user = users.get(str(candidate["user_id"]))
+        if not user:
+            return {**result, "error": "User not found"}
+        email_context = build_email_context(candidate, user, skills, job, employer)
+        email_context.update(context)
+        return {**result, "email": user["email"], "context": email_context}
+
+    async def render() -> AsyncIterator[Dict[str, Any]]:
+        for index, candidate_id in enumerate(candidate_ids):
+            merged = merge_context(index, candidate_id)
+            email_context = merged.pop("context", None)
+            if email_context is not None:
+                merged.update(template.render(email_context))
+            yield merged
+
+    async def personalize(index: int, candidate_id: str) -> Dict[str, Any]:
+        merged = merge_context(index, candidate_id)
+        email_context = merged.pop("context", None)
+        if email_context is None:
+            return merged
+        try:
+            return {**merged, **await ai_service.generate_email_with_openai_async(template_id, email_context)}
+        except Exception as e:
+            return {**merged, "error": f"Error generating email: {str(e)}"}
+
+    if polish:
+        results = run_bounded(candidate_ids, personalize, settings.EMAIL_BATCH_CONCURRENCY)
+    else:
+        results = render()
+    return stream_results(results, stream_format)
+
+# Skills of the candidates by id, for build_email_context
+async def _skills_by_id(candidates: Iterable[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    skill_ids = {skill_id for candidate in candidates for skill_id in candidate.get("skill_ids", [])}
+    return {skill["id"]: skill for skill in (await lookup_records("skills.json", skill_ids)).values()}
+
+# Handlers of the background tasks, taking the body of the matching endpoint. They raise
+# on LLM errors for the queue to retry, and fall back to the rule-based results only once
+# the last retry failed
+async def _analyze_cv_task(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await ai_service.analyze_cv_async(payload["cv_text"], fallback=False)
+
+async def _match_jobs_task(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return await ai_service.match_jobs_with_openai_async(payload["cv_analysis"], payload.get("job_id"), top_k=payload.get("limit"), fallback=False)
+
+async def _generate_email_task(payload: Dict[str, Any]) -> Dict[str, str]:
+    return await ai_service.generate_email_with_openai_async(payload["template_id"], payload["context"], fallback=False)
+
+async def _analyze_cv_fallback(payload: Dict[str, Any]) -> Dict[str, Any]:
+    ai_fallbacks.inc("analyze_cv", "error")
+    return await run_in_process(analyze_cv_in_worker, payload["cv_text"])
+
+async def _match_jobs_fallback(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ai_fallbacks.inc("match_jobs", "error")
+    return ai_service.match_jobs(payload["cv_analysis"]["skills"], top_k=payload.get("limit"))
+
+async def _generate_email_fallback(payload: Dict[str, Any]) -> Dict[str, str]:
+    ai_fallbacks.inc("generate_email", "error")
+    return ai_service.generate_email(payload["template_id"], payload["context"])
+
+task_queue.register("analyze-cv", _analyze_cv_task, required=("cv_text",), fallback=_analyze_cv_fallback)
+task_queue.register("match-jobs", _match_jobs_task, required=("cv_analysis",), fallback=_match_jobs_fallback)
+task_queue.register("generate-email", _generate_email_task, required=("template_id", "context"), fallback=_generate_email_fallback)
+
+# Mail-merge context of a candidate, optionally about a job and its employer
+def build_email_context(
+    candidate: Dict[str, Any],
+    user: Dict[str, Any],
+    skills: Dict[Any, Dict[str, Any]],
+    job: Optional[Dict[str, Any]] = None,
+    employer: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    skill_ids = candidate.get("skill_ids", [])
+    skill_names = [skills[skill_id]["name"] if skill_id in skills else f"Skill-{skill_id}" for skill_id in skill_ids]
+    
+    if job:
+        job_title = job["title"]
+        company_name = employer["company_name"] if employer else "Our Company"
+        job_skill_ids = set(job.get("skills", []))
+        matching_skills = [name for skill_id, name in zip(skill_ids, skill_names) if skill_id in job_skill_ids]
+    else:
+        job_title = candidate.get("experience", [{}])[0].get("title", "the position") if candidate.get("experience") else "the position"
+        company_name = "Our Company"
+        matching_skills = skill_names
+    
+    return {
+        "candidate_id": str(candidate["id"]),
+        "candidate_name": f"{user['first_name']} {user['last_name']}",
+        "first_name": user["first_name"],
+        "last_name": user["last_name"],
+        "email": user["email"],
+        "job_title": job_title,
+        "company_name": company_name,
+        "skills": skill_names,
+        "matching_skills": matching_skills,
+        "consultant_name": "Recruitment Consultant",
+        "cv_analysis": "Professional with experience in " + ", ".join(skill_names)
+    }
+
+# Run `worker(index, item)` over the items with at most `concurrency` running at once,
+# yielding results in completion order
+async def run_bounded(
+    items: List[Any],
+    worker: Callable[[int, Any], Awaitable[Dict[str, Any]]],
+    concurrency: int
+) -> AsyncIterator[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: Any) -> Dict[str, Any]:
+        async with semaphore:
+            return await worker(index, item)
+
+    tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # The client went away, don't keep working for nobody
+        for task in tasks:
+            task.cancel()
+
+# Stream results as NDJSON lines or server-sent events
+def stream_results(results: AsyncIterator[Dict[str, Any]], stream_format: str) -> StreamingResponse:
+    async def ndjson():
+        async for result in results:
+            yield dumps(result) + b"\n"
+
+    async def sse():
+        count = 0
+        async for result in results:
+            count += 1
+            yield b"event: result\ndata: " + dumps(result) + b"\n\n"
+        yield b"event: done\ndata: " + dumps({"count": count}) + b"\n\n"
+
+    if stream_format == "sse":
+        return StreamingResponse(sse(), media_type="text/event-stream")
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
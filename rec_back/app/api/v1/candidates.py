@@ -1,116 +1,171 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-import json
-from pathlib import Path
-import os
-from datetime import datetime
-
-router = APIRouter()
-
-# Helper function to load data
-def load_data(filename):
-    try:
-        file_path = Path(f"fake_data/{filename}")
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {filename}: {e}")
-        return []
-
-# Load related data
-def get_all_data():
-    candidates = load_data("candidate_profiles.json")
-    users = load_data("users.json")
-    skills_data = load_data("skills.json")
-    
-    # Create skill lookup
-    skill_lookup = {skill["id"]: skill["name"] for skill in skills_data}
-    
-    # Associate user data with candidate profiles
-    enhanced_candidates = []
-    for candidate in candidates:
-        user = next((u for u in users if u["id"] == candidate["user_id"]), None)
-        if user:
-            # Format for frontend schema
-            enhanced_candidate = {
-                "id": str(candidate["id"]),
-                "firstName": user["first_name"],
-                "lastName": user["last_name"],
-                "email": user["email"],
-                "phone": candidate.get("phone", ""),
-                "position": candidate.get("experience", [{}])[0].get("title", "Unknown Position") if candidate.get("experience") else "Unknown Position",
-                "status": "new",  # Default status
-                "cvUrl": candidate.get("cv_urls", [""])[0] if candidate.get("cv_urls") else None,
-                "createdAt": datetime.fromisoformat(user["created_at"]) if isinstance(user["created_at"], str) else datetime.now(),
-                "updatedAt": datetime.fromisoformat(user["updated_at"]) if isinstance(user["updated_at"], str) else datetime.now(),
-                "tags": [skill_lookup.get(skill_id, f"Skill-{skill_id}") for skill_id in candidate.get("skill_ids", [])],
-                "rating": len(candidate.get("skill_ids", [])) % 5 + 1,  # Mock rating based on skills
-                "assignedTo": f"user-{(candidate['id'] % 3) + 1}",  # Mock assignment
-                "officeId": str((candidate["id"] % 3) + 1)  # Mock office assignment
-            }
-            enhanced_candidates.append(enhanced_candidate)
-    
-    return enhanced_candidates
-
-@router.get("/")
-async def get_candidates(
-    office_id: Optional[str] = None,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
-):
-    """Get all candidates, optionally filtered by office ID"""
-    candidates = get_all_data()
-    
-    # Filter by office if provided
-    if office_id:
-        candidates = [c for c in candidates if c["officeId"] == office_id]
-    
-    # Apply pagination
-    candidates = candidates[skip:skip + limit]
-    
-    return candidates
-
-@router.get("/{candidate_id}")
-async def get_candidate(candidate_id: str):
-    """Get a specific candidate by ID"""
-    candidates = get_all_data()
-    candidate = next((c for c in candidates if c["id"] == candidate_id), None)
-    
-    if not candidate:
-        raise HTTPException(status_code=404, detail="Candidate not found")
-    
-    return candidate
-
-@router.post("/")
-async def create_candidate(candidate: dict):
-    """Create a new candidate (mock implementation)"""
-    # In a real implementation, we would save to the database
-    # For this mock API, we'll just return the candidate with an ID
-    candidate["id"] = f"cand-new-{datetime.now().timestamp()}"
-    return candidate
-
-@router.put("/{candidate_id}")
-async def update_candidate(candidate_id: str, candidate: dict):
-    """Update a candidate (mock implementation)"""
-    candidates = get_all_data()
-    existing = next((c for c in candidates if c["id"] == candidate_id), None)
-    
-    if not existing:
-        raise HTTPException(status_code=404, detail="Candidate not found")
-    
-    # In a real implementation, we would update the database
-    # For this mock API, we'll just return the updated candidate
-    return {**existing, **candidate, "updatedAt": datetime.now()}
-
-@router.delete("/{candidate_id}")
-async def delete_candidate(candidate_id: str):
-    """Delete a candidate (mock implementation)"""
-    candidates = get_all_data()
-    existing = next((c for c in candidates if c["id"] == candidate_id), None)
-    
-    if not existing:
-        raise HTTPException(status_code=404, detail="Candidate not found")
-    
-    # In a real implementation, we would remove from the database
-    # For this mock API, we'll just return success
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+import os
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api.v1.deps import database_only, get_db, require_mirror
+from app.api.v1.listing import export_records, export_response, get_record, get_row, list_page, list_records
+from app.services.column_store import candidate_columns
+from app.services.record_views import candidates_view
+from app.services.search_index import candidate_search
+
+router = APIRouter()
+
+@router.get("/")
+async def get_candidates(
+    request: Request,
+    office_id: Optional[str] = None,
+    status: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Get all candidates, optionally filtered by office ID or status.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    if db is not None:
+        # Filtered on indexed columns, relationships loaded for the whole page at once
+        return await list_records(db, crud.candidate, {"officeId": office_id, "status": status}, skip, limit, cursor, request)
+    # Filter on the indexes and only format the requested page
+    return list_page(candidates_view, {"officeId": office_id, "status": status}, skip, limit, cursor, request)
+
+@router.get("/export")
+async def export_candidates(
+    office_id: Optional[str] = None,
+    status: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Export all candidates, optionally filtered by office ID or status, as NDJSON or CSV"""
+    if database_only():
+        # Read page by page from the table
+        return export_records(crud.candidate, {"officeId": office_id, "status": status}, export_format, "candidates")
+    return export_response(candidates_view, {"officeId": office_id, "status": status}, export_format, "candidates")
+
+@router.get("/search", dependencies=[Depends(require_mirror)])
+async def search_candidates(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search candidates by name, position, skills and past job titles, best matches first.
+    Words also match longer words they start with, and words one typo away when nothing else matches.
+    """
+    total, hits = candidate_search.search(q, limit)
+    return {
+        "total": total,
+        "results": [
+            {"score": score, "highlights": highlights, "candidate": candidates_view.get(key)}
+            for key, score, highlights in hits
+        ]
+    }
+
+@router.get("/query", dependencies=[Depends(require_mirror)])
+async def query_candidates(
+    salary_min: Optional[float] = None,
+    salary_max: Optional[float] = None,
+    experience_min: Optional[float] = None,
+    experience_max: Optional[float] = None,
+    skills: Optional[List[str]] = Query(None),
+    any_skills: Optional[List[str]] = Query(None),
+    contract_types: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    desired_locations: Optional[List[str]] = Query(None),
+    sectors: Optional[List[str]] = Query(None),
+    willing_to_relocate: Optional[bool] = None,
+    office_id: Optional[str] = None,
+    sort: Optional[str] = Query(None, pattern="^-?(salary|experience)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100)
+):
+    """Find candidates matching every given criterion: expected salary and years of experience ranges,
+    all of `skills`, any of `any_skills`, `contract_types`, `desired_locations` and `sectors`, and a current
+    city in `location`. List criteria are repeated parameters (`?skills=Python&skills=React`).
+    Sorted by ID, or by `sort` (salary or experience, `-` for descending).
+    """
+    conditions = []
+    if salary_min is not None or salary_max is not None:
+        conditions.append(("salary", "between", (salary_min, salary_max)))
+    if experience_min is not None or experience_max is not None:
+        conditions.append(("experience", "between", (experience_min, experience_max)))
+    for column, operator, values in (
+        ("skills", "all", skills),
+        ("skills", "any", any_skills),
+        ("contract_types", "any", contract_types),
+        # Current locations are compared by city, "Paris, France" as Paris
+        ("location", "in", [value.split(",")[0] for value in location or ()]),
+        ("desired_locations", "any", desired_locations),
+        ("sectors", "any", sectors),
+    ):
+        if values:
+            conditions.append((column, operator, values))
+    if willing_to_relocate is not None:
+        conditions.append(("relocate", "eq", willing_to_relocate))
+    if office_id:
+        conditions.append(("office", "in", [office_id]))
+
+    total, keys = candidate_columns.query(conditions, sort, skip, limit)
+    return {"total": total, "candidates": [candidates_view.get(key) for key in keys]}
+
+@router.get("/{candidate_id}")
+async def get_candidate(candidate_id: str, request: Request, db: Optional[AsyncSession] = Depends(get_db)):
+    """Get a specific candidate by ID"""
+    if db is not None:
+        return await get_record(db, crud.candidate, candidate_id, request, "Candidate not found")
+    # Answered with 304 Not Modified while the client's ETag is current
+    return get_row(candidates_view, candidate_id, request, "Candidate not found")
+
+@router.post("/")
+async def create_candidate(candidate: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Create a new candidate (mock implementation without a database)"""
+    if db is not None:
+        try:
+            created = await crud.candidate.create(db, candidate)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return crud.candidate.to_row(created)
+
+    # For this mock API, we'll just return the candidate with an ID
+    candidate["id"] = f"cand-new-{datetime.now().timestamp()}"
+    return candidate
+
+@router.put("/{candidate_id}")
+async def update_candidate(candidate_id: str, candidate: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Update a candidate (mock implementation without a database)"""
+    if db is not None:
+        record = await crud.candidate.get(db, candidate_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Candidate not found")
+        try:
+            updated = await crud.candidate.update(db, record, candidate)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return crud.candidate.to_row(updated)
+
+    existing = candidates_view.get(candidate_id)
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    
+    # For this mock API, we'll just return the updated candidate
+    return {**existing, **candidate, "updatedAt": datetime.now()}
+
+@router.delete("/{candidate_id}")
+async def delete_candidate(candidate_id: str, db: Optional[AsyncSession] = Depends(get_db)):
+    """Delete a candidate (mock implementation without a database)"""
+    if db is not None:
+        record = await crud.candidate.get(db, candidate_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Candidate not found")
+        await crud.candidate.remove(db, record)
+        return {"success": True, "message": f"Candidate {candidate_id} deleted"}
+
+    existing = candidates_view.get(candidate_id)
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    
+    # For this mock API, we'll just return success
     return {"success": True, "message": f"Candidate {candidate_id} deleted"}
\ No newline at end of file
@@ -1,128 +1,103 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-import json
-from pathlib import Path
-import os
-from datetime import datetime
-
-router = APIRouter()
-
-# Helper function to load data
-def load_data(filename):
-    try:
-        file_path = Path(f"fake_data/{filename}")
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {filename}: {e}")
-        return []
-
-# Load related data
-def get_all_data():
-    companies = load_data("company_profiles.json")
-    users = load_data("users.json")
-    jobs = load_data("jobs.json")
-    
-    # Create a dictionary of jobs for quick lookup
-    job_lookup = {job["id"]: job for job in jobs}
-    
-    # Create a dictionary of users for quick lookup
-    user_lookup = {user["id"]: user for user in users}
-    
-    # Associate user and job data with company profiles
-    enhanced_companies = []
-    for company in companies:
-        employer_user_id = company.get("user_id")
-        user = user_lookup.get(employer_user_id)
-        
-        if user:
-            # Calculate open positions
-            open_positions = 0
-            job_ids = company.get("job_ids", [])
-            for job_id in job_ids:
-                job = job_lookup.get(job_id)
-                if job and job.get("status", "") == "open":
-                    open_positions += 1
-            
-            # Format for frontend schema
-            enhanced_company = {
-                "id": f"comp-{company['id']}",
-                "name": company["company_name"],
-                "industry": company["industry"],
-                "website": company.get("website", ""),
-                "contactPerson": company["contact_details"]["name"],
-                "contactEmail": company["contact_details"]["email"],
-                "contactPhone": company["contact_details"].get("phone", ""),
-                "address": company.get("location", ""),
-                "notes": company.get("description", ""),
-                "createdAt": datetime.fromisoformat(user["created_at"]) if isinstance(user["created_at"], str) else datetime.now(),
-                "updatedAt": datetime.fromisoformat(user["updated_at"]) if isinstance(user["updated_at"], str) else datetime.now(),
-                "openPositions": open_positions,
-                "officeId": str((company["id"] % 3) + 1)  # Mock office assignment
-            }
-            enhanced_companies.append(enhanced_company)
-    
-    return enhanced_companies
-
-@router.get("/")
-async def get_companies(
-    office_id: Optional[str] = None,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
-):
-    """Get all companies, optionally filtered by office ID"""
-    companies = get_all_data()
-    
-    # Filter by office if provided
-    if office_id:
-        companies = [c for c in companies if c["officeId"] == office_id]
-    
-    # Apply pagination
-    companies = companies[skip:skip + limit]
-    
-    return companies
-
-@router.get("/{company_id}")
-async def get_company(company_id: str):
-    """Get a specific company by ID"""
-    companies = get_all_data()
-    company = next((c for c in companies if c["id"] == company_id), None)
-    
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    
-    return company
-
-@router.post("/")
-async def create_company(company: dict):
-    """Create a new company (mock implementation)"""
-    # In a real implementation, we would save to the database
-    # For this mock API, we'll just return the company with an ID
-    company["id"] = f"comp-new-{datetime.now().timestamp()}"
-    return company
-
-@router.put("/{company_id}")
-async def update_company(company_id: str, company: dict):
-    """Update a company (mock implementation)"""
-    companies = get_all_data()
-    existing = next((c for c in companies if c["id"] == company_id), None)
-    
-    if not existing:
-        raise HTTPException(status_code=404, detail="Company not found")
-    
-    # In a real implementation, we would update the database
-    # For this mock API, we'll just return the updated company
-    return {**existing, **company, "updatedAt": datetime.now()}
-
-@router.delete("/{company_id}")
-async def delete_company(company_id: str):
-    """Delete a company (mock implementation)"""
-    companies = get_all_data()
-    existing = next((c for c in companies if c["id"] == company_id), None)
-    
-    if not existing:
-        raise HTTPException(status_code=404, detail="Company not found")
-    
-    # In a real implementation, we would remove from the database
-    # For this mock API, we'll just return success
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+import os
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api.v1.deps import database_only, get_db
+from app.api.v1.listing import export_records, export_response, get_record, get_row, list_page, list_records
+from app.services.record_views import companies_view
+
+router = APIRouter()
+
+@router.get("/")
+async def get_companies(
+    request: Request,
+    office_id: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Get all companies, optionally filtered by office ID.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    if db is not None:
+        # Filtered on indexed columns, relationships loaded for the whole page at once
+        return await list_records(db, crud.company, {"officeId": office_id}, skip, limit, cursor, request)
+    # Filter on the indexes and only format the requested page
+    return list_page(companies_view, {"officeId": office_id}, skip, limit, cursor, request)
+
+@router.get("/export")
+async def export_companies(
+    office_id: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Export all companies, optionally filtered by office ID, as NDJSON or CSV"""
+    if database_only():
+        # Read page by page from the table
+        return export_records(crud.company, {"officeId": office_id}, export_format, "companies")
+    return export_response(companies_view, {"officeId": office_id}, export_format, "companies")
+
+@router.get("/{company_id}")
+async def get_company(company_id: str, request: Request, db: Optional[AsyncSession] = Depends(get_db)):
+    """Get a specific company by ID"""
+    if db is not None:
+        return await get_record(db, crud.company, company_id, request, "Company not found")
+    # Answered with 304 Not Modified while the client's ETag is current
+    return get_row(companies_view, company_id, request, "Company not found")
+
+@router.post("/")
+async def create_company(company: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Create a new company (mock implementation without a database)"""
+    if db is not None:
+        try:
+            created = await crud.company.create(db, company)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return crud.company.to_row(created)
+
+    # For this mock API, we'll just return the company with an ID
+    company["id"] = f"comp-new-{datetime.now().timestamp()}"
+    return company
+
+@router.put("/{company_id}")
+async def update_company(company_id: str, company: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Update a company (mock implementation without a database)"""
+    if db is not None:
+        record = await crud.company.get(db, company_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Company not found")
+        try:
+            updated = await crud.company.update(db, record, company)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return crud.company.to_row(updated)
+
+    existing = companies_view.get(company_id)
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    # For this mock API, we'll just return the updated company
+    return {**existing, **company, "updatedAt": datetime.now()}
+
+@router.delete("/{company_id}")
+async def delete_company(company_id: str, db: Optional[AsyncSession] = Depends(get_db)):
+    """Delete a company (mock implementation without a database)"""
+    if db is not None:
+        record = await crud.company.get(db, company_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Company not found")
+        await crud.company.remove(db, record)
+        return {"success": True, "message": f"Company {company_id} deleted"}
+
+    existing = companies_view.get(company_id)
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    # For this mock API, we'll just return success
     return {"success": True, "message": f"Company {company_id} deleted"}
\ No newline at end of file
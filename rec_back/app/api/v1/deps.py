@@ -0,0 +1,51 @@
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.bulk import fetch_records
+from app.db.mirror import mirror
+from app.db.session import SessionLocal, engine
+from app.services.data_store import data_store
+
+
+async def get_db() -> AsyncIterator[Optional[AsyncSession]]:
+    """Database session of the request, None when the API serves the fake_data JSON files"""
+    if SessionLocal is None:
+        yield None
+        return
+    async with SessionLocal() as session:
+        yield session
+
+
+def database_only() -> bool:
+    """Whether a database is configured without its in-memory copy (DB_MIRROR), the datasets are then read from the tables"""
+    return engine is not None and not settings.DB_MIRROR
+
+
+def require_mirror():
+    """Refuse the endpoints served from the in-memory datasets only, e.g. search, in database mode without DB_MIRROR"""
+    if database_only():
+        raise HTTPException(status_code=503, detail="Not available in database mode unless DB_MIRROR is set")
+
+
+async def sync_data():
+    """
+    Reload the records written to the database since the last catch-up (throttled, see
+    app.db.mirror), into the datasets the views, indexes and facet counters are built from.
+    Nothing to do without a database or with DB_MIRROR off.
+    """
+    if engine is not None:
+        await mirror.catch_up(engine)
+
+
+async def lookup_records(filename: str, ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Records of a dataset with the given ids, by the string form of their id, from the tables in database mode without DB_MIRROR"""
+    keys = {str(record_id) for record_id in ids}
+    if not database_only():
+        index = data_store.dataset(filename).snapshot().unique("id")
+        return {key: index[key] for key in keys if key in index}
+    # Looked up on the primary key, ids that are not integers match nothing
+    record_ids = [int(key) for key in keys if key.isdigit()]
+    return {str(record["id"]): record for record in await fetch_records(engine, filename, record_ids)}
@@ -1,123 +1,125 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-import json
-from pathlib import Path
-import os
-from datetime import datetime
-
-router = APIRouter()
-
-# Helper function to load data
-def load_data(filename):
-    try:
-        file_path = Path(f"fake_data/{filename}")
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {filename}: {e}")
-        return []
-
-# Load related data
-def get_all_data():
-    jobs_data = load_data("jobs.json")
-    skills_data = load_data("skills.json")
-    employers_data = load_data("employer_profiles.json")
-    
-    # Create skill lookup
-    skill_lookup = {skill["id"]: skill["name"] for skill in skills_data}
-    
-    # Create employer lookup
-    employer_lookup = {emp["id"]: emp for emp in employers_data}
-    
-    # Format jobs for frontend schema
-    enhanced_jobs = []
-    for job in jobs_data:
-        employer = employer_lookup.get(job["employer_id"], {})
-        company_name = employer.get("company_name", f"Company {job['employer_id']}")
-        
-        enhanced_job = {
-            "id": str(job["id"]),
-            "title": job["title"],
-            "companyId": str(job["employer_id"]),
-            "companyName": company_name,
-            "description": job["description"],
-            "requirements": job.get("requirements", []),
-            "location": job.get("location", "Remote"),
-            "salaryRange": f"{job.get('salary_range', {}).get('min', 0):,} - {job.get('salary_range', {}).get('max', 0):,}" if job.get("salary_range") else None,
-            "status": job.get("status", "Open").lower(),
-            "createdAt": datetime.strptime(job.get("posting_date", "2024-01-01"), "%Y-%m-%d") if isinstance(job.get("posting_date"), str) else datetime.now(),
-            "updatedAt": datetime.now(),
-            "deadline": datetime.strptime(job.get("deadline", "2024-12-31"), "%Y-%m-%d") if job.get("deadline") and isinstance(job.get("deadline"), str) else None,
-            "officeId": str((job["id"] % 3) + 1),  # Mock office assignment
-            "candidates": job.get("applications_count", len(job.get("applications", [])) if job.get("applications") else job["id"] % 10)  # Mock count
-        }
-        enhanced_jobs.append(enhanced_job)
-    
-    return enhanced_jobs
-
-@router.get("/")
-async def get_jobs(
-    office_id: Optional[str] = None,
-    company_id: Optional[str] = None,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
-):
-    """Get all jobs, optionally filtered by office ID or company ID"""
-    jobs = get_all_data()
-    
-    # Apply filters
-    if office_id:
-        jobs = [j for j in jobs if j["officeId"] == office_id]
-    
-    if company_id:
-        jobs = [j for j in jobs if j["companyId"] == company_id]
-    
-    # Apply pagination
-    jobs = jobs[skip:skip + limit]
-    
-    return jobs
-
-@router.get("/{job_id}")
-async def get_job(job_id: str):
-    """Get a specific job by ID"""
-    jobs = get_all_data()
-    job = next((j for j in jobs if j["id"] == job_id), None)
-    
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    return job
-
-@router.post("/")
-async def create_job(job: dict):
-    """Create a new job (mock implementation)"""
-    # In a real implementation, we would save to the database
-    # For this mock API, we'll just return the job with an ID
-    job["id"] = f"job-new-{datetime.now().timestamp()}"
-    return job
-
-@router.put("/{job_id}")
-async def update_job(job_id: str, job: dict):
-    """Update a job (mock implementation)"""
-    jobs = get_all_data()
-    existing = next((j for j in jobs if j["id"] == job_id), None)
-    
-    if not existing:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    # In a real implementation, we would update the database
-    # For this mock API, we'll just return the updated job
-    return {**existing, **job, "updatedAt": datetime.now()}
-
-@router.delete("/{job_id}")
-async def delete_job(job_id: str):
-    """Delete a job (mock implementation)"""
-    jobs = get_all_data()
-    existing = next((j for j in jobs if j["id"] == job_id), None)
-    
-    if not existing:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    # In a real implementation, we would remove from the database
-    # For this mock API, we'll just return success
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+import os
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api.v1.deps import database_only, get_db, require_mirror
+from app.api.v1.listing import export_records, export_response, get_record, get_row, list_page, list_records
+from app.services.record_views import jobs_view
+from app.services.search_index import job_search
+
+router = APIRouter()
+
+@router.get("/")
+async def get_jobs(
+    request: Request,
+    office_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    status: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Get all jobs, optionally filtered by office ID, company ID or status.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    if db is not None:
+        # Filtered on indexed columns, relationships loaded for the whole page at once
+        return await list_records(db, crud.job, {"officeId": office_id, "companyId": company_id, "status": status}, skip, limit, cursor, request)
+    # Filter on the indexes and only format the requested page
+    return list_page(jobs_view, {"officeId": office_id, "companyId": company_id, "status": status}, skip, limit, cursor, request)
+
+@router.get("/export")
+async def export_jobs(
+    office_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    status: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Export all jobs, optionally filtered by office ID, company ID or status, as NDJSON or CSV"""
+    if database_only():
+        # Read page by page from the table
+        return export_records(crud.job, {"officeId": office_id, "companyId": company_id, "status": status}, export_format, "jobs")
+    return export_response(jobs_view, {"officeId": office_id, "companyId": company_id, "status": status}, export_format, "jobs")
+
+@router.get("/search", dependencies=[Depends(require_mirror)])
+async def search_jobs(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search jobs by title, company, location, requirements and description, best matches first.
+    Words also match longer words they start with, and words one typo away when nothing else matches.
+    """
+    total, hits = job_search.search(q, limit)
+    return {
+        "total": total,
+        "results": [
+            {"score": score, "highlights": highlights, "job": jobs_view.get(key)}
+            for key, score, highlights in hits
+        ]
+    }
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, request: Request, db: Optional[AsyncSession] = Depends(get_db)):
+    """Get a specific job by ID"""
+    if db is not None:
+        return await get_record(db, crud.job, job_id, request, "Job not found")
+    # Answered with 304 Not Modified while the client's ETag is current
+    return get_row(jobs_view, job_id, request, "Job not found")
+
+@router.post("/")
+async def create_job(job: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Create a new job (mock implementation without a database)"""
+    if db is not None:
+        try:
+            created = await crud.job.create(db, job)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return crud.job.to_row(created)
+
+    # For this mock API, we'll just return the job with an ID
+    job["id"] = f"job-new-{datetime.now().timestamp()}"
+    return job
+
+@router.put("/{job_id}")
+async def update_job(job_id: str, job: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Update a job (mock implementation without a database)"""
+    if db is not None:
+        record = await crud.job.get(db, job_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        try:
+            updated = await crud.job.update(db, record, job)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return crud.job.to_row(updated)
+
+    existing = jobs_view.get(job_id)
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # For this mock API, we'll just return the updated job
+    return {**existing, **job, "updatedAt": datetime.now()}
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str, db: Optional[AsyncSession] = Depends(get_db)):
+    """Delete a job (mock implementation without a database)"""
+    if db is not None:
+        record = await crud.job.get(db, job_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        await crud.job.remove(db, record)
+        return {"success": True, "message": f"Job {job_id} deleted"}
+
+    existing = jobs_view.get(job_id)
+    
+    if not existing:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # For this mock API, we'll just return success
     return {"success": True, "message": f"Job {job_id} deleted"}
\ No newline at end of file
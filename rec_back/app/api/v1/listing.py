@@ -0,0 +1,324 @@
+import base64
+import csv
+import hashlib
+import io
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.crud.base import CRUDBase
+from app.db.session import SessionLocal
+from app.models import DataChange
+from app.services.data_store import MaterializedView
+
+# Helpers shared by the list endpoints: opaque keyset cursors, cached serialized pages
+# and streaming exports
+
+# Rows fetched from a view per step while streaming an export
+EXPORT_CHUNK_SIZE = 500
+
+# Part of every ETag: bump whenever the rows are formatted differently, so clients refetch
+ROW_FORMAT_VERSION = "2"
+
+# Clients may keep responses but must revalidate them (cheaply, with If-None-Match) before use
+CACHE_CONTROL = "private, no-cache"
+
+
+def encode_cursor(position: int, key: str) -> str:
+    """Opaque cursor holding the sort key (source position) and id of the last row served"""
+    payload = json.dumps({"p": position, "k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _cursor_payload(cursor: str) -> Tuple[int, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(payload["p"]), str(payload["k"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_cursor(view: MaterializedView, cursor: str) -> int:
+    """Source position to resume after"""
+    position, key = _cursor_payload(cursor)
+
+    # Prefer the current position of the last-seen row, so that records added or
+    # removed before it since the previous page don't make us skip or repeat rows
+    current = view.position_of(key)
+    return current if current is not None else position
+
+
+class ResponseCache:
+    """Serialized responses by request, each valid for one version of the data it was built from"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # key -> (version, body, next cursor), most recently used last
+        self._entries: "OrderedDict[Hashable, Tuple[Any, bytes, Optional[str]]]" = OrderedDict()
+
+    def get(self, key: Hashable, version: Any) -> Optional[Tuple[bytes, Optional[str]]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key: Hashable, version: Any, body: bytes, next_cursor: Optional[str] = None):
+        self._entries[key] = (version, body, next_cursor)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def view_etag(view: MaterializedView) -> str:
+    """Strong ETag of every response built from a view, derived from the content of its datasets"""
+    tag = hashlib.blake2b(f"{ROW_FORMAT_VERSION}:{view.source}:{view.digest}".encode(), digest_size=12)
+    return f'"{tag.hexdigest()}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        # If-None-Match compares weakly, W/"x" matches "x"
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _conditional(request: Request, view: MaterializedView) -> Tuple[str, Optional[Response]]:
+    """The view's ETag, and a 304 response when the client already has the current data"""
+    etag = view_etag(view)
+    if _not_modified(request, etag):
+        return etag, Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return etag, None
+
+
+def _json_response(body: bytes, etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, **(headers or {})},
+    )
+
+
+def list_page(
+    view: MaterializedView,
+    filters: Dict[str, Any],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    request: Request,
+) -> Response:
+    """
+    One page of a view as JSON, continuing after `cursor` if given, with the next cursor
+    in X-Next-Cursor. Pages are serialized once and served from cache until the data changes,
+    and answered with 304 Not Modified when the client's If-None-Match is still current.
+    """
+    etag, not_modified = _conditional(request, view)
+    if not_modified is not None:
+        return not_modified
+
+    # Read the version first: a page built from newer data is then only cached as stale
+    version = view.version
+    key = (view, tuple(sorted(filters.items())), skip, limit, cursor)
+    cached = response_cache.get(key, version)
+    if cached is None:
+        after = decode_cursor(view, cursor) if cursor else None
+        rows, last_position = view.page(filters, limit=limit, after=after, skip=skip)
+        # A full page may be followed by more rows
+        next_cursor = encode_cursor(last_position, rows[-1]["id"]) if len(rows) == limit else None
+        cached = (dumps(rows), next_cursor)
+        response_cache.put(key, version, *cached)
+
+    body, next_cursor = cached
+    return _json_response(body, etag, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+def list_all(view: MaterializedView, request: Request) -> Response:
+    """Every row of a view as JSON, served from cache until the data changes"""
+    etag, not_modified = _conditional(request, view)
+    if not_modified is not None:
+        return not_modified
+
+    version = view.version
+    cached = response_cache.get(view, version)
+    if cached is None:
+        cached = (dumps(view.rows()), None)
+        response_cache.put(view, version, *cached)
+    return _json_response(cached[0], etag)
+
+
+def get_row(view: MaterializedView, key: str, request: Request, not_found: str) -> Response:
+    """A single row of a view as JSON, or 404 with the `not_found` message"""
+    etag, not_modified = _conditional(request, view)
+    if not_modified is not None:
+        return not_modified
+
+    row = view.get(key)
+    if not row:
+        raise HTTPException(status_code=404, detail=not_found)
+    return _json_response(dumps(row), etag)
+
+
+async def database_version(db: AsyncSession) -> Tuple[int, int]:
+    """
+    The writes logged in data_changes (see app.db.mirror): any write, to a table or to one its
+    rows are formatted from, changes it. Counted too, for writes committed after a newer one.
+    """
+    count, newest = (await db.execute(select(func.count(DataChange.id), func.max(DataChange.id)))).one()
+    return count, newest or 0
+
+
+def database_etag(crud: CRUDBase, version: Tuple[int, int]) -> str:
+    """Strong ETag of every response built from a database table, at a database_version"""
+    tag = hashlib.blake2b(f"{ROW_FORMAT_VERSION}:{crud.model.__tablename__}:{version}".encode(), digest_size=12)
+    return f'"{tag.hexdigest()}"'
+
+
+async def list_records(
+    db: AsyncSession,
+    crud: CRUDBase,
+    filters: Dict[str, Any],
+    skip: int,
+    limit: Optional[int],
+    cursor: Optional[str],
+    request: Request,
+) -> Response:
+    """One page of a database table as JSON, like list_page, resuming after the primary key in `cursor`"""
+    # Read the version first, as in list_page
+    version = await database_version(db)
+    etag = database_etag(crud, version)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    key = (crud, tuple(sorted(filters.items())), skip, limit, cursor)
+    cached = response_cache.get(key, version)
+    if cached is None:
+        after = _cursor_payload(cursor)[0] if cursor else None
+        records = await crud.get_multi(db, filters, skip=skip, limit=limit, after=after)
+        rows = [crud.to_row(record) for record in records]
+        next_cursor = encode_cursor(records[-1].id, rows[-1]["id"]) if len(rows) == limit else None
+        cached = (dumps(rows), next_cursor)
+        response_cache.put(key, version, *cached)
+
+    body, next_cursor = cached
+    return _json_response(body, etag, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+async def get_record(db: AsyncSession, crud: CRUDBase, key: str, request: Request, not_found: str) -> Response:
+    """A single row of a database table as JSON, or 404 with the `not_found` message"""
+    etag = database_etag(crud, await database_version(db))
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    record = await crud.get(db, key)
+    if record is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return _json_response(dumps(crud.to_row(record)), etag)
+
+
+def iter_rows(view: MaterializedView, filters: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """All matching rows, fetched chunk by chunk so memory stays flat"""
+    after = None
+    while True:
+        rows, after = view.page(filters, limit=EXPORT_CHUNK_SIZE, after=after)
+        yield from rows
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+
+
+async def iter_records(crud: CRUDBase, filters: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """All matching rows of a database table, fetched page by page in primary key order"""
+    after = None
+    while True:
+        # A session per page: the connection is not held while the client reads
+        async with SessionLocal() as db:
+            records = await crud.get_multi(db, filters, limit=EXPORT_CHUNK_SIZE, after=after)
+            rows = [crud.to_row(record) for record in records]
+        for row in rows:
+            yield row
+        if len(records) < EXPORT_CHUNK_SIZE:
+            return
+        after = records[-1].id
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return dumps(value).decode("utf-8")
+    return value
+
+
+def _ndjson_formatter() -> Callable[[Dict[str, Any]], Union[bytes, str]]:
+    return lambda row: dumps(row) + b"\n"
+
+
+def _csv_formatter() -> Callable[[Dict[str, Any]], Union[bytes, str]]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns: List[str] = []
+
+    def line(row: Dict[str, Any]) -> str:
+        if not columns:
+            # Columns come from the first row, every row of a view has the same shape
+            columns.extend(row)
+            writer.writerow(columns)
+        writer.writerow([_csv_value(row.get(column)) for column in columns])
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return text
+
+    return line
+
+
+def _streaming_response(lines: Union[Iterator[Any], AsyncIterator[Any]], export_format: str, name: str) -> StreamingResponse:
+    if export_format == "csv":
+        return StreamingResponse(
+            lines,
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{name}.csv"'},
+        )
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}.ndjson"'},
+    )
+
+
+def export_response(view: MaterializedView, filters: Dict[str, Any], export_format: str, name: str) -> StreamingResponse:
+    """Stream every matching row of a view as NDJSON or CSV, row by row"""
+    line = _csv_formatter() if export_format == "csv" else _ndjson_formatter()
+    return _streaming_response((line(row) for row in iter_rows(view, filters)), export_format, name)
+
+
+def export_records(crud: CRUDBase, filters: Dict[str, Any], export_format: str, name: str) -> StreamingResponse:
+    """Like export_response, from a database table"""
+    line = _csv_formatter() if export_format == "csv" else _ndjson_formatter()
+
+    async def lines() -> AsyncIterator[Union[bytes, str]]:
+        async for row in iter_records(crud, filters):
+            yield line(row)
+
+    return _streaming_response(lines(), export_format, name)
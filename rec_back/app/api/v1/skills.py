@@ -1,48 +1,27 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-import json
-from pathlib import Path
-
-router = APIRouter()
-
-# Helper function to load data
-def load_data(filename):
-    try:
-        file_path = Path(f"fake_data/{filename}")
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {filename}: {e}")
-        return []
-
-@router.get("/")
-async def get_skills():
-    """Get all skills"""
-    skills = load_data("skills.json")
-    
-    # Convert to format expected by frontend
-    formatted_skills = [
-        {
-            "id": str(skill["id"]),
-            "name": skill["name"],
-            "color": f"#{hash(skill['name']) % 0xFFFFFF:06x}"  # Generate consistent colors based on name
-        }
-        for skill in skills
-    ]
-    
-    return formatted_skills
-
-@router.get("/{skill_id}")
-async def get_skill(skill_id: str):
-    """Get a specific skill by ID"""
-    skills = load_data("skills.json")
-    skill = next((s for s in skills if str(s["id"]) == skill_id), None)
-    
-    if not skill:
-        raise HTTPException(status_code=404, detail="Skill not found")
-    
-    return {
-        "id": str(skill["id"]),
-        "name": skill["name"],
-        "color": f"#{hash(skill['name']) % 0xFFFFFF:06x}"  # Generate consistent colors based on name
-    }
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api.v1.deps import get_db
+from app.api.v1.listing import get_record, get_row, list_all, list_records
+from app.services.record_views import skills_view
+
+router = APIRouter()
+
+@router.get("/")
+async def get_skills(request: Request, db: Optional[AsyncSession] = Depends(get_db)):
+    """Get all skills"""
+    if db is not None:
+        return await list_records(db, crud.skill, {}, 0, None, None, request)
+    # Converted to the format expected by frontend by the shared view
+    return list_all(skills_view, request)
+
+@router.get("/{skill_id}")
+async def get_skill(skill_id: str, request: Request, db: Optional[AsyncSession] = Depends(get_db)):
+    """Get a specific skill by ID"""
+    if db is not None:
+        return await get_record(db, crud.skill, skill_id, request, "Skill not found")
+    # Answered with 304 Not Modified while the client's ETag is current
+    return get_row(skills_view, skill_id, request, "Skill not found")
\ No newline at end of file
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api.v1.deps import database_only, get_db
+from app.crud.base import CRUDBase
+from app.services.facets import FacetCounter, candidate_facets, company_facets, job_facets
+
+router = APIRouter()
+
+async def _facets(counter: FacetCounter, model: CRUDBase, filters: Dict[str, Optional[List[str]]], db: Optional[AsyncSession]) -> Dict[str, Any]:
+    try:
+        if database_only():
+            # GROUP BY queries on the indexed columns
+            total, facets = await model.facet_counts(db, filters)
+        else:
+            # Counters kept up to date by the writes, with DB_MIRROR in database mode (see app.db.mirror)
+            total, facets = counter.counts(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"total": total, "facets": facets}
+
+@router.get("/facets/candidates")
+async def candidate_facet_counts(
+    office_id: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Count candidates by status, office and skill, among those in any of the given offices and statuses"""
+    return await _facets(candidate_facets, crud.candidate, {"officeId": office_id, "status": status}, db)
+
+@router.get("/facets/jobs")
+async def job_facet_counts(
+    office_id: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    company_id: Optional[List[str]] = Query(None),
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Count jobs by status, office and company, among those matching the given offices, statuses and companies"""
+    return await _facets(job_facets, crud.job, {"officeId": office_id, "status": status, "companyId": company_id}, db)
+
+@router.get("/facets/companies")
+async def company_facet_counts(
+    office_id: Optional[List[str]] = Query(None),
+    industry: Optional[List[str]] = Query(None),
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Count companies by industry and office, among those in any of the given offices and industries"""
+    return await _facets(company_facets, crud.company, {"officeId": office_id, "industry": industry}, db)
@@ -1,91 +1,70 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-import json
-from pathlib import Path
-from datetime import datetime
-
-router = APIRouter()
-
-# Helper function to load data
-def load_data(filename):
-    try:
-        file_path = Path(f"fake_data/{filename}")
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {filename}: {e}")
-        return []
-
-# Format user data for frontend
-def format_user(user):
-    return {
-        "id": str(user["id"]),
-        "name": f"{user['first_name']} {user['last_name']}",
-        "email": user["email"],
-        "role": map_role(user["role"]),
-        "officeId": str((user["id"] % 3) + 1),  # Mock office assignment
-        "createdAt": datetime.fromisoformat(user["created_at"]) if isinstance(user["created_at"], str) else datetime.now(),
-        "updatedAt": datetime.fromisoformat(user["updated_at"]) if isinstance(user["updated_at"], str) else datetime.now(),
-        "lastLogin": datetime.fromisoformat(user["last_login"]) if isinstance(user.get("last_login", ""), str) else None
-    }
-
-# Map backend role to frontend role
-def map_role(role):
-    role_map = {
-        "superadmin": "super_admin",
-        "admin": "admin",
-        "consultant": "employee",
-        "employer": "employee"
-    }
-    return role_map.get(role, "employee")
-
-@router.get("/")
-async def get_users(
-    office_id: Optional[str] = None,
-    role: Optional[str] = None,
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
-):
-    """Get all users, optionally filtered by office ID or role"""
-    users = load_data("users.json")
-    
-    # Format for frontend
-    formatted_users = [format_user(user) for user in users]
-    
-    # Apply filters
-    if office_id:
-        formatted_users = [u for u in formatted_users if u["officeId"] == office_id]
-    
-    if role:
-        formatted_users = [u for u in formatted_users if u["role"] == role]
-    
-    # Apply pagination
-    formatted_users = formatted_users[skip:skip + limit]
-    
-    return formatted_users
-
-@router.get("/{user_id}")
-async def get_user(user_id: str):
-    """Get a specific user by ID"""
-    users = load_data("users.json")
-    user = next((u for u in users if str(u["id"]) == user_id), None)
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return format_user(user)
-
-@router.post("/login")
-async def login(login_data: dict):
-    """Mock login endpoint"""
-    users = load_data("users.json")
-    
-    user = next((u for u in users if u["email"] == login_data.get("email")), None)
-    
-    if not user or login_data.get("password") != "password":  # Simple mock for demo
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    return {
-        "user": format_user(user),
-        "token": f"mock-token-{user['id']}-{datetime.now().timestamp()}"
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api.v1.deps import database_only, get_db
+from app.api.v1.listing import export_records, export_response, get_record, get_row, list_page, list_records
+from app.services.data_store import data_store
+from app.services.record_views import users_view
+
+router = APIRouter()
+
+@router.get("/")
+async def get_users(
+    request: Request,
+    office_id: Optional[str] = None,
+    role: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Optional[AsyncSession] = Depends(get_db)
+):
+    """Get all users, optionally filtered by office ID or role.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    if db is not None:
+        return await list_records(db, crud.user, {"officeId": office_id, "role": role}, skip, limit, cursor, request)
+    # Filter on the indexes and only format the requested page
+    return list_page(users_view, {"officeId": office_id, "role": role}, skip, limit, cursor, request)
+
+@router.get("/export")
+async def export_users(
+    office_id: Optional[str] = None,
+    role: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+):
+    """Export all users, optionally filtered by office ID or role, as NDJSON or CSV"""
+    if database_only():
+        # Read page by page from the table
+        return export_records(crud.user, {"officeId": office_id, "role": role}, export_format, "users")
+    return export_response(users_view, {"officeId": office_id, "role": role}, export_format, "users")
+
+@router.get("/{user_id}")
+async def get_user(user_id: str, request: Request, db: Optional[AsyncSession] = Depends(get_db)):
+    """Get a specific user by ID"""
+    if db is not None:
+        return await get_record(db, crud.user, user_id, request, "User not found")
+    # Answered with 304 Not Modified while the client's ETag is current
+    return get_row(users_view, user_id, request, "User not found")
+
+@router.post("/login")
+async def login(login_data: dict, db: Optional[AsyncSession] = Depends(get_db)):
+    """Mock login endpoint"""
+    if db is not None:
+        # Looked up on the indexed email column
+        record = await crud.user.get_by_email(db, login_data.get("email"))
+        user = crud.user.to_row(record) if record is not None else None
+    else:
+        user = data_store.dataset("users.json").get_by("email", login_data.get("email"))
+        user = users_view.get(str(user["id"])) if user else None
+    
+    if not user or login_data.get("password") != "password":  # Simple mock for demo
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    return {
+        "user": user,
+        "token": f"mock-token-{user['id']}-{datetime.now().timestamp()}"
     }
\ No newline at end of file
@@ -0,0 +1,219 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets of API requests and of LLM calls
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+# Route label of requests no route matched, so that scans of random URLs add no series
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[str, ...]
+# Sample = (name suffix, extra labels, value), rendered after the metric name
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A named metric with a fixed set of label names, one time series per label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Tuple[Labels, Sample]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for values, (suffix, extra, value) in self.samples():
+            pairs = [*zip(self.labels, values), *extra.items()]
+            labels = ",".join(f'{name}="{_escape(str(label))}"' for name, label in pairs)
+            lines.append(f"{self.name}{suffix}{{{labels}}} {_format_value(value)}" if labels else f"{self.name}{suffix} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[Labels, Sample]]:
+        with self._lock:
+            values = list(self._values.items())
+        return [(labels, ("", {}, value)) for labels, value in sorted(values)]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Counts of observations per bucket, rendered cumulatively as Prometheus expects"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [count per bucket (the last one for +Inf), sum]
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def samples(self) -> Iterable[Tuple[Labels, Sample]]:
+        with self._lock:
+            values = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+        samples = []
+        for labels, counts, total in sorted(values):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                samples.append((labels, ("_bucket", {"le": _format_value(bound)}, cumulative)))
+            samples.append((labels, ("_sum", {}, total)))
+            samples.append((labels, ("_count", {}, cumulative)))
+        return samples
+
+
+class Registry:
+    """
+    The metrics of the process, rendered in the Prometheus text format. Collectors are
+    called on every scrape, for figures other modules already keep (e.g. cache stats).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = REQUEST_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, collect: Callable[[], Iterable[Metric]]):
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        metrics = list(self._metrics.values())
+        for collect in self._collectors:
+            try:
+                metrics.extend(collect())
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "HTTP requests answered, by route and status code", ("method", "route", "status"))
+http_duration = registry.histogram("http_request_duration_seconds", "Time to answer HTTP requests, until the last body byte", ("method", "route"))
+http_in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being answered", ("method",))
+
+llm_duration = registry.histogram("llm_request_duration_seconds", "Time of LLM chat completions", ("operation", "outcome"), LLM_BUCKETS)
+llm_tokens = registry.counter("llm_tokens_total", "Tokens used by LLM chat completions", ("operation", "type"))
+ai_fallbacks = registry.counter("ai_fallbacks_total", "AI operations answered by the rule-based implementation instead of the LLM", ("operation", "reason"))
+
+
+def route_template(scope) -> str:
+    """Path template of the route that answered a request, set on the scope by the router"""
+    # Routes of included routers are resolved with their prefix into this context by recent
+    # FastAPI versions, older ones copy the routes with the full path
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None)
+    if path is None:
+        route = scope.get("route")
+        path = getattr(route, "path_format", None)
+    return path or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template (/api/v1/jobs/{job_id},
+    not every job id). Written against the raw ASGI interface rather than BaseHTTPMiddleware,
+    so it adds no task or body buffering to requests, only a couple of dict updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        http_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_progress.dec(method)
+            route = route_template(scope)
+            http_requests.inc(method, route, status)
+            http_duration.observe(elapsed, method, route)
+
+
+def record_llm_call(operation: str, started: float, outcome: str, usage=None):
+    """Time of an LLM call started at `started` (perf_counter) and the tokens it used"""
+    llm_duration.observe(time.perf_counter() - started, operation, outcome)
+    if usage is not None:
+        llm_tokens.inc(operation, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        llm_tokens.inc(operation, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
@@ -0,0 +1,266 @@
+import asyncio
+import hmac
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Header carrying the admin token, to profile a request or read the reports
+PROFILE_TOKEN_HEADER = "x-profile-token"
+_TOKEN_HEADER = PROFILE_TOKEN_HEADER.encode()
+# Response header naming the report of a profiled request
+PROFILE_ID_HEADER = "X-Profile-Id"
+# Endpoints reading the reports, never profiled: reading them would add reports of its own
+PROFILES_PATH = "/api/v1/admin/profiles"
+
+# Label of the innermost frame of a task waiting for I/O, a lock or another task
+AWAITING = "[awaiting]"
+
+# Tasks followed from the request's task through what they await, in case of cycles
+_MAX_AWAITED_TASKS = 20
+
+_REPORT_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+
+def new_report_id() -> str:
+    # Creation time first, so that reports sort by age
+    return f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+
+
+def _label(code) -> str:
+    filename = code.co_filename
+    # Paths relative to the app or to site-packages keep the stacks readable
+    for marker in ("/app/", "/site-packages/", "/lib/python"):
+        position = filename.rfind(marker)
+        if position >= 0:
+            filename = filename[position + 1:]
+            break
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+def _awaited_task(future: asyncio.Future) -> Optional["asyncio.Task"]:
+    """The pending task a future completes with, for awaits of tasks, gather() and shield()"""
+    if isinstance(future, asyncio.Task):
+        return None if future.done() else future
+    for child in getattr(future, "_children", ()):
+        # gather(): its first pending child
+        if not child.done():
+            return _awaited_task(child)
+    for callback, _ in getattr(future, "_callbacks", None) or ():
+        # shield(): the outer future's done callback refers to the shielded task
+        for cell in getattr(callback, "__closure__", None) or ():
+            contents = cell.cell_contents
+            if isinstance(contents, asyncio.Task) and not contents.done():
+                return contents
+    return None
+
+
+class TaskSampler:
+    """
+    Sampling profiler of one asyncio task. A background thread looks at the task every
+    `interval` seconds: while it runs, the Python stack of the event loop thread from the
+    task's coroutine down; while it is suspended, the chain of coroutines it is awaiting,
+    so that time spent waiting on e.g. an LLM call shows under the call that waits.
+    Each sample is weighted by the time since the previous one, in microseconds.
+
+    Work handed to other threads or processes shows as the await that waits for it.
+    """
+
+    def __init__(self, task: "asyncio.Task", loop: asyncio.AbstractEventLoop, interval: float):
+        self.task = task
+        self.loop = loop
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Tell the thread to stop sampling, without waiting for it"""
+        self._stop.set()
+
+    def result(self) -> Counter:
+        """The stacks sampled, once the thread has stopped: blocks, so call it off the event loop"""
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            try:
+                stack = self._sample()
+            except Exception:
+                # The task changed under us, e.g. it finished between two reads
+                stack = None
+            if stack:
+                self.stacks[stack] += int((now - last) * 1_000_000)
+                self.samples += 1
+            last = now
+
+    def _sample(self) -> Optional[Tuple[str, ...]]:
+        running = asyncio.current_task(self.loop)
+        stack: List[str] = []
+        task = self.task
+        for _ in range(_MAX_AWAITED_TASKS):
+            coroutine = task.get_coro()
+            if task is running:
+                return self._running_stack(stack, coroutine.cr_frame)
+            # Suspended: follow what each coroutine awaits, into the task it waits for
+            awaitable = coroutine
+            while awaitable is not None:
+                frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+                if frame is None:
+                    break
+                stack.append(_label(frame.f_code))
+                awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+            # The future the task is blocked on, at the end of that chain
+            waiter = getattr(task, "_fut_waiter", None)
+            task = _awaited_task(waiter) if waiter is not None else None
+            if task is None:
+                break
+        if not stack:
+            return None
+        stack.append(AWAITING)
+        return tuple(stack)
+
+    def _running_stack(self, stack: List[str], root) -> Optional[Tuple[str, ...]]:
+        # The event loop thread's frames, from the running task's coroutine down
+        frame = sys._current_frames().get(self.thread_id)
+        running = []
+        while frame is not None:
+            running.append(_label(frame.f_code))
+            if frame is root:
+                return tuple(stack + running[::-1])
+            frame = frame.f_back
+        # Between two steps of the task, not in its code yet
+        return None
+
+
+class ProfileStore:
+    """Profiling reports on disk, only the newest `max_reports` being kept"""
+
+    def __init__(self, directory: Path, max_reports: int):
+        self.directory = directory
+        self.max_reports = max_reports
+
+    def save(self, stacks: Counter, metadata: Dict[str, Any], report_id: Optional[str] = None) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        report_id = report_id or new_report_id()
+        # Collapsed stacks ("frame;frame;frame weight" lines), as read by flamegraph.pl and speedscope
+        collapsed = "".join(f"{';'.join(stack)} {weight}\n" for stack, weight in stacks.most_common())
+        (self.directory / f"{report_id}.txt").write_text(collapsed, encoding="utf-8")
+        (self.directory / f"{report_id}.json").write_text(json.dumps({"id": report_id, **metadata}), encoding="utf-8")
+        self._prune()
+        return report_id
+
+    def _prune(self):
+        reports = sorted(self.directory.glob("*.json"))
+        for path in reports[:max(len(reports) - self.max_reports, 0)]:
+            for stale in (path, path.with_suffix(".txt")):
+                try:
+                    stale.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of the stored reports, newest first"""
+        if not self.directory.exists():
+            return []
+        reports = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                reports.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # Pruned or being written
+        return reports
+
+    def path(self, report_id: str) -> Optional[Path]:
+        """Collapsed stacks file of a report, None for unknown (or malformed) ids"""
+        if not _REPORT_ID.match(report_id):
+            return None
+        path = self.directory / f"{report_id}.txt"
+        return path if path.exists() else None
+
+
+profile_store = ProfileStore(Path(settings.CACHE_DIR) / "profiles", settings.PROFILING_MAX_REPORTS)
+
+
+def valid_token(token: Optional[str]) -> bool:
+    """Whether a request carries the profiling admin token (never when none is configured)"""
+    return bool(settings.PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests that carry the admin token in X-Profile-Token,
+    and a random PROFILING_SAMPLE_RATE share of the others, except those reading the reports.
+    The report of a profiled request is stored in the background and named in the
+    X-Profile-Id response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        report_id = new_report_id()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), report_id.encode())]}
+            await send(message)
+
+        loop = asyncio.get_running_loop()
+        sampler = TaskSampler(asyncio.current_task(), loop, settings.PROFILING_INTERVAL)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            metadata = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "duration": round(time.perf_counter() - started, 6),
+                "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            loop.run_in_executor(None, self._save, report_id, sampler, metadata)
+
+    @staticmethod
+    def _selected(scope) -> bool:
+        if scope["path"] == PROFILES_PATH or scope["path"].startswith(PROFILES_PATH + "/"):
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == _TOKEN_HEADER:
+                return valid_token(value.decode("latin-1"))
+        return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @staticmethod
+    def _save(report_id: str, sampler: TaskSampler, metadata: Dict[str, Any]):
+        # Waits for the sampling thread to finish, in the executor
+        stacks = sampler.result()
+        try:
+            profile_store.save(stacks, {**metadata, "samples": sampler.samples}, report_id)
+        except OSError as e:
+            print(f"Error saving profiling report {report_id}: {str(e)}")
@@ -0,0 +1,9 @@
+import hmac
+from typing import Optional
+
+from app.core.config import settings
+
+
+def valid_admin_token(token: Optional[str]) -> bool:
+    """Whether a request carries the admin token (never when none is configured)"""
+    return bool(settings.ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, settings.ADMIN_TOKEN)
@@ -0,0 +1,5 @@
+from app.crud.application import application
+from app.crud.candidate import candidate
+from app.crud.employer import company, employer
+from app.crud.job import job
+from app.crud.user import skill, user
@@ -0,0 +1,11 @@
+from sqlalchemy.orm import selectinload
+
+from app.crud.base import CRUDBase
+from app.models import Application
+
+
+class CRUDApplication(CRUDBase[Application]):
+    pass
+
+
+application = CRUDApplication(Application, load=[selectinload(Application.candidate), selectinload(Application.job)])
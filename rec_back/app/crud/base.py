@@ -0,0 +1,181 @@
+from datetime import date
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.db.mirror import log_changes, mirror
+from app.models.base import Base
+from app.services.record_views import office_id_for
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """A date sent by the frontend (ISO date or datetime string)"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+
+
+class CRUDBase(Generic[ModelType]):
+    """
+    Database access for one model, in the shape of the frontend rows served by the API.
+
+    `load` are the loader options (selectinload...) of every query, so that the
+    relationships a row is formatted from come with it, in one query per relationship
+    for a whole page rather than one per row. `filters` maps the row fields the list
+    endpoint filters on to a function building the SQL condition for a value.
+
+    `facets` maps the row fields the stats endpoints count rows by to their column, and
+    `multi_facets` those with several values per row to their column and the (table, on
+    clause) joins leading to it from the model, for database mode without DB_MIRROR.
+
+    `dataset` is the fake_data filename of the model's records: every write logs the
+    records it changes (see changed_records) for the in-memory copies to reload them.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        load: Sequence[Any] = (),
+        filters: Optional[Dict[str, Callable[[Any], ColumnElement]]] = None,
+        include: Sequence[ColumnElement] = (),
+        facets: Optional[Dict[str, ColumnElement]] = None,
+        multi_facets: Optional[Dict[str, Tuple[ColumnElement, Sequence[Tuple[Any, ColumnElement]]]]] = None,
+        dataset: Optional[str] = None,
+    ):
+        self.model = model
+        self.dataset = dataset
+        self.load = list(load)
+        self.filters = filters or {}
+        # Conditions rows must meet to be served at all
+        self.include = list(include)
+        self.facets = facets or {}
+        self.multi_facets = multi_facets or {}
+
+    def parse_key(self, key: str) -> Optional[int]:
+        """Primary key of the row with this API id"""
+        try:
+            return int(key)
+        except ValueError:
+            return None
+
+    def to_row(self, obj: ModelType) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def apply(self, db: AsyncSession, obj: ModelType, data: Dict[str, Any]):
+        """Copy the fields of a frontend row onto the model. Raises ValueError for invalid values."""
+        raise NotImplementedError
+
+    async def changed_records(self, db: AsyncSession, obj: ModelType, removed: bool = False) -> Dict[str, List[int]]:
+        """Ids of the records, by dataset, that writing (or removing) `obj` changes, once flushed"""
+        return {self.dataset: [obj.id]} if self.dataset else {}
+
+    def _select(self) -> Select:
+        return select(self.model).options(*self.load).where(*self.include)
+
+    async def get(self, db: AsyncSession, key: str) -> Optional[ModelType]:
+        """The row with this API id"""
+        record_id = self.parse_key(key)
+        return await self.get_by_id(db, record_id) if record_id is not None else None
+
+    async def get_by_id(self, db: AsyncSession, record_id: int) -> Optional[ModelType]:
+        statement = self._select().where(self.model.id == record_id)
+        # Refresh objects already in the session, e.g. relationships changed by a write
+        return await db.scalar(statement.execution_options(populate_existing=True))
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        filters: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        after: Optional[int] = None,
+    ) -> List[ModelType]:
+        """
+        Rows matching every (field == value) filter in id order, resuming after the id `after`
+        (keyset pagination). Filters with an empty value are ignored.
+        """
+        statement = self._select()
+        for field, value in (filters or {}).items():
+            if value:
+                statement = statement.where(self.filters[field](value))
+        if after is not None:
+            statement = statement.where(self.model.id > after)
+        statement = statement.order_by(self.model.id).offset(skip).limit(limit)
+        return list(await db.scalars(statement))
+
+    async def facet_counts(
+        self,
+        db: AsyncSession,
+        filters: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Like FacetCounter.counts(): the number of rows matching the filters and the counts of
+        each facet's values among them, a facet's own filter left out of its counts. One
+        GROUP BY query per facet. Raises ValueError for filters on unknown or multi-valued facets.
+        """
+        accepted: Dict[str, List[Any]] = {}
+        for name, values in (filters or {}).items():
+            values = [value for value in values or () if value]
+            if not values:
+                continue
+            if name not in self.facets:
+                raise ValueError(f"Cannot filter on {name}, expected one of: {', '.join(self.facets)}")
+            # Compared as the column's type, e.g. integer ids sent as strings; values that
+            # are not of that type match nothing
+            python_type = self.facets[name].type.python_type
+            accepted[name] = []
+            for value in values:
+                try:
+                    accepted[name].append(python_type(value))
+                except ValueError:
+                    pass
+
+        def conditions(excluded: Optional[str] = None) -> List[ColumnElement]:
+            return [*self.include, *(self.facets[name].in_(values) for name, values in accepted.items() if name != excluded)]
+
+        async def count_by(column: ColumnElement, joins: Sequence[Tuple[Any, ColumnElement]], excluded: Optional[str] = None) -> Dict[str, int]:
+            statement = select(column, func.count()).select_from(self.model)
+            for table, on in joins:
+                statement = statement.join(table, on)
+            statement = statement.where(*conditions(excluded)).group_by(column).order_by(func.count().desc(), column)
+            return {"" if value is None else str(value): count for value, count in await db.execute(statement)}
+
+        total = await db.scalar(select(func.count()).select_from(self.model).where(*conditions()))
+        facets = {name: await count_by(column, (), name) for name, column in self.facets.items()}
+        for name, (column, joins) in self.multi_facets.items():
+            facets[name] = await count_by(column, joins)
+        return total, facets
+
+    async def create(self, db: AsyncSession, data: Dict[str, Any]) -> ModelType:
+        obj = self.model()
+        await self.apply(db, obj, data)
+        db.add(obj)
+        await db.flush()
+        if hasattr(obj, "office_id") and obj.office_id is None:
+            obj.office_id = office_id_for(obj.id)
+        log_changes(db, await self.changed_records(db, obj))
+        await db.commit()
+        mirror.invalidate()
+        return await self.get_by_id(db, obj.id)
+
+    async def update(self, db: AsyncSession, obj: ModelType, data: Dict[str, Any]) -> ModelType:
+        await self.apply(db, obj, data)
+        await db.flush()
+        log_changes(db, await self.changed_records(db, obj))
+        await db.commit()
+        mirror.invalidate()
+        return await self.get_by_id(db, obj.id)
+
+    async def remove(self, db: AsyncSession, obj: ModelType):
+        # Before the delete cascades to the rows referencing it
+        log_changes(db, await self.changed_records(db, obj, removed=True))
+        await db.delete(obj)
+        await db.commit()
+        mirror.invalidate()
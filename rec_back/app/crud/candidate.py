@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.crud.base import CRUDBase
+from app.models import Application, CandidateProfile, Skill, User, candidate_skills
+from app.services.record_views import build_candidate
+
+
+class CRUDCandidate(CRUDBase[CandidateProfile]):
+    def to_row(self, candidate: CandidateProfile) -> Dict[str, Any]:
+        return build_candidate(candidate.to_record(), {
+            "users.json": {candidate.user.id: candidate.user.to_record()},
+            "skills.json": {skill.id: skill.to_record() for skill in candidate.skills},
+        })
+
+    async def changed_records(self, db: AsyncSession, candidate: CandidateProfile, removed: bool = False) -> Dict[str, List[int]]:
+        changes = await super().changed_records(db, candidate, removed)
+        if removed:
+            # Deleted along with the profile
+            changes["applications.json"] = list(await db.scalars(select(Application.id).where(Application.candidate_id == candidate.id)))
+        else:
+            # The user is written with the profile, and tags may add skills
+            changes["users.json"] = [candidate.user_id]
+            changes["skills.json"] = [skill.id for skill in candidate.skills]
+        return changes
+
+    async def apply(self, db: AsyncSession, candidate: CandidateProfile, data: Dict[str, Any]):
+        if candidate.id is None:
+            if not data.get("email"):
+                raise ValueError("A candidate needs an email")
+            candidate.user = User(role="candidate")
+            candidate.skills = []
+
+        user = candidate.user
+        user.first_name = data.get("firstName", user.first_name or "")
+        user.last_name = data.get("lastName", user.last_name or "")
+        user.email = data.get("email", user.email)
+        user.updated_at = datetime.now()
+        candidate.phone = data.get("phone", candidate.phone)
+        candidate.status = data.get("status") or candidate.status or "new"
+        if "cvUrl" in data:
+            candidate.cv_urls = [data["cvUrl"]] + list(candidate.cv_urls or [])[1:] if data["cvUrl"] else []
+        if "tags" in data:
+            # Tags are skill names, new ones are added to the skills
+            names = list(dict.fromkeys(data["tags"] or []))
+            existing = {skill.name: skill for skill in await db.scalars(select(Skill).where(Skill.name.in_(names)))}
+            candidate.skills = [existing.get(name) or Skill(name=name) for name in names]
+
+
+candidate = CRUDCandidate(
+    CandidateProfile,
+    load=[selectinload(CandidateProfile.user), selectinload(CandidateProfile.skills)],
+    filters={
+        "officeId": lambda value: CandidateProfile.office_id == value,
+        "status": lambda value: CandidateProfile.status == value,
+    },
+    facets={
+        "status": CandidateProfile.status,
+        "officeId": CandidateProfile.office_id,
+    },
+    multi_facets={
+        "skills": (Skill.name, [
+            (candidate_skills, candidate_skills.c.candidate_id == CandidateProfile.id),
+            (Skill, Skill.id == candidate_skills.c.skill_id),
+        ]),
+    },
+    dataset="candidate_profiles.json",
+)
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.crud.base import CRUDBase
+from app.models import CompanyProfile, EmployerProfile, User
+from app.services.record_views import build_company
+
+
+class CRUDEmployer(CRUDBase[EmployerProfile]):
+    pass
+
+
+class CRUDCompany(CRUDBase[CompanyProfile]):
+    def parse_key(self, key: str):
+        # Companies are served as comp-<id>
+        return super().parse_key(key[len("comp-"):]) if key.startswith("comp-") else None
+
+    def to_row(self, company: CompanyProfile) -> Dict[str, Any]:
+        return build_company(company.to_record(), {
+            "users.json": {company.user.id: company.user.to_record()},
+            "jobs.json": {job.id: job.to_record() for job in company.jobs},
+        })
+
+    async def changed_records(self, db: AsyncSession, company: CompanyProfile, removed: bool = False) -> Dict[str, List[int]]:
+        changes = await super().changed_records(db, company, removed)
+        if not removed and company.user_id is not None:
+            # The employer account is written with the company
+            changes["users.json"] = [company.user_id]
+        return changes
+
+    async def apply(self, db: AsyncSession, company: CompanyProfile, data: Dict[str, Any]):
+        if company.id is None:
+            if not data.get("name") or not data.get("contactEmail"):
+                raise ValueError("A company needs a name and a contact email")
+            # Like the seeded companies, each one is managed by an employer account
+            first_name, _, last_name = (data.get("contactPerson") or "").partition(" ")
+            company.user = User(role="employer", email=data["contactEmail"], first_name=first_name, last_name=last_name)
+            company.jobs = []
+
+        company.company_name = data.get("name", company.company_name)
+        company.industry = data.get("industry", company.industry)
+        company.website = data.get("website", company.website)
+        company.location = data.get("address", company.location)
+        company.description = data.get("notes", company.description)
+        contact = dict(company.contact_details or {})
+        for field, key in (("contactPerson", "name"), ("contactEmail", "email"), ("contactPhone", "phone")):
+            if field in data:
+                contact[key] = data[field]
+        company.contact_details = contact
+        company.user.updated_at = datetime.now()
+
+
+employer = CRUDEmployer(EmployerProfile, load=[selectinload(EmployerProfile.jobs)])
+
+company = CRUDCompany(
+    CompanyProfile,
+    load=[selectinload(CompanyProfile.user), selectinload(CompanyProfile.jobs)],
+    filters={
+        "officeId": lambda value: CompanyProfile.office_id == value,
+    },
+    facets={
+        "industry": CompanyProfile.industry,
+        "officeId": CompanyProfile.office_id,
+    },
+    # Companies without an account are not listed, like in the JSON files
+    include=[CompanyProfile.user_id.is_not(None)],
+    dataset="company_profiles.json",
+)
@@ -0,0 +1,67 @@
+import re
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.crud.base import CRUDBase, parse_date
+from app.models import Application, EmployerProfile, Job, company_jobs
+from app.services.record_views import build_job
+
+# "55,000 - 75,000", the salary range as the frontend shows it
+SALARY_RANGE = re.compile(r"^\s*([\d,.\s]+?)\s*-\s*([\d,.\s]+?)\s*$")
+
+
+class CRUDJob(CRUDBase[Job]):
+    def to_row(self, job: Job) -> Dict[str, Any]:
+        employers = {job.employer.id: job.employer.to_record()} if job.employer else {}
+        return build_job(job.to_record(), {"employer_profiles.json": employers})
+
+    async def changed_records(self, db: AsyncSession, job: Job, removed: bool = False) -> Dict[str, List[int]]:
+        changes = await super().changed_records(db, job, removed)
+        if removed:
+            # Deleted along with the job, or listing it in their job_ids
+            changes["applications.json"] = list(await db.scalars(select(Application.id).where(Application.job_id == job.id)))
+            changes["company_profiles.json"] = list(await db.scalars(select(company_jobs.c.company_id).where(company_jobs.c.job_id == job.id)))
+        return changes
+
+    async def apply(self, db: AsyncSession, job: Job, data: Dict[str, Any]):
+        if job.id is None and not data.get("title"):
+            raise ValueError("A job needs a title")
+
+        if "companyId" in data:
+            employer = await db.get(EmployerProfile, int(data["companyId"])) if str(data["companyId"]).isdigit() else None
+            if employer is None:
+                raise ValueError(f"Unknown company {data['companyId']}")
+            job.employer_id = employer.id
+        job.title = data.get("title", job.title)
+        job.description = data.get("description", job.description or "")
+        job.requirements = data.get("requirements", job.requirements or [])
+        job.location = data.get("location", job.location)
+        job.status = (data.get("status") or job.status or "open").lower()
+        if "deadline" in data:
+            job.deadline = parse_date(data["deadline"])
+        if "salaryRange" in data:
+            match = SALARY_RANGE.match(data["salaryRange"] or "")
+            job.salary_range = {
+                "min": int(re.sub(r"\D", "", match.group(1))),
+                "max": int(re.sub(r"\D", "", match.group(2))),
+            } if match else None
+
+
+job = CRUDJob(
+    Job,
+    load=[selectinload(Job.employer)],
+    filters={
+        "officeId": lambda value: Job.office_id == value,
+        "companyId": lambda value: Job.employer_id == (int(value) if str(value).isdigit() else None),
+        "status": lambda value: Job.status == value,
+    },
+    facets={
+        "status": Job.status,
+        "officeId": Job.office_id,
+        "companyId": Job.employer_id,
+    },
+    dataset="jobs.json",
+)
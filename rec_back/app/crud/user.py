@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models import Skill, User
+from app.services.record_views import format_skill, format_user
+
+# Backend roles of each frontend role (see map_role), every other role is an "employee"
+_FRONTEND_ROLES = {"super_admin": ["superadmin"], "admin": ["admin"]}
+
+
+def _role_filter(value: str):
+    if value in _FRONTEND_ROLES:
+        return User.role.in_(_FRONTEND_ROLES[value])
+    if value == "employee":
+        return User.role.not_in([role for roles in _FRONTEND_ROLES.values() for role in roles])
+    return User.role == value
+
+
+class CRUDUser(CRUDBase[User]):
+    def to_row(self, user: User) -> Dict[str, Any]:
+        return format_user(user.to_record())
+
+    async def get_by_email(self, db: AsyncSession, email: Optional[str]) -> Optional[User]:
+        if not email:
+            return None
+        return await db.scalar(select(User).where(User.email == email))
+
+
+class CRUDSkill(CRUDBase[Skill]):
+    def to_row(self, skill: Skill) -> Dict[str, Any]:
+        return format_skill(skill.to_record())
+
+
+user = CRUDUser(
+    User,
+    filters={
+        "officeId": lambda value: User.office_id == value,
+        "role": _role_filter,
+    },
+)
+
+skill = CRUDSkill(Skill)
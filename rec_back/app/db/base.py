@@ -0,0 +1,12 @@
+# Import every model so Base.metadata knows all the tables (create_all, migrations)
+from app.models import (  # noqa: F401
+    Application,
+    Base,
+    CandidateProfile,
+    CompanyProfile,
+    DataChange,
+    EmployerProfile,
+    Job,
+    Skill,
+    User,
+)
@@ -0,0 +1,607 @@
+"""
+Bulk import and export of fake_data-style JSON files.
+
+    python -m app.db.bulk import [directory] [--datasets users.json jobs.json ...]
+    python -m app.db.bulk export [directory] [--datasets ...] [--include-password-hashes]
+
+Imports stream each JSON array record by record, resolve foreign keys against the ids
+already in the database or imported earlier in the run, and write batches of rows with
+one multi-row statement each (COPY on PostgreSQL), every batch in its own transaction.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import JSON, Table, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.models import (
+    Application,
+    CandidateProfile,
+    CompanyProfile,
+    DataChange,
+    EmployerProfile,
+    Job,
+    Skill,
+    User,
+    candidate_skills,
+    company_jobs,
+)
+from app.services.data_store import DATA_DIR
+from app.services.record_views import office_id_for
+
+# Characters read from a JSON file at a time while streaming its records
+READ_CHUNK_SIZE = 1 << 20
+
+# Seconds between two progress reports of a dataset
+PROGRESS_INTERVAL = 5
+
+# Distinct reasons for skipping records listed in an import report, the others are counted as "other"
+MAX_SKIP_REASONS = 20
+
+# (dataset filename, rows written so far, seconds elapsed)
+ProgressCallback = Callable[[str, int, float], None]
+
+
+class BulkImportError(Exception):
+    """An import that stopped early, with the report of what it had written until then"""
+
+    def __init__(self, detail: str, report: Dict[str, Dict[str, Any]], status_code: int = 422):
+        super().__init__(detail)
+        self.detail = detail
+        self.report = report
+        self.status_code = status_code
+
+
+def iter_json_array(path: Path) -> Iterator[Dict[str, Any]]:
+    """The records of a file holding a JSON array of objects, without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(READ_CHUNK_SIZE).lstrip("\ufeff \t\r\n")
+        if not buffer.startswith("["):
+            raise ValueError("the file does not hold a JSON array")
+        position = 1
+        eof = False
+        while True:
+            # Skip to the next record, or the end of the array
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position < len(buffer) or eof:
+                    break
+                buffer, position = f.read(READ_CHUNK_SIZE), 0
+                eof = not buffer
+            if position >= len(buffer):
+                raise ValueError("the file ends in the middle of the array")
+            if buffer[position] == "]":
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record continues in the next chunk
+                if eof:
+                    raise
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield record
+            position = end
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if isinstance(value, str) else None
+    except ValueError:
+        raise ValueError("invalid date")
+
+
+def _date(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(value) if isinstance(value, str) else None
+    except ValueError:
+        raise ValueError("invalid date")
+
+
+def _known(known: Dict[str, Set[int]], table: str, record_id: Any) -> Optional[int]:
+    """The id if it refers to an existing row of `table`, None otherwise"""
+    return record_id if record_id in known[table] else None
+
+
+_PROFILE_FIELDS = ("company_name", "industry", "size", "location", "description", "website", "logo_url")
+
+
+def _user_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    now = datetime.now()
+    return {
+        "id": record["id"],
+        "email": record["email"],
+        "password_hash": record.get("password_hash"),
+        "first_name": record.get("first_name", ""),
+        "last_name": record.get("last_name", ""),
+        "role": record["role"],
+        "is_active": record.get("is_active", True),
+        "created_at": _datetime(record.get("created_at")) or now,
+        "updated_at": _datetime(record.get("updated_at")) or now,
+        "last_login": _datetime(record.get("last_login")),
+        "office_id": office_id_for(record["id"]),
+    }
+
+
+def _skill_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    return {"id": record["id"], "name": record["name"]}
+
+
+def _candidate_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    if _known(known, "users", record["user_id"]) is None:
+        raise ValueError("unknown user_id")
+    return {
+        "id": record["id"],
+        "user_id": record["user_id"],
+        "phone": record.get("phone"),
+        "location": record.get("location"),
+        "cv_urls": record.get("cv_urls", []),
+        "profile_completed": record.get("profile_completed", False),
+        "preferences": record.get("preferences"),
+        "notification_settings": record.get("notification_settings"),
+        "education": record.get("education", []),
+        "experience": record.get("experience", []),
+        "status": record.get("status", "new"),
+        "office_id": office_id_for(record["id"]),
+    }
+
+
+def _candidate_skill_rows(record: Dict[str, Any], known: Dict[str, Set[int]]) -> List[Dict[str, Any]]:
+    skill_ids = dict.fromkeys(skill_id for skill_id in record.get("skill_ids", []) if skill_id in known["skills"])
+    return [{"candidate_id": record["id"], "skill_id": skill_id} for skill_id in skill_ids]
+
+
+def _employer_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    return {
+        "id": record["id"],
+        "user_id": _known(known, "users", record.get("user_id")),
+        **{field: record.get(field) for field in _PROFILE_FIELDS},
+        "company_name": record.get("company_name", ""),
+        "contact_details": record.get("contact_details", {}),
+        "recruitment_history": record.get("recruitment_history", []),
+    }
+
+
+def _job_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    return {
+        "id": record["id"],
+        "employer_id": _known(known, "employer_profiles", record.get("employer_id")),
+        "title": record["title"],
+        "description": record.get("description", ""),
+        "responsibilities": record.get("responsibilities", []),
+        "requirements": record.get("requirements", []),
+        "location": record.get("location"),
+        "contract_type": record.get("contract_type"),
+        "salary_range": record.get("salary_range"),
+        "remote_option": record.get("remote_option", False),
+        "posting_date": _date(record.get("posting_date")),
+        "deadline": _date(record.get("deadline")),
+        "status": record.get("status", "Open").lower(),
+        "skills": record.get("skills", []),
+        "office_id": office_id_for(record["id"]),
+    }
+
+
+def _company_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    return {
+        **_employer_row(record, known),
+        "office_id": office_id_for(record["id"]),
+    }
+
+
+def _company_job_rows(record: Dict[str, Any], known: Dict[str, Set[int]]) -> List[Dict[str, Any]]:
+    # Jobs listed by a company that no longer exist are dropped, as they are never shown
+    job_ids = dict.fromkeys(job_id for job_id in record.get("job_ids", []) if job_id in known["jobs"])
+    return [{"company_id": record["id"], "job_id": job_id} for job_id in job_ids]
+
+
+def _application_row(record: Dict[str, Any], known: Dict[str, Set[int]]) -> Dict[str, Any]:
+    if _known(known, "candidate_profiles", record["candidate_id"]) is None:
+        raise ValueError("unknown candidate_id")
+    if _known(known, "jobs", record["job_id"]) is None:
+        raise ValueError("unknown job_id")
+    return {
+        "id": record["id"],
+        "candidate_id": record["candidate_id"],
+        "job_id": record["job_id"],
+        "application_date": _date(record.get("application_date")),
+        "cover_letter": record.get("cover_letter"),
+        "status": record.get("status", "Submitted"),
+        "status_history": record.get("status_history", []),
+        "notes": record.get("notes", []),
+    }
+
+
+class BulkDataset:
+    """How the records of one fake_data file map to a table and, optionally, a link table"""
+
+    def __init__(
+        self,
+        filename: str,
+        table: Table,
+        to_row: Callable[[Dict[str, Any], Dict[str, Set[int]]], Dict[str, Any]],
+        required: Tuple[str, ...] = (),
+        references: Tuple[str, ...] = (),
+        link: Optional[Tuple[Table, Callable[[Dict[str, Any], Dict[str, Set[int]]], List[Dict[str, Any]]], str, str]] = None,
+        private: Tuple[str, ...] = (),
+    ):
+        """
+        `to_row(record, known)` returns the row to insert, or raises ValueError with the reason
+        to skip the record, e.g. a missing required reference. It is only given records with
+        an integer id and every field in `required`. `known` maps each table in `references`,
+        and the dataset's own table, to its ids.
+        `link` is (table, rows of a record, column of the record id, column of the linked id),
+        e.g. the candidate_skills rows the skill_ids of a candidate are stored as.
+        `private` are the columns left out of exports unless asked for, e.g. password hashes.
+        """
+        self.filename = filename
+        self.table = table
+        self.to_row = to_row
+        self.required = required
+        self.references = references
+        self.link = link
+        self.private = private
+
+
+# In dependency order: every dataset only references the ones before it
+BULK_DATASETS = [
+    BulkDataset("users.json", User.__table__, _user_row, ("email", "role"), private=("password_hash",)),
+    BulkDataset("skills.json", Skill.__table__, _skill_row, ("name",)),
+    BulkDataset("employer_profiles.json", EmployerProfile.__table__, _employer_row, references=("users",)),
+    BulkDataset("jobs.json", Job.__table__, _job_row, ("title",), ("employer_profiles",)),
+    BulkDataset(
+        "candidate_profiles.json", CandidateProfile.__table__, _candidate_row, ("user_id",), ("users", "skills"),
+        link=(candidate_skills, _candidate_skill_rows, "candidate_id", "skill_id"),
+    ),
+    BulkDataset(
+        "company_profiles.json", CompanyProfile.__table__, _company_row, references=("users", "jobs"),
+        link=(company_jobs, _company_job_rows, "company_id", "job_id"),
+    ),
+    BulkDataset(
+        "applications.json", Application.__table__, _application_row, ("candidate_id", "job_id"),
+        ("candidate_profiles", "jobs"),
+    ),
+]
+
+BULK_DATASETS_BY_FILENAME = {dataset.filename: dataset for dataset in BULK_DATASETS}
+
+
+async def _ids(connection: AsyncConnection, table: Table) -> Set[int]:
+    result = await connection.stream_scalars(select(table.c.id).execution_options(yield_per=50000))
+    return {record_id async for record_id in result}
+
+
+async def _insert(connection: AsyncConnection, table: Table, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    if connection.dialect.name == "postgresql":
+        # COPY is several times faster than even batched INSERTs
+        columns = [column.name for column in table.columns]
+        json_columns = {column.name for column in table.columns if isinstance(column.type, JSON)}
+        records = [
+            tuple(
+                json.dumps(row[column]) if column in json_columns and row[column] is not None else row[column]
+                for column in columns
+            )
+            for row in rows
+        ]
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table.name, records=records, columns=columns)
+    else:
+        await connection.execute(table.insert(), rows)
+
+
+async def _write_batch(
+    engine: AsyncEngine,
+    dataset: BulkDataset,
+    rows: List[Dict[str, Any]],
+    link_rows: List[Dict[str, Any]],
+):
+    # One transaction per batch: memory stays flat and a failure only loses one batch
+    async with engine.begin() as connection:
+        await _insert(connection, dataset.table, rows)
+        if dataset.link is not None:
+            await _insert(connection, dataset.link[0], link_rows)
+
+
+def _check(dataset: BulkDataset, record: Any, known: Dict[str, Set[int]]) -> Optional[str]:
+    """Why a record cannot be imported, None if it can be given to the dataset's to_row"""
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    record_id = record.get("id")
+    if record_id is None:
+        return "missing id"
+    if not isinstance(record_id, int) or isinstance(record_id, bool):
+        return "id is not an integer"
+    for field in dataset.required:
+        if record.get(field) is None:
+            return f"missing {field}"
+    if record_id in known[dataset.table.name]:
+        return "duplicate id"
+    return None
+
+
+async def _import_dataset(
+    engine: AsyncEngine,
+    dataset: BulkDataset,
+    path: Path,
+    known: Dict[str, Set[int]],
+    batch_size: int,
+    progress: Optional[ProgressCallback],
+    stats: Dict[str, Any],
+):
+    # `stats` is updated after every batch, so that it is accurate when the import stops early
+    started = time.perf_counter()
+    last_report = started
+    ids = known[dataset.table.name]
+    reasons: Dict[str, int] = stats["skippedReasons"]
+    rows: List[Dict[str, Any]] = []
+    link_rows: List[Dict[str, Any]] = []
+
+    async def write():
+        nonlocal rows, link_rows
+        await _write_batch(engine, dataset, rows, link_rows)
+        stats["rows"] += len(rows)
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 3)
+        stats["rowsPerSecond"] = round(stats["rows"] / elapsed) if elapsed > 0 else stats["rows"]
+        rows, link_rows = [], []
+
+    for record in iter_json_array(path):
+        reason = _check(dataset, record, known)
+        if reason is None:
+            try:
+                row = dataset.to_row(record, known)
+            except (ValueError, TypeError, AttributeError) as e:
+                reason = str(e) or type(e).__name__
+        if reason is not None:
+            stats["skipped"] += 1
+            if reason not in reasons and len(reasons) >= MAX_SKIP_REASONS:
+                reason = "other"
+            reasons[reason] = reasons.get(reason, 0) + 1
+            continue
+
+        rows.append(row)
+        # Known from now on: later records of the run may reference it, or repeat its id
+        ids.add(row["id"])
+        if dataset.link is not None:
+            link_rows.extend(dataset.link[1](record, known))
+        if len(rows) >= batch_size:
+            await write()
+            now = time.perf_counter()
+            if progress is not None and now - last_report >= PROGRESS_INTERVAL:
+                progress(dataset.filename, stats["rows"], now - started)
+                last_report = now
+    await write()
+    if progress is not None:
+        progress(dataset.filename, stats["rows"], time.perf_counter() - started)
+
+
+async def import_datasets(
+    engine: AsyncEngine,
+    files: Dict[str, Path],
+    batch_size: int = settings.DB_BULK_BATCH_SIZE,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Import fake_data-style files, given by dataset filename (see BULK_DATASETS), into empty
+    or existing tables. Invalid records (missing required fields, ids already in the table)
+    and records referencing rows that exist neither in the database nor in the files are
+    skipped, or have an optional reference cleared, like dangling ids in fake_data.
+    Returns the rows written, the records skipped by reason and the rows per second of each
+    dataset. Raises ValueError for unknown datasets, and BulkImportError, with the report so
+    far, when a file is not a JSON array or the database rejects a batch: the batches written
+    until then are kept.
+    """
+    unknown = set(files) - set(BULK_DATASETS_BY_FILENAME)
+    if unknown:
+        raise ValueError(f"Unknown datasets: {', '.join(sorted(unknown))}")
+
+    datasets = [dataset for dataset in BULK_DATASETS if dataset.filename in files]
+    # Ids of the rows every imported dataset may reference or repeat, read once and kept up to date
+    known: Dict[str, Set[int]] = {}
+    async with engine.connect() as connection:
+        for dataset in datasets:
+            for name in (*dataset.references, dataset.table.name):
+                if name not in known:
+                    known[name] = await _ids(connection, dataset.table.metadata.tables[name])
+
+    report: Dict[str, Dict[str, Any]] = {}
+    try:
+        for dataset in datasets:
+            stats = report[dataset.filename] = {"rows": 0, "skipped": 0, "skippedReasons": {}, "seconds": 0, "rowsPerSecond": 0}
+            try:
+                await _import_dataset(engine, dataset, files[dataset.filename], known, batch_size, progress, stats)
+            except ValueError as e:
+                stats["error"] = str(e)
+                raise BulkImportError(f"{dataset.filename}: {str(e)}", report, 422)
+            except SQLAlchemyError as e:
+                # e.g. a unique email taken by another user: the batch is rolled back
+                stats["error"] = str(e.orig if getattr(e, "orig", None) is not None else e)
+                raise BulkImportError(f"{dataset.filename}: a batch conflicts with existing data", report, 409)
+    finally:
+        await _imported(engine, [dataset for dataset in datasets if report.get(dataset.filename, {}).get("rows")])
+    return report
+
+
+async def _imported(engine: AsyncEngine, datasets: List[BulkDataset]):
+    if not datasets:
+        return
+    async with engine.begin() as connection:
+        # Whole datasets changed, for the in-memory copies to reload (see app.db.mirror)
+        await connection.execute(DataChange.__table__.insert(), [{"dataset": dataset.filename, "record_id": None} for dataset in datasets])
+
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as connection:
+            for dataset in datasets:
+                # Explicit ids don't advance the id sequences, move them past the imported rows
+                table = dataset.table.name
+                await connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+                ))
+
+
+def _record(row: Dict[str, Any], omitted: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    record = {}
+    for column, value in row.items():
+        if column == "office_id" or column in omitted:
+            continue  # Derived from the id, not part of the fake_data records, or private
+        record[column] = value.isoformat() if isinstance(value, (datetime, date)) else value
+    return record
+
+
+def _bulk_dataset(filename: str) -> BulkDataset:
+    dataset = BULK_DATASETS_BY_FILENAME.get(filename)
+    if dataset is None:
+        raise ValueError(f"Unknown dataset {filename}, expected one of: {', '.join(BULK_DATASETS_BY_FILENAME)}")
+    return dataset
+
+
+async def _read_records(connection: AsyncConnection, dataset: BulkDataset, statement, include_private: bool = False) -> List[Dict[str, Any]]:
+    """The rows selected by `statement` from a dataset's table, as fake_data records"""
+    rows = (await connection.execute(statement)).mappings().all()
+    links: Dict[int, List[int]] = {}
+    if dataset.link is not None and rows:
+        # skill_ids / job_ids of all the rows in one query
+        link_table, _, record_column, linked_column = dataset.link
+        ids = [row["id"] for row in rows]
+        result = await connection.execute(
+            select(link_table.c[record_column], link_table.c[linked_column])
+            .where(link_table.c[record_column].in_(ids))
+            .order_by(link_table.c[record_column], link_table.c[linked_column])
+        )
+        for record_id, linked_id in result:
+            links.setdefault(record_id, []).append(linked_id)
+
+    records = []
+    for row in rows:
+        record = _record(dict(row), () if include_private else dataset.private)
+        if dataset.link is not None:
+            record["skill_ids" if dataset.link[0] is candidate_skills else "job_ids"] = links.get(row["id"], [])
+        records.append(record)
+    return records
+
+
+async def iter_dataset(
+    engine: AsyncEngine,
+    filename: str,
+    batch_size: int = settings.DB_BULK_BATCH_SIZE,
+    include_private: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Every row of a dataset as a fake_data record, read in batches of consecutive ids, without its private columns unless asked"""
+    dataset = _bulk_dataset(filename)
+    table = dataset.table
+    after = None
+    while True:
+        statement = select(table).order_by(table.c.id).limit(batch_size)
+        if after is not None:
+            statement = statement.where(table.c.id > after)
+        async with engine.connect() as connection:
+            records = await _read_records(connection, dataset, statement, include_private)
+        if not records:
+            return
+        for record in records:
+            yield record
+        after = records[-1]["id"]
+
+
+async def fetch_records(engine: AsyncEngine, filename: str, ids: Iterable[int], batch_size: int = settings.DB_BULK_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """The rows of a dataset with the given ids as fake_data records, by id, leaving out missing ones"""
+    dataset = _bulk_dataset(filename)
+    table = dataset.table
+    ids = sorted(set(ids))
+    records = []
+    async with engine.connect() as connection:
+        for start in range(0, len(ids), batch_size):
+            statement = select(table).where(table.c.id.in_(ids[start:start + batch_size])).order_by(table.c.id)
+            records.extend(await _read_records(connection, dataset, statement))
+    return records
+
+
+async def iter_json_array_bytes(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """A JSON array, one record per line, as the records come"""
+    separator = b"[\n"
+    async for record in records:
+        yield separator + dumps(record)
+        separator = b",\n"
+    yield b"[]\n" if separator == b"[\n" else b"\n]\n"
+
+
+async def export_datasets(
+    engine: AsyncEngine,
+    directory: Path,
+    filenames: List[str],
+    progress: Optional[ProgressCallback] = None,
+    include_private: bool = False,
+):
+    directory.mkdir(parents=True, exist_ok=True)
+    for filename in filenames:
+        started = time.perf_counter()
+        count = 0
+
+        async def counted(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+            nonlocal count
+            async for record in records:
+                count += 1
+                yield record
+
+        with open(directory / filename, "wb") as f:
+            async for chunk in iter_json_array_bytes(counted(iter_dataset(engine, filename, include_private=include_private))):
+                f.write(chunk)
+        if progress is not None:
+            progress(filename, count, time.perf_counter() - started)
+
+
+def _print_progress(filename: str, rows: int, elapsed: float):
+    rate = rows / elapsed if elapsed > 0 else rows
+    print(f"{filename}: {rows} rows in {elapsed:.1f}s ({rate:.0f} rows/s)")
+
+
+async def _main(args: argparse.Namespace):
+    from app.db.base import Base
+    from app.db.session import engine
+
+    if engine is None:
+        raise SystemExit("Set DATABASE_URL (or the POSTGRES_* settings) first")
+    directory = Path(args.directory)
+    filenames = args.datasets or [dataset.filename for dataset in BULK_DATASETS]
+    try:
+        if args.command == "import":
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            files = {filename: directory / filename for filename in filenames if (directory / filename).exists()}
+            try:
+                report = await import_datasets(engine, files, args.batch_size, _print_progress)
+            except BulkImportError as e:
+                report = e.report
+                print(f"Import stopped: {e.detail}")
+            for filename, stats in report.items():
+                for reason, count in stats["skippedReasons"].items():
+                    print(f"{filename}: skipped {count} records, {reason}")
+        else:
+            await export_datasets(engine, directory, filenames, _print_progress, args.include_password_hashes)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import or export fake_data-style JSON files")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("directory", nargs="?", default=str(DATA_DIR))
+    parser.add_argument("--datasets", nargs="*", help="Dataset filenames, e.g. users.json (default: all)")
+    parser.add_argument("--batch-size", type=int, default=settings.DB_BULK_BATCH_SIZE)
+    parser.add_argument("--include-password-hashes", action="store_true", help="Export the users' password hashes too")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,22 @@
+from sqlalchemy import select
+
+from app.db.base import Base
+from app.db.bulk import BULK_DATASETS, import_datasets
+from app.db.session import engine
+from app.models import User
+from app.services.data_store import DATA_DIR
+
+
+async def init_db():
+    """Create the tables, and fill them from the fake_data JSON files on first start"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        empty = await connection.scalar(select(User.id).limit(1)) is None
+
+    if empty:
+        files = {dataset.filename: DATA_DIR / dataset.filename for dataset in BULK_DATASETS}
+        await import_datasets(engine, {filename: path for filename, path in files.items() if path.exists()})
+
+
+async def close_db():
+    await engine.dispose()
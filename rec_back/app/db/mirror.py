@@ -0,0 +1,163 @@
+"""
+In-memory copies of the database tables, for the views, indexes and facet counters that
+serve searches, queries, exports and the AI tools in database mode.
+
+With DB_MIRROR set, every dataset of app.db.bulk is loaded into the data store at startup
+in place of its fake_data file. Writes then add rows to the data_changes table in their
+transaction, and before a request every worker reloads the records changed since it last
+looked, at most every DB_MIRROR_SYNC_INTERVAL milliseconds unless it wrote since, so the
+views and the services following them update incrementally.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.db.bulk import BULK_DATASETS, fetch_records, iter_dataset
+from app.models import DataChange
+from app.services.data_store import DataStore, data_store
+
+# Seconds a change id missing from the log is waited for: a concurrent write that has not
+# committed yet takes its id before committing, a rolled back one never shows up
+GAP_TIMEOUT = 60
+
+# Seconds between two deletions of the changes older than DB_CHANGES_RETENTION
+COMPACT_INTERVAL = 300
+
+
+def log_changes(db: AsyncSession, changes: Dict[str, Optional[Iterable[int]]]):
+    """Record, in the session's transaction, the records written to each dataset (None: all of them)"""
+    for dataset, ids in changes.items():
+        if ids is None:
+            db.add(DataChange(dataset=dataset, record_id=None))
+        else:
+            db.add_all(DataChange(dataset=dataset, record_id=record_id) for record_id in dict.fromkeys(ids))
+
+
+async def compact_changes(engine: AsyncEngine, retention: int) -> int:
+    """
+    Delete the changes logged more than `retention` seconds ago, but the newest one that
+    the ETags are derived from. Returns the number of changes deleted.
+    """
+    cutoff = datetime.now() - timedelta(seconds=retention)
+    async with engine.begin() as connection:
+        newest = await connection.scalar(select(func.max(DataChange.id)))
+        if newest is None:
+            return 0
+        result = await connection.execute(delete(DataChange).where(DataChange.created_at < cutoff, DataChange.id < newest))
+        return result.rowcount
+
+
+async def compact_changes_forever(engine: AsyncEngine):
+    """Keep the data_changes table to DB_CHANGES_RETENTION, from the app lifespan of every worker"""
+    while True:
+        try:
+            await compact_changes(engine, settings.DB_CHANGES_RETENTION)
+        except Exception as e:
+            print(f"Error compacting data changes: {e}")
+        await asyncio.sleep(COMPACT_INTERVAL)
+
+
+class DatabaseMirror:
+    def __init__(self, store: DataStore):
+        self.store = store
+        self.loaded = False
+        # Newest change applied, and the older ones not seen yet with when they were first missed
+        self.last_change = 0
+        self._missing: Dict[int, float] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        # When the log was last read, and whether this worker wrote since
+        self._synced_at = float("-inf")
+        self._stale = False
+
+    @property
+    def version(self) -> str:
+        """The changes applied, the same in every worker that has applied the same ones"""
+        return "-".join(str(change_id) for change_id in [self.last_change, *sorted(self._missing)])
+
+    async def load(self, engine: AsyncEngine):
+        """Load every dataset from the database"""
+        async with engine.connect() as connection:
+            head = await connection.scalar(select(func.max(DataChange.id))) or 0
+        # Changes made while loading are applied again by the next catch_up, which is harmless
+        for dataset in BULK_DATASETS:
+            await self._reload(engine, dataset.filename, None, head)
+        self.last_change = head
+        self._missing = {}
+        self._synced_at = time.monotonic()
+        self.loaded = True
+
+    def invalidate(self):
+        """Catch up on the next call, however recent the last one: this worker wrote to the database"""
+        self._stale = True
+
+    def _due(self) -> bool:
+        return self._stale or time.monotonic() - self._synced_at >= settings.DB_MIRROR_SYNC_INTERVAL / 1000
+
+    async def catch_up(self, engine: AsyncEngine):
+        """Reload the records changed since the last call, in this worker"""
+        if not self.loaded or not self._due():
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._lock.locked() and not self._stale:
+            # Another request is catching up: serve what is loaded rather than wait for it
+            return
+        async with self._lock:
+            if not self._due():
+                return
+            if time.monotonic() - self._synced_at > settings.DB_CHANGES_RETENTION - GAP_TIMEOUT:
+                # Changes this worker has not seen may have been deleted since
+                await self.load(engine)
+                self._stale = False
+                return
+            # Writes committed from now on are read by the next call
+            self._stale = False
+            self._synced_at = time.monotonic()
+            condition = DataChange.id > self.last_change
+            if self._missing:
+                condition = or_(condition, DataChange.id.in_(list(self._missing)))
+            async with engine.connect() as connection:
+                changes = (await connection.execute(
+                    select(DataChange.id, DataChange.dataset, DataChange.record_id).where(condition).order_by(DataChange.id)
+                )).all()
+
+            now = time.monotonic()
+            changed: Dict[str, Optional[Set[int]]] = {}
+            seen = set()
+            for change_id, dataset, record_id in changes:
+                seen.add(change_id)
+                self._missing.pop(change_id, None)
+                if record_id is None:
+                    changed[dataset] = None
+                elif dataset not in changed or changed[dataset] is not None:
+                    changed.setdefault(dataset, set()).add(record_id)
+            if changes and changes[-1][0] > self.last_change:
+                newest = changes[-1][0]
+                for change_id in range(self.last_change + 1, newest):
+                    if change_id not in seen:
+                        self._missing[change_id] = now
+                self.last_change = newest
+            self._missing = {change_id: since for change_id, since in self._missing.items() if now - since < GAP_TIMEOUT}
+
+            for dataset in BULK_DATASETS:
+                if dataset.filename in changed:
+                    await self._reload(engine, dataset.filename, changed[dataset.filename], self.last_change)
+
+    async def _reload(self, engine: AsyncEngine, filename: str, ids: Optional[Set[int]], change_id: int):
+        # The digest names the state of the database, as the file content hash does for fake_data
+        digest = f"db-{change_id}"
+        if ids is None:
+            records: List[dict] = [record async for record in iter_dataset(engine, filename)]
+            self.store.dataset(filename).replace(records, digest)
+        else:
+            records = await fetch_records(engine, filename, ids)
+            removed = ids - {record["id"] for record in records}
+            self.store.dataset(filename).apply(records, removed, digest)
+
+
+mirror = DatabaseMirror(data_store)
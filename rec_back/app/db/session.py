@@ -0,0 +1,49 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # Every session must share the single connection holding an in-memory database
+        return {"poolclass": StaticPool}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # Replace connections the server closed while they sat in the pool
+        "pool_pre_ping": True,
+    }
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # SQLite only enforces foreign keys (and their ON DELETE) when asked to, and
+    # write-ahead logging lets reads run while a write is in progress
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, echo=settings.DB_ECHO, **_engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _configure_sqlite)
+    return engine
+
+
+# None when DATABASE_URL is not set: the API then serves the fake_data JSON files
+engine: Optional[AsyncEngine] = create_engine(settings.DATABASE_URL) if settings.DATABASE_URL else None
+
+# Objects stay usable after commit, to be formatted into responses without another query
+SessionLocal: Optional[async_sessionmaker[AsyncSession]] = (
+    async_sessionmaker(engine, expire_on_commit=False) if engine is not None else None
+)
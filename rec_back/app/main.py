@@ -1,45 +1,119 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
-
-# Create API tools module if it doesn't exist
-try:
-    from app.api.v1 import ai_tools
-    has_ai_tools = True
-except ImportError:
-    print("Warning: AI tools module not found, creating api/v1/ai_tools.py")
-    has_ai_tools = False
-
-# Create API endpoints modules
-from app.api.v1 import candidates, companies, jobs, users, skills
-
-app = FastAPI(
-    title="RecrutementPlus API",
-    description="CRM API for Recruitment",
-    version="0.1.0",
-)
-
-# Set up CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For development
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-if has_ai_tools:
-    app.include_router(ai_tools.router, prefix="/api/v1/ai-tools", tags=["ai-tools"])
-
-# Include data endpoints
-app.include_router(candidates.router, prefix="/api/v1/candidates", tags=["candidates"])
-app.include_router(companies.router, prefix="/api/v1/companies", tags=["companies"])
-app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
-app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
-app.include_router(skills.router, prefix="/api/v1/skills", tags=["skills"])
-
-@app.get("/")
-async def root():
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+import os
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.profiling import PROFILE_ID_HEADER, ProfilingMiddleware
+from app.core.serialization import FastJSONResponse
+from app.db.session import engine
+from app.services.process_pool import shutdown_process_pool
+from app.services.task_queue import task_queue
+
+# Create API tools module if it doesn't exist
+try:
+    from app.api.v1 import ai_tools
+    has_ai_tools = True
+except ImportError:
+    print("Warning: AI tools module not found, creating api/v1/ai_tools.py")
+    has_ai_tools = False
+
+# Create API endpoints modules
+from app.api.v1 import admin, candidates, companies, jobs, users, skills, stats
+from app.api.v1.deps import sync_data
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tables are created, and seeded from fake_data, when a database is configured
+    if engine is not None:
+        from app.db.init_db import close_db, init_db
+        from app.db.mirror import compact_changes_forever, mirror
+        await init_db()
+        # The log of the writes only keeps the recent ones
+        compactor = asyncio.create_task(compact_changes_forever(engine))
+        # Searches, queries, job matching and stats then read the tables' in-memory copies
+        if settings.DB_MIRROR:
+            await mirror.load(engine)
+    # Shared, connection-pooled OpenAI client used by the AI tools
+    if has_ai_tools:
+        ai_tools.ai_service.open_async_client()
+    # Workers of the background AI tasks
+    task_queue.start()
+    yield
+    await task_queue.stop()
+    if has_ai_tools:
+        await ai_tools.ai_service.close_async_client()
+    shutdown_process_pool()
+    if engine is not None:
+        compactor.cancel()
+        await close_db()
+
+app = FastAPI(
+    title="RecrutementPlus API",
+    description="CRM API for Recruitment",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+
+# Set up CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # For development
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", PROFILE_ID_HEADER],
+)
+
+# Profiles requests carrying the admin token, or a sampled share of them
+if settings.PROFILING_TOKEN or settings.PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(ProfilingMiddleware)
+
+# Per-route request counts and latencies, outermost so that they include the other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(request: Request, exc: IntegrityError):
+    # A write breaking a unique (e.g. email) or foreign key constraint
+    return FastJSONResponse(status_code=409, content={"detail": "Conflicts with existing data"})
+
+# In database mode with DB_MIRROR, the data endpoints first catch up with the writes of other requests and workers
+synced = [Depends(sync_data)]
+
+# Include routers
+if has_ai_tools:
+    app.include_router(ai_tools.router, prefix="/api/v1/ai-tools", tags=["ai-tools"], dependencies=synced)
+
+# Include data endpoints
+app.include_router(candidates.router, prefix="/api/v1/candidates", tags=["candidates"], dependencies=synced)
+app.include_router(companies.router, prefix="/api/v1/companies", tags=["companies"], dependencies=synced)
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"], dependencies=synced)
+app.include_router(users.router, prefix="/api/v1/users", tags=["users"], dependencies=synced)
+app.include_router(skills.router, prefix="/api/v1/skills", tags=["skills"], dependencies=synced)
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+app.include_router(stats.router, prefix="/api/v1/stats", tags=["stats"], dependencies=synced)
+
+# Figures other services keep, read on every scrape of /metrics
+registry.collector(task_queue.metrics)
+if has_ai_tools:
+    registry.collector(ai_tools.ai_service.metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics in the Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/")
+async def root():
     return {"message": "Welcome to RecrutementPlus CRM API"}
\ No newline at end of file
@@ -0,0 +1,9 @@
+from app.models.base import Base
+from app.models.user import User
+from app.models.skill import Skill
+from app.models.candidate import CandidateProfile, candidate_skills
+from app.models.employer import EmployerProfile
+from app.models.job import Job
+from app.models.company import CompanyProfile, company_jobs
+from app.models.application import Application
+from app.models.data_change import DataChange
@@ -0,0 +1,25 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, JSONType
+from app.models.candidate import CandidateProfile
+from app.models.job import Job
+
+
+class Application(Base):
+    __tablename__ = "applications"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    candidate_id: Mapped[int] = mapped_column(ForeignKey("candidate_profiles.id", ondelete="CASCADE"), index=True)
+    job_id: Mapped[int] = mapped_column(ForeignKey("jobs.id", ondelete="CASCADE"), index=True)
+    application_date: Mapped[Optional[date]] = mapped_column(default=date.today)
+    cover_letter: Mapped[Optional[str]] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(64), index=True)
+    status_history: Mapped[List[Dict[str, Any]]] = mapped_column(JSONType, default=list)
+    notes: Mapped[List[Dict[str, Any]]] = mapped_column(JSONType, default=list)
+
+    candidate: Mapped[CandidateProfile] = relationship(lazy="raise")
+    job: Mapped[Job] = relationship(lazy="raise")
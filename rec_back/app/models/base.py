@@ -0,0 +1,23 @@
+from datetime import date, datetime
+from typing import Any, Dict
+
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import DeclarativeBase
+
+# Nested fields of the records (experience, contact details...), stored as JSONB on PostgreSQL
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class Base(DeclarativeBase):
+    """Base class of the database models"""
+
+    def to_record(self) -> Dict[str, Any]:
+        """The columns as a record shaped like the fake_data JSON files, dates as ISO 8601 strings"""
+        record = {}
+        for column in self.__table__.columns:
+            value = getattr(self, column.key)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            record[column.key] = value
+        return record
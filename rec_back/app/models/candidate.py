@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Column, ForeignKey, String, Table
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, JSONType
+from app.models.skill import Skill
+from app.models.user import User
+
+candidate_skills = Table(
+    "candidate_skills",
+    Base.metadata,
+    Column("candidate_id", ForeignKey("candidate_profiles.id", ondelete="CASCADE"), primary_key=True),
+    Column("skill_id", ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+
+class CandidateProfile(Base):
+    __tablename__ = "candidate_profiles"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), unique=True, index=True)
+    phone: Mapped[Optional[str]] = mapped_column(String(50))
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    cv_urls: Mapped[List[str]] = mapped_column(JSONType, default=list)
+    profile_completed: Mapped[bool] = mapped_column(default=False)
+    preferences: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONType)
+    notification_settings: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONType)
+    education: Mapped[List[Dict[str, Any]]] = mapped_column(JSONType, default=list)
+    experience: Mapped[List[Dict[str, Any]]] = mapped_column(JSONType, default=list)
+    status: Mapped[str] = mapped_column(String(32), default="new", index=True)
+    office_id: Mapped[Optional[str]] = mapped_column(String(8), index=True)
+
+    user: Mapped[User] = relationship(back_populates="candidate_profile", lazy="raise")
+    skills: Mapped[List[Skill]] = relationship(secondary=candidate_skills, order_by=Skill.id, lazy="raise")
+
+    def to_record(self) -> Dict[str, Any]:
+        record = super().to_record()
+        record["skill_ids"] = [skill.id for skill in self.skills]
+        return record
@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Column, ForeignKey, String, Table, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, JSONType
+from app.models.job import Job
+from app.models.user import User
+
+company_jobs = Table(
+    "company_jobs",
+    Base.metadata,
+    Column("company_id", ForeignKey("company_profiles.id", ondelete="CASCADE"), primary_key=True),
+    Column("job_id", ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+
+class CompanyProfile(Base):
+    __tablename__ = "company_profiles"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    company_name: Mapped[str] = mapped_column(String(255))
+    industry: Mapped[Optional[str]] = mapped_column(String(100))
+    size: Mapped[Optional[str]] = mapped_column(String(50))
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    website: Mapped[Optional[str]] = mapped_column(String(255))
+    logo_url: Mapped[Optional[str]] = mapped_column(String(512))
+    contact_details: Mapped[Dict[str, Any]] = mapped_column(JSONType, default=dict)
+    recruitment_history: Mapped[List[Dict[str, Any]]] = mapped_column(JSONType, default=list)
+    office_id: Mapped[Optional[str]] = mapped_column(String(8), index=True)
+
+    user: Mapped[Optional[User]] = relationship(lazy="raise")
+    jobs: Mapped[List[Job]] = relationship(secondary=company_jobs, order_by=Job.id, lazy="raise")
+
+    def to_record(self) -> Dict[str, Any]:
+        record = super().to_record()
+        record["job_ids"] = [job.id for job in self.jobs]
+        return record
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class DataChange(Base):
+    """A record written to the database, for the in-memory copies of the datasets (see app.db.mirror) to reload"""
+
+    __tablename__ = "data_changes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # fake_data filename of the dataset, e.g. candidate_profiles.json
+    dataset: Mapped[str] = mapped_column(String(64))
+    # None when the whole dataset changed, e.g. after a bulk import
+    record_id: Mapped[Optional[int]]
+    # Changes older than DB_CHANGES_RETENTION are deleted (see app.db.mirror.compact_changes)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.now, index=True)
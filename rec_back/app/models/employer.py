@@ -0,0 +1,27 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, JSONType
+
+if TYPE_CHECKING:
+    from app.models.job import Job
+
+
+class EmployerProfile(Base):
+    __tablename__ = "employer_profiles"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    company_name: Mapped[str] = mapped_column(String(255))
+    industry: Mapped[Optional[str]] = mapped_column(String(100))
+    size: Mapped[Optional[str]] = mapped_column(String(50))
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    website: Mapped[Optional[str]] = mapped_column(String(255))
+    logo_url: Mapped[Optional[str]] = mapped_column(String(512))
+    contact_details: Mapped[Dict[str, Any]] = mapped_column(JSONType, default=dict)
+    recruitment_history: Mapped[List[Dict[str, Any]]] = mapped_column(JSONType, default=list)
+
+    jobs: Mapped[List["Job"]] = relationship(back_populates="employer", lazy="raise")
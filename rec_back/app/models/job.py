@@ -0,0 +1,32 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, JSONType
+from app.models.employer import EmployerProfile
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    employer_id: Mapped[Optional[int]] = mapped_column(ForeignKey("employer_profiles.id", ondelete="SET NULL"), index=True)
+    title: Mapped[str] = mapped_column(String(255))
+    description: Mapped[str] = mapped_column(Text, default="")
+    responsibilities: Mapped[List[str]] = mapped_column(JSONType, default=list)
+    requirements: Mapped[List[str]] = mapped_column(JSONType, default=list)
+    location: Mapped[Optional[str]] = mapped_column(String(255))
+    contract_type: Mapped[Optional[str]] = mapped_column(String(50))
+    salary_range: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONType)
+    remote_option: Mapped[bool] = mapped_column(default=False)
+    posting_date: Mapped[Optional[date]] = mapped_column(default=date.today)
+    deadline: Mapped[Optional[date]]
+    # Lowercase, as the API reports and filters it
+    status: Mapped[str] = mapped_column(String(32), default="open", index=True)
+    # Ids of the skills the job asks for
+    skills: Mapped[List[int]] = mapped_column(JSONType, default=list)
+    office_id: Mapped[Optional[str]] = mapped_column(String(8), index=True)
+
+    employer: Mapped[Optional[EmployerProfile]] = relationship(back_populates="jobs", lazy="raise")
@@ -0,0 +1,347 @@
+import math
+import threading
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.data_store import MaterializedView
+from app.services.record_views import candidates_view, office_id_for, skill_names
+
+# Extract = (source record, related records) -> the column's value for that row
+Extract = Callable[[Dict[str, Any], Dict[str, Dict[Any, Dict[str, Any]]]], Any]
+
+# Rows the arrays start with, doubled whenever they are full
+INITIAL_CAPACITY = 1024
+
+
+def _fold(value: Any) -> str:
+    return str(value).strip().casefold()
+
+
+class Column:
+    """A column of a ColumnStore: one value per row slot, in numpy arrays"""
+
+    # Comparisons the column can filter on
+    operators: Tuple[str, ...] = ()
+
+    def __init__(self, extract: Extract):
+        self.extract = extract
+
+    def resize(self, capacity: int):
+        raise NotImplementedError
+
+    def assign(self, slots: np.ndarray, values: List[Any]):
+        raise NotImplementedError
+
+    def mask(self, operator: str, value: Any) -> np.ndarray:
+        raise NotImplementedError
+
+
+class NumberColumn(Column):
+    """Numbers, NaN when missing, filtered on ranges (bounds included)"""
+
+    operators = ("between",)
+
+    def __init__(self, extract: Extract):
+        super().__init__(extract)
+        self.values = np.full(INITIAL_CAPACITY, np.nan)
+
+    def resize(self, capacity: int):
+        grown = np.full(capacity, np.nan)
+        grown[:len(self.values)] = self.values
+        self.values = grown
+
+    def assign(self, slots: np.ndarray, values: List[Any]):
+        self.values[slots] = [value if isinstance(value, (int, float)) else math.nan for value in values]
+
+    def mask(self, operator: str, value: Tuple[Optional[float], Optional[float]]) -> np.ndarray:
+        low, high = value
+        # NaN compares False, so rows without a value never match a bound
+        mask = np.ones(len(self.values), dtype=bool)
+        if low is not None:
+            mask &= self.values >= low
+        if high is not None:
+            mask &= self.values <= high
+        return mask
+
+
+class FlagColumn(Column):
+    """Booleans, missing counts as False"""
+
+    operators = ("eq",)
+
+    def __init__(self, extract: Extract):
+        super().__init__(extract)
+        self.values = np.zeros(INITIAL_CAPACITY, dtype=bool)
+
+    def resize(self, capacity: int):
+        grown = np.zeros(capacity, dtype=bool)
+        grown[:len(self.values)] = self.values
+        self.values = grown
+
+    def assign(self, slots: np.ndarray, values: List[Any]):
+        self.values[slots] = [bool(value) for value in values]
+
+    def mask(self, operator: str, value: bool) -> np.ndarray:
+        return self.values == bool(value)
+
+
+class CategoryColumn(Column):
+    """
+    One string per row, compared case-insensitively. Strings are stored as codes into
+    a vocabulary, so that "in" filters compare small integers.
+    """
+
+    operators = ("in",)
+
+    def __init__(self, extract: Extract):
+        super().__init__(extract)
+        self.codes = np.full(INITIAL_CAPACITY, -1, dtype=np.int32)
+        self.vocabulary: Dict[str, int] = {}
+        # Codes of the values as found in records, to fold each distinct value only once
+        self._raw: Dict[Any, int] = {}
+
+    def resize(self, capacity: int):
+        grown = np.full(capacity, -1, dtype=np.int32)
+        grown[:len(self.codes)] = self.codes
+        self.codes = grown
+
+    def code(self, value: Any) -> int:
+        code = self._raw.get(value)
+        if code is None:
+            code = -1 if value is None or value == "" else self.vocabulary.setdefault(_fold(value), len(self.vocabulary))
+            self._raw[value] = code
+        return code
+
+    def assign(self, slots: np.ndarray, values: List[Any]):
+        self.codes[slots] = [self.code(value) for value in values]
+
+    def mask(self, operator: str, value: Iterable[Any]) -> np.ndarray:
+        codes = [self.vocabulary[folded] for folded in map(_fold, value) if folded in self.vocabulary]
+        return np.isin(self.codes, codes)
+
+
+class SetColumn(Column):
+    """
+    Several strings per row (skills, contract types...), compared case-insensitively.
+    Each row is a bitset over the column's vocabulary, packed in 64-bit words, so that
+    "all" and "any" filters are a few AND operations per row. Words are stored word-major:
+    a filter reads one contiguous array per word holding a requested value.
+    """
+
+    operators = ("all", "any")
+
+    def __init__(self, extract: Extract):
+        super().__init__(extract)
+        self.bits = np.zeros((1, INITIAL_CAPACITY), dtype=np.uint64)
+        self.vocabulary: Dict[str, int] = {}
+        # Bits of the values as found in records, to fold each distinct value only once
+        self._raw: Dict[Any, int] = {}
+
+    def resize(self, capacity: int):
+        grown = np.zeros((len(self.bits), capacity), dtype=np.uint64)
+        grown[:, :self.bits.shape[1]] = self.bits
+        self.bits = grown
+
+    def _bit(self, value: Any) -> int:
+        bit = self._raw.get(value)
+        if bit is None:
+            folded = _fold(value)
+            bit = self.vocabulary.get(folded)
+            if bit is None:
+                bit = self.vocabulary[folded] = len(self.vocabulary)
+                if bit >= len(self.bits) * 64:
+                    self.bits = np.vstack([self.bits, np.zeros_like(self.bits)])
+            self._raw[value] = bit
+        return bit
+
+    def assign(self, slots: np.ndarray, values: List[Any]):
+        self.bits[:, slots] = 0
+        raw = self._raw
+        rows, bits = [], []
+        for slot, row_values in zip(slots.tolist(), values):
+            if row_values:
+                rows.extend([slot] * len(row_values))
+                bits.extend([raw[value] if value in raw else self._bit(value) for value in row_values])
+        if rows:
+            bits = np.array(bits, dtype=np.uint64)
+            np.bitwise_or.at(self.bits, ((bits // 64).astype(np.intp), np.array(rows)), np.uint64(1) << (bits % 64))
+
+    def mask(self, operator: str, value: Iterable[Any]) -> np.ndarray:
+        required = np.zeros(len(self.bits), dtype=np.uint64)
+        for folded in map(_fold, value):
+            bit = self.vocabulary.get(folded)
+            if bit is None:
+                if operator == "all":
+                    # Nobody has a value that was never seen
+                    return np.zeros(self.bits.shape[1], dtype=bool)
+                continue
+            required[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+        # Only the words holding a requested bit need reading
+        mask = np.ones(self.bits.shape[1], dtype=bool) if operator == "all" else np.zeros(self.bits.shape[1], dtype=bool)
+        for word in np.flatnonzero(required).tolist():
+            selected = self.bits[word] & required[word]
+            if operator == "all":
+                mask &= selected == required[word]
+            else:
+                mask |= selected != 0
+        return mask
+
+
+class ColumnStore:
+    """
+    Columnar copy of the rows of a view, for structured queries: each filter is a
+    vectorized comparison over a whole column, and filters are combined as boolean masks.
+
+    Rows live in slots of the column arrays, reused when rows are removed. The store
+    follows the view: only the rows changed since the last query are rewritten.
+    """
+
+    def __init__(self, view: MaterializedView, columns: Dict[str, Column]):
+        self.view = view
+        self.columns = columns
+        self._lock = threading.RLock()
+        self._capacity = INITIAL_CAPACITY
+        # Slot -> row key and source record id, whether it holds a row, and the reverse mapping
+        self._keys: List[Optional[str]] = [None] * INITIAL_CAPACITY
+        self._ids = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._live = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._slots: Dict[Any, int] = {}
+        self._free = list(range(INITIAL_CAPACITY - 1, -1, -1))
+        view.subscribe(self._apply)
+
+    def _apply(self, record_ids: Set[Any], reset: bool):
+        with self._lock:
+            if reset:
+                self._slots = {}
+                self._free = list(range(self._capacity - 1, -1, -1))
+                self._keys = [None] * self._capacity
+                self._live[:] = False
+            for record_id in record_ids:
+                slot = self._slots.pop(record_id, None)
+                if slot is not None:
+                    self._live[slot] = False
+                    self._keys[slot] = None
+                    self._free.append(slot)
+
+            # Extract the changed rows, then write each column in one go
+            slots, values = [], {name: [] for name in self.columns}
+            for record_id in record_ids:
+                entry = self.view.entry(record_id)
+                if entry is None:
+                    continue
+                key, record, related = entry
+                slot = self._allocate()
+                self._slots[record_id] = slot
+                self._keys[slot] = key
+                self._ids[slot] = record_id if isinstance(record_id, int) else slot
+                slots.append(slot)
+                for name, column in self.columns.items():
+                    values[name].append(column.extract(record, related))
+            if slots:
+                slots = np.array(slots)
+                self._live[slots] = True
+                for name, column in self.columns.items():
+                    column.assign(slots, values[name])
+
+    def _allocate(self) -> int:
+        if not self._free:
+            capacity = self._capacity * 2
+            for column in self.columns.values():
+                column.resize(capacity)
+            self._keys.extend([None] * (capacity - self._capacity))
+            self._ids = np.concatenate([self._ids, np.zeros(capacity - self._capacity, dtype=np.int64)])
+            self._live = np.concatenate([self._live, np.zeros(capacity - self._capacity, dtype=bool)])
+            self._free = list(range(capacity - 1, self._capacity - 1, -1))
+            self._capacity = capacity
+        return self._free.pop()
+
+    def query(
+        self,
+        conditions: Sequence[Tuple[str, str, Any]],
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Tuple[int, List[str]]:
+        """
+        Keys of the rows matching every (column, operator, value) condition: the total number
+        of matches, and the keys from `skip` to `skip + limit`. Rows are ordered by record id,
+        or by a number column given as `sort` ("-column" for descending, missing values last).
+        Raises ValueError for unknown columns, operators or sort orders.
+        """
+        descending = bool(sort) and sort.startswith("-")
+        sort_column = self.columns.get(sort.lstrip("-")) if sort else None
+        if sort and not isinstance(sort_column, NumberColumn):
+            raise ValueError(f"Cannot sort on {sort}")
+        for name, operator, _ in conditions:
+            if name not in self.columns:
+                raise ValueError(f"Unknown column {name}")
+            if operator not in self.columns[name].operators:
+                raise ValueError(f"Unsupported operator {operator} for column {name}")
+
+        self.view.sync()
+        with self._lock:
+            mask = self._live.copy()
+            for name, operator, value in conditions:
+                mask &= self.columns[name].mask(operator, value)
+            slots = np.flatnonzero(mask)
+
+            # Only sort what the page needs: the first skip + limit rows
+            end = skip + limit
+            if sort_column is None:
+                keys = self._ids[slots]
+            else:
+                values = sort_column.values[slots]
+                keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+            if len(slots) > end:
+                # Every row up to the end-th smallest key, all the rows tied with it included:
+                # which of them make the page is then decided by id, not by the partition
+                kth = np.partition(keys, end - 1)[end - 1]
+                nearest = np.flatnonzero(keys <= kth)
+                slots, keys = slots[nearest], keys[nearest]
+            # Ties broken by record id, so that pages are stable
+            order = np.lexsort((self._ids[slots], keys))[skip:end]
+            return int(mask.sum()), [self._keys[slot] for slot in slots[order].tolist()]
+
+
+def _years_of_experience(candidate: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Optional[float]:
+    """Total length of the candidate's positions, current ones up to today"""
+    days = 0
+    found = False
+    for entry in candidate.get("experience") or []:
+        try:
+            start = date.fromisoformat(entry["start_date"])
+            end = date.fromisoformat(entry["end_date"]) if entry.get("end_date") else date.today()
+        except (KeyError, TypeError, ValueError):
+            continue
+        days += max((end - start).days, 0)
+        found = True
+    return round(days / 365.25, 2) if found else None
+
+
+def _preference(field: str) -> Extract:
+    return lambda candidate, related: (candidate.get("preferences") or {}).get(field)
+
+
+def _city(candidate: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Optional[str]:
+    # "Paris, France" is filed under Paris, the way desired locations are written
+    location = candidate.get("location")
+    return location.split(",")[0] if location else None
+
+
+candidate_columns = ColumnStore(
+    candidates_view,
+    {
+        "salary": NumberColumn(_preference("salary_expectation")),
+        "experience": NumberColumn(_years_of_experience),
+        "location": CategoryColumn(_city),
+        "office": CategoryColumn(lambda candidate, related: office_id_for(candidate["id"])),
+        "relocate": FlagColumn(_preference("willing_to_relocate")),
+        "contract_types": SetColumn(_preference("contract_types")),
+        "desired_locations": SetColumn(_preference("desired_locations")),
+        "sectors": SetColumn(_preference("desired_sectors")),
+        "skills": SetColumn(skill_names),
+    },
+)
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Collapse every run of whitespace so re-exported or re-pasted CVs hash the same
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_cv_text(cv_text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", cv_text)).strip()
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of CV analyses.
+
+    Entries are keyed by a hash of the normalized CV text plus the model and prompt
+    version that produced them. Recent entries live in a bounded in-memory LRU, all
+    of them in a local SQLite file, both with TTL and size-based eviction. Concurrent
+    requests for the same key share a single upstream call.
+    """
+
+    def __init__(self, path: Path, max_entries: int, max_disk_entries: int, ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        # key -> (created_at, analysis), most recently used last
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(cv_text: str, model: str, prompt_version: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, prompt_version, normalize_cv_text(cv_text)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Cached analysis for `key`, calling `compute` on a miss (shared, must not be mutated)"""
+        analysis = self._get_memory(key)
+        if analysis is not None:
+            self.memory_hits += 1
+            return analysis
+
+        # Join an identical request that is already being computed
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._load_or_compute(key, compute))
+        self._inflight[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+            else:
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+    async def _load_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, self._get_disk, key)
+        if entry is not None:
+            self.disk_hits += 1
+            self._put_memory(key, *entry)
+            return entry[1]
+
+        self.misses += 1
+        analysis = await compute()
+        created_at = time.time()
+        self._put_memory(key, created_at, analysis)
+        await loop.run_in_executor(None, self._put_disk, key, created_at, analysis)
+        return analysis
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry[1]
+
+    def _put_memory(self, key: str, created_at: float, analysis: Dict[str, Any]):
+        self._memory[key] = (created_at, analysis)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses "
+                "(key TEXT PRIMARY KEY, analysis TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS analyses_used_at ON analyses (used_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS analyses_created_at ON analyses (created_at)")
+        return self._db
+
+    def _get_disk(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        with self._db_lock:
+            try:
+                db = self._connection()
+                row = db.execute("SELECT analysis, created_at FROM analyses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if time.time() - row[1] > self.ttl:
+                    db.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                    db.commit()
+                    return None
+                db.execute("UPDATE analyses SET used_at = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+                return row[1], json.loads(row[0])
+            except Exception as e:
+                # The disk store only saves upstream calls, never fail a request because of it
+                print(f"Error reading CV analysis cache: {e}")
+                return None
+
+    def _put_disk(self, key: str, created_at: float, analysis: Dict[str, Any]):
+        with self._db_lock:
+            try:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO analyses (key, analysis, created_at, used_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(analysis), created_at, created_at),
+                )
+                # Evict expired entries, then the least recently used ones beyond the size limit
+                db.execute("DELETE FROM analyses WHERE created_at < ?", (time.time() - self.ttl,))
+                db.execute(
+                    "DELETE FROM analyses WHERE key IN "
+                    "(SELECT key FROM analyses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                db.commit()
+            except Exception as e:
+                print(f"Error writing CV analysis cache: {e}")
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
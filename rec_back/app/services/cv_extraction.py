@@ -0,0 +1,244 @@
+import os
+import tempfile
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from starlette.concurrency import run_in_threadpool
+
+# Multipart parsing ships with FastAPI form support, under its older name in old releases
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# PDF support is optional, uploads of other formats work without it
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Room for the boundaries and part headers of a multipart upload, on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Extracted text is cut at this length, far beyond any real CV
+MAX_TEXT_CHARS = 100_000
+
+# Ratio of uncompressed to compressed size above which a DOCX is treated as a zip bomb
+MAX_DOCX_EXPANSION = 100
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# File extensions and content types of the supported formats
+CV_FORMATS = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".txt": "txt",
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "txt",
+}
+
+
+class CVExtractionError(Exception):
+    """A CV file that cannot be turned into text, with the HTTP status to report it with"""
+
+    def __init__(self, detail: str, status_code: int = 422):
+        super().__init__(detail, status_code)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return CV_FORMATS.get(extension) or CV_FORMATS.get((content_type or "").split(";")[0].strip().lower())
+
+
+def extract_cv_text(path: str, cv_format: str, max_pages: int) -> str:
+    """Text of a CV file, as a module-level function that process pool workers can run"""
+    if cv_format == "pdf":
+        text = _extract_pdf(path, max_pages)
+    elif cv_format == "docx":
+        text = _extract_docx(path, max_pages)
+    else:
+        with open(path, "rb") as f:
+            text = f.read(MAX_TEXT_CHARS * 4).decode("utf-8-sig", errors="replace")
+    return text[:MAX_TEXT_CHARS].strip()
+
+
+def _extract_pdf(path: str, max_pages: int) -> str:
+    if PdfReader is None:
+        raise CVExtractionError("PDF uploads require the pypdf package", 415)
+    try:
+        reader = PdfReader(path)
+        if len(reader.pages) > max_pages:
+            raise CVExtractionError(f"A CV may have at most {max_pages} pages", 413)
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except CVExtractionError:
+        raise
+    except Exception as e:
+        raise CVExtractionError(f"Invalid PDF file: {str(e)}")
+
+
+def _extract_docx(path: str, max_pages: int) -> str:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            info = archive.getinfo("word/document.xml")
+            if info.file_size > max(info.compress_size, 1) * MAX_DOCX_EXPANSION:
+                raise CVExtractionError("Invalid DOCX file: suspicious compression ratio")
+
+            # Stream the document XML: a paragraph per line, stopping at the page limit
+            lines = []
+            paragraph = []
+            pages = 1
+            length = 0
+            with archive.open(info) as document:
+                for _, element in ElementTree.iterparse(document):
+                    tag = element.tag
+                    if tag == _WORD_NAMESPACE + "t":
+                        paragraph.append(element.text or "")
+                    elif tag == _WORD_NAMESPACE + "tab":
+                        paragraph.append("\t")
+                    elif tag == _WORD_NAMESPACE + "br":
+                        if element.get(_WORD_NAMESPACE + "type") == "page":
+                            pages += 1
+                            if pages > max_pages:
+                                raise CVExtractionError(f"A CV may have at most {max_pages} pages", 413)
+                        else:
+                            paragraph.append("\n")
+                    elif tag == _WORD_NAMESPACE + "p":
+                        lines.append("".join(paragraph))
+                        paragraph = []
+                        element.clear()
+                        length += len(lines[-1]) + 1
+                        if length >= MAX_TEXT_CHARS:
+                            break
+            return "\n".join(lines)
+    except CVExtractionError:
+        raise
+    except (KeyError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+        raise CVExtractionError(f"Invalid DOCX file: {str(e)}")
+
+
+class _CVUpload:
+    """
+    Multipart parser callbacks collecting the file field's data as it arrives, for flush()
+    to write it to a temporary file off the event loop
+    """
+
+    def __init__(self, field: str, max_bytes: int):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.cv_format: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self._file = None
+        # Data received since the last flush, and whether the file part is complete
+        self._chunks: List[bytes] = []
+        self._receiving = False
+        self._ended = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._headers.clear,
+            "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _header_end(self):
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.cv_format is not None or options.get(b"name", b"").decode("latin-1") != self.field:
+            return
+        self.filename = options.get(b"filename", b"").decode("utf-8", errors="replace")
+        content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+        self.cv_format = detect_format(self.filename, content_type)
+        if self.cv_format is None:
+            raise CVExtractionError("Unsupported file type, upload a PDF, DOCX or TXT file", 415)
+        self._receiving = True
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if not self._receiving:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise CVExtractionError(f"A CV file may be at most {self.max_bytes} bytes", 413)
+        self._chunks.append(data[start:end])
+
+    def _part_end(self):
+        if self._receiving:
+            self._receiving = False
+            self._ended = True
+
+    async def flush(self):
+        """Write the data received so far to the temporary file, in a worker thread"""
+        if self._chunks or (self._ended and self.path is None):
+            await run_in_threadpool(self._write)
+
+    def _write(self):
+        if self.path is None:
+            fd, self.path = tempfile.mkstemp(suffix=f".{self.cv_format}")
+            self._file = os.fdopen(fd, "wb")
+        chunks, self._chunks = self._chunks, []
+        self._file.writelines(chunks)
+        if self._ended:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        self._chunks = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            os.unlink(self.path)
+
+
+async def receive_cv_upload(content_type: str, body: AsyncIterator[bytes], max_bytes: int, field: str = "file") -> Tuple[str, str, str]:
+    """
+    Copy the `field` file of a multipart/form-data request body to a temporary file while
+    the body is received, stopping as soon as it is larger than `max_bytes`. Returns the
+    file name, its CV format and the path of the temporary file, for the caller to delete.
+    """
+    media_type, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if media_type != b"multipart/form-data" or not boundary:
+        raise CVExtractionError("Expected a multipart/form-data body with a file field", 400)
+
+    upload = _CVUpload(field, max_bytes)
+    parser = MultipartParser(boundary, upload.callbacks())
+    received = 0
+    try:
+        async for chunk in body:
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise CVExtractionError(f"A CV file may be at most {max_bytes} bytes", 413)
+            parser.write(chunk)
+            await upload.flush()
+        parser.finalize()
+        await upload.flush()
+    except CVExtractionError:
+        upload.discard()
+        raise
+    except Exception as e:
+        upload.discard()
+        raise CVExtractionError(f"Invalid multipart body: {str(e)}", 400)
+
+    if upload.path is None:
+        raise CVExtractionError(f"Missing the {field} field", 422)
+    return upload.filename, upload.cv_format, upload.path
@@ -0,0 +1,495 @@
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Directory holding the JSON datasets (relative to the backend root, like the rest of the app)
+DATA_DIR = Path("fake_data")
+
+# Number of reloads a dataset remembers the changed ids of, so views can catch up incrementally
+CHANGE_LOG_SIZE = 32
+
+
+class _Snapshot:
+    """Immutable view of a dataset at one point in time"""
+
+    __slots__ = ("signature", "records", "by_id", "version", "digest", "_unique")
+
+    def __init__(self, signature: Optional[Tuple[int, int]], records: List[Dict[str, Any]], version: int, digest: str = ""):
+        self.signature = signature
+        self.records = records
+        self.by_id = {record.get("id"): record for record in records}
+        # Monotonic within this process, and a hash of the file content that is the same in every process
+        self.version = version
+        self.digest = digest
+        self._unique: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def unique(self, field: str) -> Dict[str, Dict[str, Any]]:
+        """Index of the records by the string form of a unique field, built once per snapshot"""
+        index = self._unique.get(field)
+        if index is None:
+            index = {str(record[field]): record for record in self.records if record.get(field) is not None}
+            self._unique[field] = index
+        return index
+
+
+class Dataset:
+    """A JSON dataset loaded once and served from memory until the file changes on disk (or replace() is called)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(None, [], 0)
+        # (version, ids changed by the reload that produced that version)
+        self._change_log = deque(maxlen=CHANGE_LOG_SIZE)
+        # Set once the records come from elsewhere (see replace), the file is no longer read
+        self._detached = False
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def snapshot(self) -> _Snapshot:
+        """Return the current snapshot, reloading the file first if its mtime or size changed"""
+        snapshot = self._snapshot
+        if self._detached:
+            return snapshot
+        signature = self._file_signature()
+        if signature is not None and signature != snapshot.signature:
+            snapshot = self._reload(signature)
+        return snapshot
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Get the records of the dataset (shared, must not be mutated by callers)"""
+        return self.snapshot().records
+
+    def get_by(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Find a record by a unique field, e.g. get_by("id", "3") or get_by("email", ...)"""
+        return self.snapshot().unique(field).get(str(value))
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    def changes_since(self, version: int) -> Optional[Set[Any]]:
+        """
+        Ids of the records added, updated or removed after `version`.
+        Returns None when the change log no longer reaches back that far.
+        """
+        current = self.snapshot().version
+        if version == current:
+            return set()
+
+        changed = set()
+        expected = version + 1
+        for entry_version, ids in list(self._change_log):
+            if entry_version <= version:
+                continue
+            if entry_version != expected:
+                return None
+            changed |= ids
+            expected += 1
+        return changed if expected == current + 1 else None
+
+    def _reload(self, signature: Tuple[int, int]) -> _Snapshot:
+        with self._lock:
+            # Another request may have reloaded the file while we were waiting
+            current = self._snapshot
+            if current.signature == signature:
+                return current
+
+            try:
+                with open(self.path, "rb") as f:
+                    content = f.read()
+                records = json.loads(content)
+            except Exception as e:
+                # Keep serving the previous snapshot (e.g. the file is half written),
+                # the next request will retry since the signature was not recorded
+                print(f"Error loading {self.path.name}: {e}")
+                return current
+
+            digest = hashlib.blake2b(content, digest_size=8).hexdigest()
+            return self._publish(_Snapshot(signature, records, current.version + 1, digest))
+
+    def replace(self, records: List[Dict[str, Any]], digest: str) -> _Snapshot:
+        """Serve `records` instead of the file's from now on, e.g. the rows of a database table"""
+        with self._lock:
+            self._detached = True
+            return self._publish(_Snapshot(None, records, self._snapshot.version + 1, digest))
+
+    def apply(self, upserts: List[Dict[str, Any]], removed: Set[Any], digest: str) -> _Snapshot:
+        """Add or replace the `upserts` records and drop the `removed` ids, like replace() for a few records"""
+        with self._lock:
+            self._detached = True
+            current = self._snapshot
+            pending = {record["id"]: record for record in upserts}
+            records = [pending.pop(record.get("id"), record) for record in current.records if record.get("id") not in removed]
+            records.extend(pending.values())
+            snapshot = _Snapshot(None, records, current.version + 1, digest)
+            return self._publish(snapshot, {record["id"] for record in upserts} | set(removed))
+
+    def _publish(self, snapshot: _Snapshot, changed: Optional[Set[Any]] = None) -> _Snapshot:
+        # Work out which records actually changed so dependants only rebuild those
+        if changed is None:
+            old_by_id = self._snapshot.by_id
+            changed = {record_id for record_id, record in snapshot.by_id.items() if old_by_id.get(record_id) != record}
+            changed.update(record_id for record_id in old_by_id if record_id not in snapshot.by_id)
+        self._change_log.append((snapshot.version, changed))
+
+        # Publish the new snapshot with a single assignment so concurrent
+        # readers see either the old or the new data, never a mix of both
+        self._snapshot = snapshot
+        return snapshot
+
+
+class DataStore:
+    """Registry of the datasets shared by every router and service"""
+
+    def __init__(self, data_dir: Path = DATA_DIR):
+        self.data_dir = data_dir
+        self._datasets: Dict[str, Dataset] = {}
+        self._lock = threading.Lock()
+
+    def dataset(self, filename: str) -> Dataset:
+        dataset = self._datasets.get(filename)
+        if dataset is None:
+            with self._lock:
+                dataset = self._datasets.get(filename)
+                if dataset is None:
+                    dataset = Dataset(self.data_dir / filename)
+                    self._datasets[filename] = dataset
+        return dataset
+
+    def load(self, filename: str) -> List[Dict[str, Any]]:
+        return self.dataset(filename).records()
+
+
+class MaterializedView:
+    """
+    Denormalized, frontend-shaped rows built from a dataset and kept up to date incrementally.
+
+    Each row is built from one record of the `source` dataset, on first use, and
+    cached until that record changes. `dependencies` maps the other datasets a row
+    reads to a function returning the ids of the related records, so that a change
+    to e.g. one user only invalidates the rows that use it.
+
+    `indexes` maps row fields to a function computing the field's value from the
+    source record, so that queries can filter and paginate on record ids and only
+    format the rows of the page they return.
+    """
+
+    def __init__(
+        self,
+        store: DataStore,
+        source: str,
+        build: Callable[[Dict[str, Any], Dict[str, Dict[Any, Dict[str, Any]]]], Optional[Dict[str, Any]]],
+        dependencies: Optional[Dict[str, Callable[[Dict[str, Any]], Iterable[Any]]]] = None,
+        key: Callable[[Dict[str, Any]], str] = lambda record: str(record["id"]),
+        include: Optional[Callable[[Dict[str, Any], Dict[str, Dict[Any, Dict[str, Any]]]], bool]] = None,
+        indexes: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None,
+    ):
+        """
+        `build(record, related)` formats one source record, `related` maps each dependency
+        filename to its records by id. `include(record, related)` tells, without formatting,
+        whether the record has a row at all (build must then not return None).
+        `key(record)` is the id the row is looked up by (e.g. "comp-1" for companies).
+        """
+        self.store = store
+        self.source = source
+        self.build = build
+        self.dependencies = dependencies or {}
+        self.key = key
+        self.include = include or (lambda record, related: True)
+        self.indexes = indexes or {}
+        self._lock = threading.RLock()
+        self._versions: Optional[Dict[str, int]] = None
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._related: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        # Source record id -> built row
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+        # Row key -> source record id, and the reverse
+        self._keys: Dict[str, Any] = {}
+        self._key_of: Dict[Any, str] = {}
+        # Dependency dataset -> related record id -> source record ids reading it
+        self._dependants: Dict[str, Dict[Any, Set[Any]]] = {name: {} for name in self.dependencies}
+        # Source record id -> dependency dataset -> related record ids
+        self._references: Dict[Any, Dict[str, List[Any]]] = {}
+        # Secondary indexes: field -> value -> source record ids, and the values of each record
+        self._index: Dict[str, Dict[Any, Set[Any]]] = {field: {} for field in self.indexes}
+        self._indexed: Dict[Any, Dict[str, Any]] = {}
+        # Ids in source order, per index bucket, built on demand from the sets above
+        self._sorted: Dict[Tuple[str, Any], List[Any]] = {}
+        self._positions: Dict[Any, int] = {}
+        self._order: Optional[List[Any]] = None
+        self._row_list: Optional[List[Dict[str, Any]]] = None
+        self._listeners: List[Callable[[Set[Any], bool], None]] = []
+
+    @property
+    def version(self) -> Tuple[int, ...]:
+        """Versions of the datasets the rows are built from, changes whenever a row may have"""
+        return tuple(self.store.dataset(name).version for name in (self.source, *self.dependencies))
+
+    @property
+    def digest(self) -> str:
+        """Content hashes of the datasets the rows are built from, the same in every process"""
+        return "-".join(self.store.dataset(name).snapshot().digest for name in (self.source, *self.dependencies))
+
+    def sync(self):
+        """Catch up with the datasets now rather than on the next read"""
+        with self._lock:
+            self._sync()
+
+    def subscribe(self, listener: Callable[[Set[Any], bool], None]):
+        """
+        Call `listener(record_ids, reset)` on every sync that changes rows, with the source
+        record ids whose rows were added, updated or removed; `reset` when all rows were
+        rebuilt and the ids are every current record. Listeners read the rows' data with entry().
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            if self._versions is not None:
+                listener(set(self._snapshots[self.source].by_id), True)
+
+    def entry(self, record_id: Any) -> Optional[Tuple[str, Dict[str, Any], Dict[str, Dict[Any, Dict[str, Any]]]]]:
+        """Key, source record and related records of a row, None if the record has no row"""
+        with self._lock:
+            if record_id not in self._indexed:
+                return None
+            return self._key_of[record_id], self._snapshots[self.source].by_id[record_id], self._related
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """All rows in source order (shared, must not be mutated by callers)"""
+        with self._lock:
+            self._sync()
+            if self._row_list is None:
+                self._row_list = [self._row(record_id) for record_id in self._ordered_ids()]
+            return self._row_list
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a single row up by its key without building the rest of the view"""
+        with self._lock:
+            self._sync()
+            record_id = self._keys.get(key)
+            if record_id is None or record_id not in self._indexed:
+                return None
+            return self._row(record_id)
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rows matching every (indexed field == value) filter, in source order.
+        Filters with an empty value are ignored, like the `if office_id:` checks they replace.
+        `after` is a source position (see position_of) to resume from, for keyset pagination.
+        """
+        with self._lock:
+            self._sync()
+            ids = self._match(filters or {}, after)
+            stop = None if limit is None else skip + limit
+            return [self._row(record_id) for record_id in islice(ids, skip, stop)]
+
+    def page(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+        after: Optional[int] = None,
+        skip: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Like query(), also returning the source position of the last row to resume after"""
+        with self._lock:
+            self._sync()
+            ids = list(islice(self._match(filters or {}, after), skip, skip + limit))
+            last_position = self._positions[ids[-1]] if ids else None
+            return [self._row(record_id) for record_id in ids], last_position
+
+    def position_of(self, key: str) -> Optional[int]:
+        """Position in source order of the row with this key, None if it no longer exists"""
+        with self._lock:
+            self._sync()
+            record_id = self._keys.get(key)
+            return self._positions.get(record_id) if record_id is not None else None
+
+    def _match(self, filters: Dict[str, Any], after: Optional[int] = None) -> Iterable[Any]:
+        """Plan a query: walk the smallest matching bucket from `after` on and probe the others"""
+        buckets = []
+        for field, value in filters.items():
+            if not value:
+                continue
+            bucket = self._index[field].get(value)
+            if not bucket:
+                return iter(())
+            buckets.append((field, value, bucket))
+
+        if not buckets:
+            ids = self._ordered_ids()
+            others = []
+        else:
+            buckets.sort(key=lambda entry: len(entry[2]))
+            field, value, _ = buckets[0]
+            ids = self._sorted_bucket(field, value)
+            others = [bucket for _, _, bucket in buckets[1:]]
+
+        start = self._first_after(ids, after) if after is not None else 0
+        # Indexed from `start`, so that resuming after a cursor costs the binary search only
+        matches = (ids[index] for index in range(start, len(ids)))
+        if not others:
+            return matches
+        return (record_id for record_id in matches if all(record_id in bucket for bucket in others))
+
+    def _first_after(self, ids: List[Any], position: int) -> int:
+        """Index of the first id positioned after `position` in a list sorted by position"""
+        low, high = 0, len(ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self._positions[ids[middle]] <= position:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _ordered_ids(self) -> List[Any]:
+        if self._order is None:
+            records = self._snapshots[self.source].records
+            self._order = [record.get("id") for record in records if record.get("id") in self._indexed]
+        return self._order
+
+    def _sorted_bucket(self, field: str, value: Any) -> List[Any]:
+        ids = self._sorted.get((field, value))
+        if ids is None:
+            ids = sorted(self._index[field].get(value, ()), key=self._positions.__getitem__)
+            self._sorted[(field, value)] = ids
+        return ids
+
+    def _row(self, record_id: Any) -> Dict[str, Any]:
+        row = self._rows.get(record_id)
+        if row is None:
+            record = self._snapshots[self.source].by_id[record_id]
+            row = self.build(record, self._related)
+            self._rows[record_id] = row
+        return row
+
+    def _sync(self):
+        names = [self.source, *self.dependencies]
+        snapshots = {name: self.store.dataset(name).snapshot() for name in names}
+        versions = {name: snapshot.version for name, snapshot in snapshots.items()}
+        if versions == self._versions:
+            return
+
+        dirty = self._dirty_ids(versions)
+        reset = dirty is None
+        if reset:
+            self._rows = {}
+            self._keys = {}
+            self._key_of = {}
+            self._dependants = {name: {} for name in self.dependencies}
+            self._references = {}
+            self._index = {field: {} for field in self.indexes}
+            self._indexed = {}
+            dirty = set(snapshots[self.source].by_id)
+
+        source = snapshots[self.source]
+        self._snapshots = snapshots
+        self._related = {name: snapshots[name].by_id for name in self.dependencies}
+
+        if self._versions is None or versions[self.source] != self._versions[self.source]:
+            self._positions = {record.get("id"): position for position, record in enumerate(source.records)}
+            self._sorted = {}
+            self._order = None
+            self._row_list = None
+
+        for record_id in dirty:
+            self._unlink(record_id)
+            record = source.by_id.get(record_id)
+            if record is not None:
+                self._link(record_id, record)
+
+        if dirty:
+            self._order = None
+            self._row_list = None
+        self._versions = versions
+        if dirty or reset:
+            for listener in self._listeners:
+                listener(dirty, reset)
+
+    def _dirty_ids(self, versions: Dict[str, int]) -> Optional[Set[Any]]:
+        """Source record ids whose rows are stale, or None if everything must be rebuilt"""
+        if self._versions is None:
+            return None
+
+        dirty = set()
+        for name, version in versions.items():
+            if version == self._versions[name]:
+                continue
+            changed = self.store.dataset(name).changes_since(self._versions[name])
+            if changed is None:
+                return None
+            if name == self.source:
+                dirty |= changed
+            else:
+                dependants = self._dependants[name]
+                for related_id in changed:
+                    dirty |= dependants.get(related_id, set())
+        return dirty
+
+    def _link(self, record_id: Any, record: Dict[str, Any]):
+        key = self.key(record)
+        self._keys[key] = record_id
+        self._key_of[record_id] = key
+
+        references = {}
+        for name, related in self.dependencies.items():
+            related_ids = list(related(record))
+            references[name] = related_ids
+            for related_id in related_ids:
+                self._dependants[name].setdefault(related_id, set()).add(record_id)
+        self._references[record_id] = references
+
+        if not self.include(record, self._related):
+            return
+        values = {field: value_of(record) for field, value_of in self.indexes.items()}
+        for field, value in values.items():
+            self._index[field].setdefault(value, set()).add(record_id)
+            self._sorted.pop((field, value), None)
+        self._indexed[record_id] = values
+
+    def _unlink(self, record_id: Any):
+        self._rows.pop(record_id, None)
+
+        key = self._key_of.pop(record_id, None)
+        if key is not None and self._keys.get(key) == record_id:
+            del self._keys[key]
+
+        references = self._references.pop(record_id, {})
+        for name, related_ids in references.items():
+            for related_id in related_ids:
+                dependants = self._dependants[name].get(related_id)
+                if dependants:
+                    dependants.discard(record_id)
+
+        values = self._indexed.pop(record_id, {})
+        for field, value in values.items():
+            bucket = self._index[field].get(value)
+            if bucket is not None:
+                bucket.discard(record_id)
+                if not bucket:
+                    del self._index[field][value]
+            self._sorted.pop((field, value), None)
+
+
+data_store = DataStore()
+
+
+def load_data(filename: str) -> List[Dict[str, Any]]:
+    """Get the records of a fake_data JSON file from the shared in-memory store"""
+    return data_store.load(filename)
@@ -0,0 +1,67 @@
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+# {{placeholder}} markers of the email templates
+PLACEHOLDER = re.compile(r"{{([^}]+)}}")
+
+
+def format_value(key: str, value: Any) -> str:
+    return str(value)
+
+
+def format_body_value(key: str, value: Any) -> str:
+    # Matching skills are listed one per line in template emails
+    if isinstance(value, list) and key == "matching_skills":
+        return "\n".join([f"- {skill}" for skill in value])
+    return str(value)
+
+
+def format_inline_value(key: str, value: Any) -> str:
+    # ...and inline in the drafts handed to the LLM
+    if isinstance(value, list) and key == "matching_skills":
+        return ", ".join(value)
+    return str(value)
+
+
+class CompiledTemplate:
+    """A template split once into literal text and placeholders, rendered in a single pass"""
+
+    __slots__ = ("source", "parts", "placeholders")
+
+    def __init__(self, source: str):
+        self.source = source
+        # Literal text at even positions, placeholder names at odd ones
+        self.parts = PLACEHOLDER.split(source)
+        self.placeholders = list(dict.fromkeys(self.parts[1::2]))
+
+    def render(self, context: Dict[str, Any], formatter: Callable[[str, Any], str] = format_value) -> str:
+        """Fill in the placeholders found in `context`, leaving the others untouched"""
+        parts = list(self.parts)
+        for position in range(1, len(parts), 2):
+            key = parts[position]
+            if key in context:
+                parts[position] = formatter(key, context[key])
+            else:
+                parts[position] = "{{" + key + "}}"
+        return "".join(parts)
+
+
+class EmailTemplate:
+    """An entry of email_templates.json with its subject and body compiled"""
+
+    __slots__ = ("id", "subject", "body")
+
+    def __init__(self, record: Dict[str, Any]):
+        self.id = record["id"]
+        self.subject = CompiledTemplate(record["subject"])
+        self.body = CompiledTemplate(record["template"])
+
+    def render(self, context: Dict[str, Any], body_formatter: Callable[[str, Any], str] = format_body_value) -> Dict[str, str]:
+        return {
+            "subject": self.subject.render(context),
+            "body": self.body.render(context, body_formatter)
+        }
+
+
+def compile_templates(records: List[Dict[str, Any]]) -> Dict[str, EmailTemplate]:
+    return {record["id"]: EmailTemplate(record) for record in records}
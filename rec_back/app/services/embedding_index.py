@@ -0,0 +1,430 @@
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.data_store import DataStore, data_store
+
+# Bump whenever tokenization or weighting changes, so persisted indexes are rebuilt
+EMBEDDING_FORMAT_VERSION = 1
+
+# Below this many jobs every query is an exact scan (a few milliseconds), above it jobs are clustered
+IVF_MIN_ROWS = 10000
+
+# Rebuild vocabulary weights and clusters once this share of the rows changed since the last build
+REBUILD_RATIO = 0.25
+
+# Rows changed before updates are written to disk again, the rest is caught up on load from
+# the digests of the job texts
+SAVE_AFTER_CHANGES = 100
+
+KMEANS_ITERATIONS = 10
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this "
+    "to we will with you your who what which able work working team".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _texts(value: Any) -> Iterable[str]:
+    # Flatten strings out of the nested lists/dicts found in jobs and CV analyses
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _texts(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _texts(item)
+    elif value is not None:
+        yield str(value)
+
+
+def job_text(job: Dict[str, Any]) -> str:
+    # The title is repeated to weigh it above the body text
+    parts = [job.get("title", ""), job.get("title", ""), job.get("description", "")]
+    parts.extend(_texts(job.get("requirements", [])))
+    parts.extend(_texts(job.get("responsibilities", [])))
+    return "\n".join(parts)
+
+
+def cv_text(cv_analysis: Dict[str, Any]) -> str:
+    parts = list(_texts(cv_analysis.get("skills", [])))
+    parts.extend(_texts(cv_analysis.get("summary", "")))
+    parts.extend(_texts(cv_analysis.get("experience", [])))
+    parts.extend(_texts(cv_analysis.get("education", [])))
+    return "\n".join(parts)
+
+
+def _digest(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class HashedTfidf:
+    """
+    Hashed TF-IDF embedding: unigrams and bigrams are hashed (with a sign, to cancel
+    out collisions) into a fixed number of dimensions, weighted by sublinear term
+    frequency and inverse document frequency, and L2-normalized.
+    """
+
+    def __init__(self, dim: int, idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    def features(self, text: str) -> Counter:
+        tokens = tokenize(text)
+        grams = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        features: Counter = Counter()
+        for gram in grams:
+            features[zlib.crc32(gram.encode("utf-8"))] += 1
+        return features
+
+    def fit(self, texts: List[str]):
+        """Learn the inverse document frequency of each dimension from a corpus"""
+        document_frequency = np.zeros(self.dim, dtype=np.float64)
+        for text in texts:
+            buckets = {feature % self.dim for feature in self.features(text)}
+            document_frequency[list(buckets)] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in self.features(text).items():
+            bucket = feature % self.dim
+            sign = 1.0 if (feature >> 31) & 1 else -1.0
+            vector[bucket] += sign * (1 + math.log(count)) * self.idf[bucket]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.embed(text)
+        return matrix
+
+
+def _grown(array: np.ndarray, rows: int) -> np.ndarray:
+    """`array` if it has room for `rows` rows, else a copy with a quarter more spare capacity"""
+    if len(array) >= rows:
+        return array
+    grown = np.zeros((max(rows, len(array) + len(array) // 4 + 64), *array.shape[1:]), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class _IvfState:
+    """
+    Job vectors of one build, clustered into inverted lists for approximate search.
+
+    States are never changed once published: updates return a new state, which appends
+    new and re-embedded jobs past the `size` rows of this one (in the spare capacity of
+    the shared arrays) and only copies the small `alive` mask. Searches still running on
+    an older state therefore never see a half-updated row.
+    """
+
+    def __init__(self, embedder: HashedTfidf, ids: List[Any], digests: np.ndarray, vectors: np.ndarray,
+                 alive: np.ndarray, centroids: np.ndarray, assignments: np.ndarray, built_rows: int,
+                 size: Optional[int] = None, row_of: Optional[Dict[Any, int]] = None):
+        self.embedder = embedder
+        self.ids = ids
+        self.size = len(ids) if size is None else size
+        # Current row of each job, only read and written by updates (under the index lock)
+        self.row_of = row_of if row_of is not None else {job_id: row for row, job_id in enumerate(ids)}
+        self.digests = digests
+        self.vectors = vectors
+        self.alive = alive
+        self.centroids = centroids
+        self.assignments = assignments
+        # Live rows when the weights and clusters were computed, and rows changed since
+        self.built_rows = built_rows
+        self.changed_rows = 0
+        self._lists: Optional[List[np.ndarray]] = None
+
+    @property
+    def lists(self) -> List[np.ndarray]:
+        """Live rows of each cluster"""
+        if self._lists is None:
+            live = np.flatnonzero(self.alive[:self.size])
+            order = live[np.argsort(self.assignments[live], kind="stable")]
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[cluster]:bounds[cluster + 1]] for cluster in range(len(self.centroids))]
+        return self._lists
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        if len(self.centroids) <= 1 or not len(vectors):
+            return np.zeros(len(vectors), dtype=np.int32)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def updated(self, removed: Iterable[Any], upserts: List[Tuple[Any, int, np.ndarray]]) -> "_IvfState":
+        """A new state without the `removed` jobs, and with the (job id, digest, vector) `upserts`"""
+        size = self.size + len(upserts)
+        vectors = _grown(self.vectors, size)
+        digests = _grown(self.digests, size)
+        assignments = _grown(self.assignments, size)
+        alive = np.zeros(len(vectors), dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        # Rows past this state's size belong to no published state (e.g. an update that failed)
+        del self.ids[self.size:]
+
+        changed = 0
+        for job_id in removed:
+            row = self.row_of.pop(job_id, None)
+            if row is not None and alive[row]:
+                alive[row] = False
+                changed += 1
+        if upserts:
+            new_vectors = np.stack([vector for _, _, vector in upserts])
+            for row, (job_id, digest, _) in enumerate(upserts, start=self.size):
+                previous = self.row_of.get(job_id)
+                if previous is not None:
+                    alive[previous] = False
+                self.row_of[job_id] = row
+                self.ids.append(job_id)
+                digests[row] = digest
+            vectors[self.size:size] = new_vectors
+            assignments[self.size:size] = self.assign(new_vectors)
+            alive[self.size:size] = True
+            changed += len(upserts)
+
+        state = _IvfState(self.embedder, self.ids, digests, vectors, alive, self.centroids, assignments,
+                          self.built_rows, size=size, row_of=self.row_of)
+        state.changed_rows = self.changed_rows + changed
+        return state
+
+    def search(self, query: np.ndarray, top_k: int, nprobe: int):
+        """(row, cosine similarity) of the top_k rows closest to a normalized query vector"""
+        if len(self.centroids) > 1:
+            probes = np.argsort(-(self.centroids @ query))[:nprobe]
+            rows = np.concatenate([self.lists[cluster] for cluster in probes])
+            scores = self.vectors[rows] @ query
+        else:
+            # Exact scan, cheaper on the whole matrix than on a copy of the live rows
+            rows = self.lists[0]
+            scores = (self.vectors[:self.size] @ query)[rows]
+        if not len(rows):
+            return []
+
+        if top_k < len(rows):
+            best = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            best = np.arange(len(rows))
+        # Best score first, ties in catalog order
+        best = best[np.lexsort((rows[best], -scores[best]))]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+
+def _kmeans(vectors: np.ndarray, clusters: int) -> np.ndarray:
+    """Spherical k-means centroids of normalized vectors (deterministic seeding)"""
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm:
+                    centroids[cluster] = centroid / norm
+    return centroids
+
+
+class SemanticJobIndex:
+    """
+    Offline semantic matching of CVs against jobs.
+
+    Jobs are embedded with a hashed TF-IDF model and kept in an IVF index (k-means
+    clusters, of which only the closest few are scanned per query). The index is
+    persisted under CACHE_DIR and kept in sync with jobs.json: changed jobs are
+    re-embedded into a new state swapped in under the lock, and everything is rebuilt
+    once enough of them changed.
+    """
+
+    def __init__(self, store: DataStore, path: Path, dim: int, nprobe: int):
+        self.store = store
+        self.path = path
+        self.dim = dim
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._state: Optional[_IvfState] = None
+        self._version = -1
+        # changed_rows of the state last written to disk
+        self._saved_changes = 0
+
+    def refresh(self) -> _IvfState:
+        """Bring the index up to date with jobs.json, loading or building it on first use"""
+        dataset = self.store.dataset("jobs.json")
+        snapshot = dataset.snapshot()
+        state = self._state
+        if state is not None and self._version == snapshot.version:
+            return state
+
+        with self._lock:
+            snapshot = dataset.snapshot()
+            state = self._state
+            if state is not None and self._version == snapshot.version:
+                return state
+
+            if state is None:
+                state = self._load()
+                changed = None
+            else:
+                changed = dataset.changes_since(self._version)
+
+            if state is None:
+                state = self._build(snapshot.records)
+            else:
+                state = self._update(state, snapshot, changed)
+            self._state = state
+            self._version = snapshot.version
+            return state
+
+    def search(self, cv_analysis: Dict[str, Any], top_k: int = 10) -> List[Dict[str, Any]]:
+        """Jobs closest to a CV analysis, best first"""
+        state = self.refresh()
+        query = state.embedder.embed(cv_text(cv_analysis))
+        if not query.any():
+            return []
+
+        jobs = self.store.dataset("jobs.json").snapshot().by_id
+        skills = [skill for skill in cv_analysis.get("skills", []) if isinstance(skill, str)]
+        matches = []
+        for row, score in state.search(query, top_k, self.nprobe):
+            job = jobs.get(state.ids[row])
+            if job is None or score <= 0:
+                continue
+            text = job_text(job).lower()
+            matches.append({
+                "job_id": job["id"],
+                "job_title": job["title"],
+                "employer_id": job["employer_id"],
+                "match_score": round(score * 100, 1),
+                "matching_skills": [skill for skill in skills if skill.lower() in text]
+            })
+        return matches
+
+    def _build(self, jobs: List[Dict[str, Any]]) -> _IvfState:
+        texts = [job_text(job) for job in jobs]
+        embedder = HashedTfidf(self.dim)
+        embedder.fit(texts)
+        vectors = embedder.embed_many(texts)
+
+        clusters = int(math.sqrt(len(jobs))) if len(jobs) >= IVF_MIN_ROWS else 1
+        centroids = _kmeans(vectors, clusters) if clusters > 1 else np.zeros((1, self.dim), dtype=np.float32)
+        state = _IvfState(
+            embedder,
+            ids=[job["id"] for job in jobs],
+            digests=np.array([_digest(text) for text in texts], dtype=np.uint32),
+            vectors=vectors,
+            alive=np.ones(len(jobs), dtype=bool),
+            centroids=centroids,
+            assignments=np.zeros(len(jobs), dtype=np.int32),
+            built_rows=len(jobs),
+        )
+        state.assignments = state.assign(vectors)
+        self._save(state)
+        return state
+
+    def _update(self, state: _IvfState, snapshot, changed) -> _IvfState:
+        jobs = snapshot.by_id
+        if changed is None:
+            # Loaded from disk or too far behind: compare every job with the text it was embedded from
+            changed = {job_id for job_id in state.ids if job_id not in jobs}
+            for job_id, job in jobs.items():
+                row = state.row_of.get(job_id)
+                if row is None or not state.alive[row] or state.digests[row] != _digest(job_text(job)):
+                    changed.add(job_id)
+        if not changed:
+            return state
+
+        removed = []
+        upserts = []
+        for job_id in changed:
+            job = jobs.get(job_id)
+            if job is None:
+                removed.append(job_id)
+            else:
+                text = job_text(job)
+                upserts.append((job_id, _digest(text), state.embedder.embed(text)))
+        state = state.updated(removed, upserts)
+
+        # Weights and clusters drift as jobs change, start over once enough of them did
+        if state.changed_rows > max(state.built_rows, 1) * REBUILD_RATIO:
+            return self._build(snapshot.records)
+        if state.changed_rows - self._saved_changes >= SAVE_AFTER_CHANGES:
+            self._save(state)
+        return state
+
+    def _load(self) -> Optional[_IvfState]:
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta["format"] != EMBEDDING_FORMAT_VERSION or meta["dim"] != self.dim:
+                    return None
+                state = _IvfState(
+                    HashedTfidf(self.dim, data["idf"]),
+                    ids=meta["ids"],
+                    digests=data["digests"],
+                    vectors=data["vectors"],
+                    alive=data["alive"],
+                    centroids=data["centroids"],
+                    assignments=data["assignments"],
+                    built_rows=meta["built_rows"],
+                )
+                state.changed_rows = self._saved_changes = meta["changed_rows"]
+                return state
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading job embedding index: {e}")
+            return None
+
+    def _save(self, state: _IvfState):
+        meta = {
+            "format": EMBEDDING_FORMAT_VERSION,
+            "dim": self.dim,
+            "ids": state.ids[:state.size],
+            "built_rows": state.built_rows,
+            "changed_rows": state.changed_rows,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write next to the index and swap it in, so readers never see a partial file
+            temporary = self.path.with_suffix(".tmp.npz")
+            np.savez(
+                temporary,
+                meta=np.array(json.dumps(meta)),
+                idf=state.embedder.idf,
+                digests=state.digests[:state.size],
+                vectors=state.vectors[:state.size],
+                alive=state.alive[:state.size],
+                centroids=state.centroids,
+                assignments=state.assignments[:state.size],
+            )
+            os.replace(temporary, self.path)
+            self._saved_changes = state.changed_rows
+        except Exception as e:
+            # The index is rebuilt from jobs.json when missing, never fail a request because of it
+            print(f"Error saving job embedding index: {e}")
+
+
+semantic_job_index = SemanticJobIndex(
+    data_store,
+    Path(settings.CACHE_DIR) / "job_embeddings.npz",
+    dim=settings.EMBEDDING_DIM,
+    nprobe=settings.EMBEDDING_NPROBE,
+)
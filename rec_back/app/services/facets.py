@@ -0,0 +1,146 @@
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.data_store import MaterializedView
+from app.services.record_views import candidate_status, candidates_view, companies_view, jobs_view, job_status, office_id_for, skill_names
+
+# Facet = (source record, related records) -> the row's value for the facet (values for multi-valued facets)
+Facet = Callable[[Dict[str, Any], Dict[str, Dict[Any, Dict[str, Any]]]], Any]
+
+
+def _value(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _ranked(counts: Counter) -> Dict[str, int]:
+    # Most frequent first, ties in alphabetical order
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+class FacetCounter:
+    """
+    Counts of the rows of a view by facet value, kept up to date incrementally.
+
+    Rows are counted per cell, the combination of their values for the `facets`, so that
+    counts for any filter on those facets are a sum over the cells rather than a scan of
+    the rows. Each cell also counts the values of the `multi_facets` (e.g. the skills of
+    candidates), which can be counted but not filtered on. Only the rows changed since
+    the last read are moved between cells.
+    """
+
+    def __init__(self, view: MaterializedView, facets: Dict[str, Facet], multi_facets: Optional[Dict[str, Facet]] = None):
+        self.view = view
+        self.facets = facets
+        self.multi_facets = multi_facets or {}
+        self._lock = threading.RLock()
+        # Cell -> row count, and multi-valued facet -> cell -> value counts
+        self._cells: Counter = Counter()
+        self._multi: Dict[str, Dict[Tuple[str, ...], Counter]] = {name: {} for name in self.multi_facets}
+        # Source record id -> its cell and the values of its multi-valued facets
+        self._records: Dict[Any, Tuple[Tuple[str, ...], Dict[str, Tuple[str, ...]]]] = {}
+        view.subscribe(self._apply)
+
+    def _apply(self, record_ids: Set[Any], reset: bool):
+        with self._lock:
+            if reset:
+                self._cells = Counter()
+                self._multi = {name: {} for name in self.multi_facets}
+                self._records = {}
+            for record_id in record_ids:
+                self._count(self._records.pop(record_id, None), -1)
+                entry = self.view.entry(record_id)
+                if entry is None:
+                    continue
+                _, record, related = entry
+                counted = (
+                    tuple(_value(facet(record, related)) for facet in self.facets.values()),
+                    {name: tuple(dict.fromkeys(map(_value, facet(record, related) or ()))) for name, facet in self.multi_facets.items()},
+                )
+                self._records[record_id] = counted
+                self._count(counted, 1)
+
+    def _count(self, counted: Optional[Tuple[Tuple[str, ...], Dict[str, Tuple[str, ...]]]], change: int):
+        if counted is None:
+            return
+        cell, multi_values = counted
+        self._cells[cell] += change
+        if not self._cells[cell]:
+            del self._cells[cell]
+        for name, values in multi_values.items():
+            counts = self._multi[name].setdefault(cell, Counter())
+            for value in values:
+                counts[value] += change
+                if not counts[value]:
+                    del counts[value]
+            if not counts:
+                del self._multi[name][cell]
+
+    def counts(self, filters: Optional[Dict[str, Iterable[str]]] = None) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Number of rows matching the filters (facet -> accepted values, any of which matches),
+        and the counts of each facet's values among them, most frequent first. A facet's own
+        filter is left out of its counts, so that the other values stay visible with their
+        counts. Raises ValueError for filters on unknown or multi-valued facets.
+        """
+        accepted: Dict[int, Set[str]] = {}
+        names = list(self.facets)
+        for name, values in (filters or {}).items():
+            values = set(map(_value, values or ()))
+            if not values:
+                continue
+            if name not in self.facets:
+                raise ValueError(f"Cannot filter on {name}, expected one of: {', '.join(names)}")
+            accepted[names.index(name)] = values
+
+        self.view.sync()
+        with self._lock:
+            total = 0
+            single: List[Counter] = [Counter() for _ in names]
+            multi: Dict[str, Counter] = {name: Counter() for name in self.multi_facets}
+            for cell, count in self._cells.items():
+                rejected = [position for position, values in accepted.items() if cell[position] not in values]
+                if len(rejected) > 1:
+                    continue
+                if rejected:
+                    # Only counted for the facet whose own filter rejects it
+                    single[rejected[0]][cell[rejected[0]]] += count
+                    continue
+                total += count
+                for position, value in enumerate(cell):
+                    single[position][value] += count
+                for name, cells in self._multi.items():
+                    multi[name].update(cells.get(cell, {}))
+
+        facets = {name: _ranked(counts) for name, counts in zip(names, single)}
+        facets.update((name, _ranked(counts)) for name, counts in multi.items())
+        return total, facets
+
+
+candidate_facets = FacetCounter(
+    candidates_view,
+    facets={
+        "status": lambda candidate, related: candidate_status(candidate),
+        "officeId": lambda candidate, related: office_id_for(candidate["id"]),
+    },
+    multi_facets={
+        "skills": skill_names,
+    },
+)
+
+job_facets = FacetCounter(
+    jobs_view,
+    facets={
+        "status": lambda job, related: job_status(job),
+        "officeId": lambda job, related: office_id_for(job["id"]),
+        "companyId": lambda job, related: job["employer_id"],
+    },
+)
+
+company_facets = FacetCounter(
+    companies_view,
+    facets={
+        "industry": lambda company, related: company.get("industry"),
+        "officeId": lambda company, related: office_id_for(company["id"]),
+    },
+)
@@ -0,0 +1,141 @@
+import heapq
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.data_store import DataStore, data_store
+
+# Minimum score (percentage of the job's skills matched) for a job to be returned
+MATCH_THRESHOLD = 30
+
+# Candidate skills whose matching vocabulary terms are remembered per index
+TERM_MATCH_CACHE_SIZE = 10000
+
+
+def job_skill_labels(job: Dict[str, Any]) -> List[str]:
+    # Mock skill names based on IDs, as used for matching since the first version
+    return [f"Skill-{skill_id}" for skill_id in job.get("skills", [])]
+
+
+class _SkillIndex:
+    """Normalized job skill vocabulary and skill -> jobs inverted index for one version of jobs.json"""
+
+    def __init__(self, jobs: List[Dict[str, Any]], version: int):
+        self.jobs = jobs
+        self.version = version
+        # Distinct lowercased skill labels, and the positions of the jobs listing each
+        self.terms: List[str] = []
+        term_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        # Number of skills of each job (at least 1, the score denominator)
+        self.skill_counts = np.ones(len(jobs))
+        for position, job in enumerate(jobs):
+            labels = job_skill_labels(job)
+            self.skill_counts[position] = max(len(labels), 1)
+            for label in labels:
+                term = label.lower()
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(self.terms)
+                    self.terms.append(term)
+                    postings.append([])
+                postings[term_id].append(position)
+        self.postings = [np.unique(np.array(positions, dtype=np.int64)) for positions in postings]
+        # Candidate skill (lowercased) -> ids of the vocabulary terms it matches
+        self.term_matches: Dict[str, List[int]] = {}
+
+    def matching_terms(self, skill: str) -> List[int]:
+        """Vocabulary terms a candidate skill matches (either one contains the other)"""
+        matches = self.term_matches.get(skill)
+        if matches is None:
+            matches = [term_id for term_id, term in enumerate(self.terms) if skill in term or term in skill]
+            if len(self.term_matches) >= TERM_MATCH_CACHE_SIZE:
+                self.term_matches.clear()
+            self.term_matches[skill] = matches
+        return matches
+
+
+class MatchingEngine:
+    """
+    Rule-based CV/job matching.
+
+    The job skill vocabulary and inverted index are built once per version of
+    jobs.json. A CV is then scored against every job at once with vector
+    operations, and only the top jobs are ranked.
+    """
+
+    def __init__(self, store: DataStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._index = _SkillIndex([], -1)
+
+    def _current_index(self) -> _SkillIndex:
+        snapshot = self.store.dataset("jobs.json").snapshot()
+        index = self._index
+        if index.version != snapshot.version:
+            with self._lock:
+                index = self._index
+                if index.version != snapshot.version:
+                    index = _SkillIndex(snapshot.records, snapshot.version)
+                    self._index = index
+        return index
+
+    def _score(self, index: _SkillIndex, skills: List[str]):
+        """Score of every job of the index, and for each candidate skill the jobs it hits"""
+        # For each candidate skill, the jobs it hits; and the number of skills hitting each job
+        counts = np.zeros(len(index.jobs), dtype=np.int64)
+        hits: List[Optional[np.ndarray]] = []
+        for skill in skills:
+            term_ids = index.matching_terms(skill.lower())
+            if not term_ids:
+                hits.append(None)
+                continue
+            hit = np.zeros(len(index.jobs), dtype=bool)
+            for term_id in term_ids:
+                hit[index.postings[term_id]] = True
+            counts += hit
+            hits.append(hit)
+
+        return counts / index.skill_counts * 100, hits
+
+    @staticmethod
+    def _rank(positions: np.ndarray, scores: np.ndarray, top_k: Optional[int]) -> List[int]:
+        # Best score first, ties in catalog order
+        if top_k is not None and top_k < len(positions):
+            return heapq.nlargest(top_k, positions.tolist(), key=lambda position: (scores[position], -position))
+        return positions[np.lexsort((positions, -scores[positions]))].tolist()
+
+    def shortlist(self, skills: List[str], size: int) -> List[Dict[str, Any]]:
+        """The `size` jobs scoring best against the candidate skills, whatever their score"""
+        index = self._current_index()
+        if not index.jobs:
+            return []
+        scores, _ = self._score(index, skills)
+        ranked = self._rank(np.arange(len(index.jobs)), scores, size)
+        return [index.jobs[position] for position in ranked]
+
+    def match(self, skills: List[str], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Jobs matching more than MATCH_THRESHOLD percent of their skills, best first"""
+        index = self._current_index()
+        jobs = index.jobs
+        if not jobs:
+            return []
+
+        scores, hits = self._score(index, skills)
+        ranked = self._rank(np.flatnonzero(scores > MATCH_THRESHOLD), scores, top_k)
+
+        matches = []
+        for position in ranked:
+            job = jobs[position]
+            matches.append({
+                "job_id": job["id"],
+                "job_title": job["title"],
+                "employer_id": job["employer_id"],
+                "match_score": float(scores[position]),
+                "matching_skills": [skill for skill, hit in zip(skills, hits) if hit is not None and hit[position]]
+            })
+        return matches
+
+
+matching_engine = MatchingEngine(data_store)
@@ -0,0 +1,215 @@
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.services.data_store import MaterializedView, data_store
+
+# Frontend-shaped views over the fake_data datasets. Rows are built once and
+# only the ones affected by a change are rebuilt when a dataset is reloaded.
+# Rows depend on the records alone (no clock, no per-process hash seed), as their
+# ETag is derived from the records.
+
+# Date served for records without one
+DEFAULT_DATE = datetime(2024, 1, 1)
+
+
+def _parse_datetime(value: Any) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else DEFAULT_DATE
+
+
+def office_id_for(record_id: int) -> str:
+    return str((record_id % 3) + 1)  # Mock office assignment
+
+
+def _office_id(record: Dict[str, Any]) -> str:
+    return office_id_for(record["id"])
+
+
+def candidate_status(candidate: Dict[str, Any]) -> str:
+    """Status of a candidate, "new" unless one was set (fake_data has none)"""
+    return candidate.get("status") or "new"
+
+
+def job_status(job: Dict[str, Any]) -> str:
+    """Status of a job as served, lowercase ("Open" in fake_data is "open")"""
+    return (job.get("status") or "Open").lower()
+
+
+def skill_names(candidate: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> List[str]:
+    """Names of a candidate's skills, leaving out unknown skill ids"""
+    skills = related["skills.json"]
+    return [skills[skill_id]["name"] for skill_id in candidate.get("skill_ids", []) if skill_id in skills]
+
+
+# Format a candidate profile and its user for the frontend schema
+def build_candidate(candidate: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    user = related["users.json"].get(candidate["user_id"])
+    if not user:
+        return None
+
+    skills = related["skills.json"]
+    return {
+        "id": str(candidate["id"]),
+        "firstName": user["first_name"],
+        "lastName": user["last_name"],
+        "email": user["email"],
+        "phone": candidate.get("phone", ""),
+        "position": candidate.get("experience", [{}])[0].get("title", "Unknown Position") if candidate.get("experience") else "Unknown Position",
+        "status": candidate_status(candidate),
+        "cvUrl": candidate.get("cv_urls", [""])[0] if candidate.get("cv_urls") else None,
+        "createdAt": _parse_datetime(user["created_at"]),
+        "updatedAt": _parse_datetime(user["updated_at"]),
+        "tags": [skills[skill_id]["name"] if skill_id in skills else f"Skill-{skill_id}" for skill_id in candidate.get("skill_ids", [])],
+        "rating": len(candidate.get("skill_ids", [])) % 5 + 1,  # Mock rating based on skills
+        "assignedTo": f"user-{(candidate['id'] % 3) + 1}",  # Mock assignment
+        "officeId": _office_id(candidate)
+    }
+
+
+# Format a job and its employer for the frontend schema
+def build_job(job: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    employer = related["employer_profiles.json"].get(job["employer_id"], {})
+    company_name = employer.get("company_name", f"Company {job['employer_id']}")
+    created_at = datetime.strptime(job["posting_date"], "%Y-%m-%d") if isinstance(job.get("posting_date"), str) else DEFAULT_DATE
+
+    return {
+        "id": str(job["id"]),
+        "title": job["title"],
+        "companyId": str(job["employer_id"]),
+        "companyName": company_name,
+        "description": job["description"],
+        "requirements": job.get("requirements", []),
+        "location": job.get("location", "Remote"),
+        "salaryRange": f"{job.get('salary_range', {}).get('min', 0):,} - {job.get('salary_range', {}).get('max', 0):,}" if job.get("salary_range") else None,
+        "status": job_status(job),
+        "createdAt": created_at,
+        # Jobs have no modification time of their own in fake_data
+        "updatedAt": _parse_datetime(job["updated_at"]) if job.get("updated_at") else created_at,
+        "deadline": datetime.strptime(job.get("deadline", "2024-12-31"), "%Y-%m-%d") if job.get("deadline") and isinstance(job.get("deadline"), str) else None,
+        "officeId": _office_id(job),
+        "candidates": job.get("applications_count", len(job.get("applications", [])) if job.get("applications") else job["id"] % 10)  # Mock count
+    }
+
+
+# Format a company profile, its user and its jobs for the frontend schema
+def build_company(company: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    user = related["users.json"].get(company.get("user_id"))
+    if not user:
+        return None
+
+    # Calculate open positions. Compared through job_status(), as the jobs view serves the
+    # status: fake_data jobs say "Open", so the raw status never matched and this was always 0
+    jobs = related["jobs.json"]
+    open_positions = 0
+    for job_id in company.get("job_ids", []):
+        job = jobs.get(job_id)
+        if job and job_status(job) == "open":
+            open_positions += 1
+
+    return {
+        "id": f"comp-{company['id']}",
+        "name": company["company_name"],
+        "industry": company["industry"],
+        "website": company.get("website", ""),
+        "contactPerson": company["contact_details"]["name"],
+        "contactEmail": company["contact_details"]["email"],
+        "contactPhone": company["contact_details"].get("phone", ""),
+        "address": company.get("location", ""),
+        "notes": company.get("description", ""),
+        "createdAt": _parse_datetime(user["created_at"]),
+        "updatedAt": _parse_datetime(user["updated_at"]),
+        "openPositions": open_positions,
+        "officeId": _office_id(company)
+    }
+
+
+# Map backend role to frontend role
+def map_role(role):
+    role_map = {
+        "superadmin": "super_admin",
+        "admin": "admin",
+        "consultant": "employee",
+        "employer": "employee"
+    }
+    return role_map.get(role, "employee")
+
+
+# Format user data for frontend
+def format_user(user, related=None):
+    return {
+        "id": str(user["id"]),
+        "name": f"{user['first_name']} {user['last_name']}",
+        "email": user["email"],
+        "role": map_role(user["role"]),
+        "officeId": _office_id(user),
+        "createdAt": _parse_datetime(user["created_at"]),
+        "updatedAt": _parse_datetime(user["updated_at"]),
+        "lastLogin": datetime.fromisoformat(user["last_login"]) if isinstance(user.get("last_login", ""), str) else None
+    }
+
+
+# Format a skill for the frontend
+def format_skill(skill, related=None):
+    return {
+        "id": str(skill["id"]),
+        "name": skill["name"],
+        # Consistent colors based on name, crc32 rather than hash() which changes between processes
+        "color": f"#{zlib.crc32(skill['name'].encode('utf-8')) % 0xFFFFFF:06x}"
+    }
+
+
+candidates_view = MaterializedView(
+    data_store,
+    "candidate_profiles.json",
+    build_candidate,
+    dependencies={
+        "users.json": lambda candidate: [candidate["user_id"]],
+        "skills.json": lambda candidate: candidate.get("skill_ids", []),
+    },
+    include=lambda candidate, related: candidate["user_id"] in related["users.json"],
+    indexes={
+        "officeId": _office_id,
+        "status": candidate_status,
+    },
+)
+
+jobs_view = MaterializedView(
+    data_store,
+    "jobs.json",
+    build_job,
+    dependencies={
+        "employer_profiles.json": lambda job: [job["employer_id"]],
+    },
+    indexes={
+        "officeId": _office_id,
+        "companyId": lambda job: str(job["employer_id"]),
+        "status": job_status,
+    },
+)
+
+companies_view = MaterializedView(
+    data_store,
+    "company_profiles.json",
+    build_company,
+    dependencies={
+        "users.json": lambda company: [company.get("user_id")],
+        "jobs.json": lambda company: company.get("job_ids", []),
+    },
+    key=lambda company: f"comp-{company['id']}",
+    include=lambda company, related: company.get("user_id") in related["users.json"],
+    indexes={
+        "officeId": _office_id,
+    },
+)
+
+users_view = MaterializedView(
+    data_store,
+    "users.json",
+    format_user,
+    indexes={
+        "officeId": _office_id,
+        "role": lambda user: map_role(user["role"]),
+    },
+)
+
+skills_view = MaterializedView(data_store, "skills.json", format_skill)
@@ -0,0 +1,304 @@
+import bisect
+import html
+import math
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.data_store import MaterializedView
+from app.services.record_views import candidates_view, jobs_view
+
+# Words of the indexed text: letters and digits, keeping the symbols of names like C# or C++
+_WORD = re.compile(r"[^\W_]+[+#]*")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Query words of at least this length also match longer words they start with
+PREFIX_MIN_LENGTH = 2
+# ...up to this many of them, the most frequent first
+PREFIX_MAX_EXPANSIONS = 50
+# Query words of at least this length that match nothing also match words one typo away
+FUZZY_MIN_LENGTH = 4
+
+# Score multipliers of prefix and typo matches, relative to the exact word
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+
+
+def _fold(text: str) -> str:
+    """Lowercase, without accents, so that "Université" matches "universite" """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(_fold(text))
+
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:position] + word[position + 1:] for position in range(len(word))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if one insertion, deletion, substitution or swap of adjacent letters turns a into b"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    prefix = 0
+    while prefix < len(a) and a[prefix] == b[prefix]:
+        prefix += 1
+    if len(a) == len(b):
+        return (
+            a[prefix + 1:] == b[prefix + 1:]
+            or (prefix + 1 < len(a) and a[prefix] == b[prefix + 1] and a[prefix + 1] == b[prefix] and a[prefix + 2:] == b[prefix + 2:])
+        )
+    return a[prefix:] == b[prefix + 1:]
+
+
+class SearchIndex:
+    """
+    In-memory full-text index of the rows of a view, ranked with BM25.
+
+    `document(record, related)` returns the text of each field of a row, and `weights`
+    how much a word found in that field counts. The index follows the view: only the
+    rows changed since the last search are re-indexed. Query words also match words
+    they are a prefix of and, when nothing else matches, words one typo away.
+    """
+
+    def __init__(
+        self,
+        view: MaterializedView,
+        document: Callable[[Dict[str, Any], Dict[str, Dict[Any, Dict[str, Any]]]], Dict[str, str]],
+        weights: Dict[str, float],
+    ):
+        self.view = view
+        self.document = document
+        self.weights = weights
+        self._lock = threading.RLock()
+        # Word -> document number -> weighted frequency
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # Arrays of the postings, built on demand and dropped when the word's postings change
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Sorted words and their document counts, for prefix matching, rebuilt when words come or go
+        self._terms: Optional[List[str]] = None
+        self._term_counts: Optional[np.ndarray] = None
+        # Variant with one letter deleted -> words, to find the words one typo away from a query word
+        self._variants: Dict[str, Set[str]] = {}
+        # Document number -> (row key, field texts, words) and the reverse mapping from source record ids
+        self._documents: Dict[int, Tuple[str, Dict[str, str], Dict[str, float]]] = {}
+        self._numbers: Dict[Any, int] = {}
+        self._free: List[int] = []
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        self._total_length = 0.0
+        view.subscribe(self._apply)
+
+    def _apply(self, record_ids: Set[Any], reset: bool):
+        with self._lock:
+            if reset:
+                self._postings = {}
+                self._arrays = {}
+                self._terms = None
+                self._variants = {}
+                self._documents = {}
+                self._numbers = {}
+                self._free = []
+                self._lengths[:] = 0
+                self._total_length = 0.0
+            for record_id in record_ids:
+                self._remove(record_id)
+                entry = self.view.entry(record_id)
+                if entry is not None:
+                    key, record, related = entry
+                    self._add(record_id, key, self.document(record, related))
+
+    def _add(self, record_id: Any, key: str, fields: Dict[str, str]):
+        words: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = self.weights[field]
+            for word in tokenize(text):
+                words[word] = words.get(word, 0.0) + weight
+
+        number = self._free.pop() if self._free else len(self._numbers)
+        if number >= len(self._lengths):
+            self._lengths = np.concatenate([self._lengths, np.zeros(len(self._lengths), dtype=np.float32)])
+        length = sum(words.values())
+        self._lengths[number] = length
+        self._total_length += length
+        self._numbers[record_id] = number
+        self._documents[number] = (key, fields, words)
+
+        for word, frequency in words.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                self._terms = None
+                if len(word) >= FUZZY_MIN_LENGTH - 1:
+                    for variant in _deletes(word) | {word}:
+                        self._variants.setdefault(variant, set()).add(word)
+            postings[number] = frequency
+            self._arrays.pop(word, None)
+
+    def _remove(self, record_id: Any):
+        number = self._numbers.pop(record_id, None)
+        if number is None:
+            return
+        _, _, words = self._documents.pop(number)
+        for word in words:
+            postings = self._postings[word]
+            del postings[number]
+            self._arrays.pop(word, None)
+            if not postings:
+                del self._postings[word]
+                self._terms = None
+                for variant in _deletes(word) | {word}:
+                    variants = self._variants.get(variant)
+                    if variants is not None:
+                        variants.discard(word)
+                        if not variants:
+                            del self._variants[variant]
+        self._total_length -= float(self._lengths[number])
+        self._lengths[number] = 0
+        self._free.append(number)
+
+    def _postings_arrays(self, word: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(word)
+        if arrays is None:
+            postings = self._postings[word]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._arrays[word] = arrays
+        return arrays
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """Indexed words a query word matches, with the weight of the match"""
+        matches = [(word, 1.0)] if word in self._postings else []
+        if len(word) >= PREFIX_MIN_LENGTH:
+            if self._terms is None:
+                self._terms = sorted(self._postings)
+                self._term_counts = np.fromiter((len(self._postings[term]) for term in self._terms), dtype=np.int64, count=len(self._terms))
+            # Words starting with the query word sort right after it
+            start = bisect.bisect_right(self._terms, word)
+            end = bisect.bisect_left(self._terms, word + "\U0010ffff", start)
+            positions = range(start, end)
+            if end - start > PREFIX_MAX_EXPANSIONS:
+                counts = self._term_counts[start:end]
+                positions = start + np.argpartition(-counts, PREFIX_MAX_EXPANSIONS - 1)[:PREFIX_MAX_EXPANSIONS]
+            matches.extend((self._terms[position], PREFIX_WEIGHT) for position in positions)
+        if not matches and len(word) >= FUZZY_MIN_LENGTH:
+            candidates = set()
+            for variant in _deletes(word) | {word}:
+                candidates |= self._variants.get(variant, set())
+            matches.extend((term, FUZZY_WEIGHT) for term in candidates if _within_one_edit(word, term))
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> Tuple[int, List[Tuple[str, float, Dict[str, str]]]]:
+        """
+        Rows matching every word of the query, best first: the total number of matches, and
+        (row key, score, highlighted fields) of the first `limit` ones
+        """
+        self.view.sync()
+        words = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not words or not self._documents:
+                return 0, []
+
+            count = len(self._documents)
+            average_length = self._total_length / count or 1.0
+            lengths = self._lengths
+            total: Optional[np.ndarray] = None
+            matched_words: Set[str] = set()
+            for word in words:
+                # Best match of the query word in each document
+                scores = np.zeros(len(lengths), dtype=np.float32)
+                for term, weight in self._expand(word):
+                    numbers, frequencies = self._postings_arrays(term)
+                    idf = math.log(1 + (count - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                    norms = K1 * (1 - B + B * lengths[numbers] / average_length)
+                    term_scores = weight * idf * frequencies * (K1 + 1) / (frequencies + norms)
+                    scores[numbers] = np.maximum(scores[numbers], term_scores)
+                    matched_words.add(term)
+                if total is None:
+                    total = scores
+                else:
+                    # Documents missing a word drop out
+                    total = np.where(scores > 0, total + scores, 0)
+
+            hits = np.flatnonzero(total > 0)
+            if len(hits) > limit:
+                best = hits[np.argpartition(-total[hits], limit - 1)[:limit]]
+            else:
+                best = hits
+            best = best[np.argsort(-total[best], kind="stable")]
+
+            results = []
+            for number in best.tolist():
+                key, fields, _ = self._documents[number]
+                results.append((key, round(float(total[number]), 4), self._highlight(fields, matched_words)))
+            return len(hits), results
+
+    @staticmethod
+    def _highlight(fields: Dict[str, str], words: Set[str]) -> Dict[str, str]:
+        """The fields containing matched words, HTML-escaped with the words in <mark> tags"""
+        highlights = {}
+        for field, text in fields.items():
+            parts = []
+            position = 0
+            for match in _WORD.finditer(text):
+                if _fold(match.group(0)) in words:
+                    parts.append(html.escape(text[position:match.start()]))
+                    parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+                    position = match.end()
+            if parts:
+                parts.append(html.escape(text[position:]))
+                highlights[field] = "".join(parts)
+        return highlights
+
+
+# Searchable text of a candidate: name, current position, skills and past job titles
+def candidate_document(candidate: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Dict[str, str]:
+    user = related["users.json"][candidate["user_id"]]
+    skills = related["skills.json"]
+    experience = candidate.get("experience") or []
+    return {
+        "name": f"{user['first_name']} {user['last_name']}",
+        "position": experience[0].get("title") or "" if experience else "",
+        "skills": ", ".join(skills[skill_id]["name"] for skill_id in candidate.get("skill_ids", []) if skill_id in skills),
+        "experience": "; ".join(entry.get("title") or "" for entry in experience[1:]),
+    }
+
+
+# Searchable text of a job: title, company, location, requirements and description
+def job_document(job: Dict[str, Any], related: Dict[str, Dict[Any, Dict[str, Any]]]) -> Dict[str, str]:
+    employer = related["employer_profiles.json"].get(job["employer_id"], {})
+    return {
+        "title": job.get("title") or "",
+        "company": employer.get("company_name") or "",
+        "location": job.get("location") or "",
+        "requirements": "; ".join(job.get("requirements") or []),
+        "description": job.get("description") or "",
+    }
+
+
+candidate_search = SearchIndex(
+    candidates_view,
+    candidate_document,
+    weights={"name": 3.0, "position": 2.0, "skills": 2.0, "experience": 1.0},
+)
+
+job_search = SearchIndex(
+    jobs_view,
+    job_document,
+    weights={"title": 3.0, "company": 1.5, "location": 1.0, "requirements": 1.5, "description": 1.0},
+)
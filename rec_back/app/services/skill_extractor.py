@@ -0,0 +1,117 @@
+import re
+import threading
+from typing import Dict, List
+
+from app.services.data_store import DataStore, data_store
+
+# Skills looked for in every CV, ahead of the skills.json vocabulary
+COMMON_SKILLS = [
+    "Python", "JavaScript", "Java", "C#", "React", "Angular",
+    "Node.js", "SQL", "AWS", "Docker", "Kubernetes", "Digital Marketing",
+    "SEO", "Content Strategy", "Social Media"
+]
+
+# Other ways CVs commonly spell a skill
+SKILL_SYNONYMS: Dict[str, List[str]] = {
+    "JavaScript": ["JS", "ECMAScript"],
+    "Node.js": ["NodeJS", "Node JS"],
+    "React": ["ReactJS", "React.js"],
+    "Angular": ["AngularJS"],
+    "C#": ["C Sharp", "CSharp"],
+    "AWS": ["Amazon Web Services"],
+    "Kubernetes": ["K8s"],
+    "PostgreSQL": ["Postgres"],
+    "SEO": ["Search Engine Optimization", "Search Engine Optimisation"],
+    "Machine Learning": ["ML"],
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Regex alternation of the words, factored as a trie so the engine only follows
+    the branches matching the text (longest alternative first)
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: Dict[str, dict]) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + pattern(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return pattern(trie)
+
+
+class _Vocabulary:
+    """Skill names and aliases of one version of skills.json, compiled into one regex"""
+
+    def __init__(self, skills: List[Dict], version: int):
+        self.version = version
+        # Normalized alias -> canonical skill name, and the rank of each skill in the results
+        self.canonical: Dict[str, str] = {}
+        self.rank: Dict[str, int] = {}
+
+        # skills.json entries may list their own aliases next to the built-in synonyms
+        synonyms = {name: list(aliases) for name, aliases in SKILL_SYNONYMS.items()}
+        for skill in skills:
+            if skill.get("name"):
+                synonyms.setdefault(skill["name"], []).extend(skill.get("aliases", []))
+
+        names = list(COMMON_SKILLS) + [skill["name"] for skill in skills if skill.get("name")]
+        for name in names:
+            if name in self.rank:
+                continue
+            self.rank[name] = len(self.rank)
+            for alias in [name] + synonyms.get(name, []):
+                self.canonical.setdefault(_normalize(alias), name)
+
+        # Whole words only; lookarounds rather than \b so names ending in symbols (C#, C++) match too.
+        # Matched against lowercased text, which is much faster than a case-insensitive regex
+        self.pattern = re.compile(r"(?<!\w)" + _trie_pattern(list(self.canonical)) + r"(?!\w)")
+
+    def find(self, text: str) -> List[str]:
+        found = {self.canonical[_normalize(match.group(0))] for match in self.pattern.finditer(text.lower())}
+        return sorted(found, key=self.rank.__getitem__)
+
+
+class SkillExtractor:
+    """
+    Finds known skills in free text in a single scan. The vocabulary (common skills,
+    skills.json and synonyms) is compiled once per version of skills.json.
+    """
+
+    def __init__(self, store: DataStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._vocabulary = _Vocabulary([], -1)
+
+    def _current_vocabulary(self) -> _Vocabulary:
+        snapshot = self.store.dataset("skills.json").snapshot()
+        vocabulary = self._vocabulary
+        if vocabulary.version != snapshot.version:
+            with self._lock:
+                vocabulary = self._vocabulary
+                if vocabulary.version != snapshot.version:
+                    vocabulary = _Vocabulary(snapshot.records, snapshot.version)
+                    self._vocabulary = vocabulary
+        return vocabulary
+
+    def extract(self, text: str) -> List[str]:
+        """Canonical names of the skills mentioned in the text, common skills first"""
+        return self._current_vocabulary().find(text)
+
+
+skill_extractor = SkillExtractor(data_store)
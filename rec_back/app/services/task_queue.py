@@ -0,0 +1,265 @@
+import asyncio
+import itertools
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Gauge, Metric
+
+# Task states; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Seconds between two sweeps of expired results
+SWEEP_INTERVAL = 60
+
+# Runs a task from its payload, returning its result
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class TaskQueueFull(Exception):
+    pass
+
+
+class Task:
+    """A unit of background work and, once it is done, its result"""
+
+    def __init__(self, kind: str, payload: Dict[str, Any], priority: int):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.status = QUEUED
+        self.attempts = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Set (and replaced) on every status change, for subscribers
+        self.changed = asyncio.Event()
+        self.runner: Optional["asyncio.Task"] = None
+        self.cancel_requested = False
+
+    def _set_status(self, status: str):
+        self.status = status
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        def timestamp(value: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "priority": self.priority,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "createdAt": timestamp(self.created_at),
+            "startedAt": timestamp(self.started_at),
+            "finishedAt": timestamp(self.finished_at),
+        }
+
+
+class TaskQueue:
+    """
+    In-process queue of background tasks, so slow work (LLM calls, CV parsing in the
+    process pool) runs outside of the request that submitted it.
+
+    Tasks are run by a fixed number of asyncio workers, highest priority first, and
+    retried with exponential backoff when their handler fails with an unexpected error,
+    then given the result of the kind's fallback, if any, once the last retry failed too.
+    Finished tasks are kept for `result_ttl` seconds for clients to poll or subscribe to.
+    """
+
+    def __init__(self, workers: int, max_pending: int, max_retries: int, retry_backoff: float, result_ttl: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.result_ttl = result_ttl
+        # kind -> (handler, required payload fields, fallback)
+        self._handlers: Dict[str, Tuple[Handler, Tuple[str, ...], Optional[Handler]]] = {}
+        self._tasks: "OrderedDict[str, Task]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._pending = 0
+        self._runners = []
+
+    def register(self, kind: str, handler: Handler, required: Iterable[str] = (), fallback: Optional[Handler] = None):
+        self._handlers[kind] = (handler, tuple(required), fallback)
+
+    def start(self):
+        """Start the workers, from the running event loop"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._runners = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._runners.append(asyncio.ensure_future(self._sweep()))
+
+    async def stop(self):
+        for runner in self._runners:
+            runner.cancel()
+        await asyncio.gather(*self._runners, return_exceptions=True)
+        self._runners = []
+        self._queue = None
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: int = 0) -> Task:
+        """Queue a task and return it right away. Raises ValueError for invalid submissions."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown task kind {kind}, expected one of: {', '.join(self._handlers)}")
+        missing = [field for field in self._handlers[kind][1] if field not in payload]
+        if missing:
+            raise ValueError(f"Missing payload fields for {kind}: {', '.join(missing)}")
+        if self._queue is None:
+            self.start()
+        if self._pending >= self.max_pending:
+            raise TaskQueueFull(f"Too many pending tasks ({self.max_pending})")
+
+        task = Task(kind, payload, priority)
+        self._tasks[task.id] = task
+        self._pending += 1
+        self._enqueue(task)
+        return task
+
+    def get(self, task_id: str) -> Optional[Task]:
+        task = self._tasks.get(task_id)
+        if task is not None and self._expired(task, time.time()):
+            return None
+        return task
+
+    def cancel(self, task_id: str) -> Optional[Task]:
+        task = self.get(task_id)
+        if task is None or task.status in FINAL_STATES:
+            return task
+        if task.runner is not None:
+            task.cancel_requested = True
+            task.runner.cancel()
+        else:
+            self._finish(task, CANCELLED)
+        return task
+
+    async def wait(self, task: Task, timeout: float) -> Task:
+        """Wait until the task is finished or `timeout` seconds passed"""
+        deadline = time.monotonic() + timeout
+        while task.status not in FINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(task.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return task
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for task in self._tasks.values():
+            counts[task.status] = counts.get(task.status, 0) + 1
+        return {"pending": self._pending, "workers": self.workers, "tasks": counts}
+
+    def metrics(self) -> List[Metric]:
+        """Figures of the queue, for the /metrics endpoint"""
+        stats = self.stats()
+        pending = Gauge("task_queue_pending", "Background tasks queued or running")
+        pending.set(stats["pending"])
+        tasks = Gauge("task_queue_tasks", "Background tasks kept, by status", ("status",))
+        for status, count in stats["tasks"].items():
+            tasks.set(count, status)
+        return [pending, tasks]
+
+    def _enqueue(self, task: Task):
+        # Highest priority first, then first come first served
+        self._queue.put_nowait((-task.priority, next(self._sequence), task))
+
+    async def _work(self):
+        while True:
+            _, _, task = await self._queue.get()
+            if task.status != QUEUED:
+                continue  # Cancelled while waiting
+
+            handler, _, fallback = self._handlers[task.kind]
+            task.attempts += 1
+            task.started_at = task.started_at or time.time()
+            task._set_status(RUNNING)
+            error = await self._attempt(task, handler)
+            if error is None:
+                continue
+            if task.attempts <= self.max_retries:
+                self._retry_later(task, error)
+            elif fallback is not None:
+                # Still failing after the last retry: a degraded result rather than none
+                print(f"Task {task.id} ({task.kind}) failed {task.attempts} times, falling back: {error}")
+                error = await self._attempt(task, fallback)
+                if error is not None:
+                    self._finish(task, FAILED, error=str(error))
+            else:
+                self._finish(task, FAILED, error=str(error))
+
+    async def _attempt(self, task: Task, handler: Handler) -> Optional[Exception]:
+        """Run a handler on the task, finishing it unless the error returned is worth retrying"""
+        task.runner = asyncio.ensure_future(handler(task.payload))
+        try:
+            result = await task.runner
+        except asyncio.CancelledError:
+            if not task.cancel_requested:
+                raise  # The worker itself is being stopped
+            self._finish(task, CANCELLED)
+        except ValueError as e:
+            # Invalid input, retrying would fail the same way
+            self._finish(task, FAILED, error=str(e))
+        except Exception as e:
+            return e
+        else:
+            self._finish(task, SUCCEEDED, result=result)
+        finally:
+            task.runner = None
+        return None
+
+    def _retry_later(self, task: Task, error: Exception):
+        delay = self.retry_backoff * 2 ** (task.attempts - 1) * random.uniform(0.5, 1.5)
+        print(f"Task {task.id} ({task.kind}) failed, retrying in {delay:.1f}s: {error}")
+        task.error = str(error)
+        task._set_status(QUEUED)
+        asyncio.get_running_loop().call_later(delay, self._requeue, task)
+
+    def _requeue(self, task: Task):
+        if self._queue is not None and task.status == QUEUED:
+            self._enqueue(task)
+
+    def _finish(self, task: Task, status: str, result: Any = None, error: Optional[str] = None):
+        task.result = result
+        task.error = error
+        task.finished_at = time.time()
+        self._pending -= 1
+        task._set_status(status)
+
+    def _expired(self, task: Task, now: float) -> bool:
+        return task.finished_at is not None and now - task.finished_at > self.result_ttl
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            now = time.time()
+            for task_id in [task_id for task_id, task in self._tasks.items() if self._expired(task, now)]:
+                del self._tasks[task_id]
+
+
+task_queue = TaskQueue(
+    workers=settings.TASK_WORKERS,
+    max_pending=settings.TASK_MAX_PENDING,
+    max_retries=settings.TASK_MAX_RETRIES,
+    retry_backoff=settings.TASK_RETRY_BACKOFF,
+    result_ttl=settings.TASK_RESULT_TTL,
+)
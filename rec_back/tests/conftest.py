@@ -0,0 +1,40 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The app reads its settings at import time: run it against a throwaway SQLite database,
+# seeded from fake_data on startup, from the backend root like uvicorn
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEST_DIR = tempfile.mkdtemp(prefix="rec_back-tests-")
+ADMIN_TOKEN = "test-admin-token"
+PROFILING_TOKEN = "test-profile-token"
+
+os.chdir(BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DIR}/test.db"
+os.environ["CACHE_DIR"] = f"{TEST_DIR}/cache"
+os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+os.environ["PROFILING_TOKEN"] = PROFILING_TOKEN
+# Searches and the incremental stats run on the in-memory copy of the tables
+os.environ["DB_MIRROR"] = "true"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def admin_headers():
+    return {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@pytest.fixture
+def profile_headers():
+    return {"X-Profile-Token": PROFILING_TOKEN}
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.ai_service import AIService, AIUpstreamError
+
+
+class FakeCompletions:
+    """chat.completions of an AsyncOpenAI client, answering `content` after `delay` seconds"""
+
+    def __init__(self, content, delay=0.05):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    service = AIService()
+    yield service
+    asyncio.run(service.close_async_client())
+
+
+def test_the_async_client_is_created_once_and_shared(service):
+    async def run():
+        service.open_async_client()
+        client = service.async_client
+        service.open_async_client()
+        assert service.async_client is client
+        await service.close_async_client()
+        assert service.async_client is None
+
+    asyncio.run(run())
+
+
+def test_llm_calls_run_concurrently_within_the_cap(service, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_MAX_CONCURRENCY", 2)
+    completions = FakeCompletions('{"subject": "Hello"}')
+
+    async def run():
+        service.open_async_client()
+        await service.async_client.close()
+        service.async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions), close=lambda: asyncio.sleep(0))
+        messages = [{"role": "user", "content": "Hello"}]
+        return await asyncio.gather(*(service._chat_async(messages, 0.5, "generate_email") for _ in range(6)))
+
+    assert asyncio.run(run()) == ['{"subject": "Hello"}'] * 6
+    assert completions.calls == 6
+    assert completions.max_running == 2
+
+
+def _fake_matching(service, monkeypatch, failing_chunks=()):
+    """Answer job match prompts with a score per job, recording the job ids of each prompt"""
+    prompts = []
+    running = []
+    peak = []
+
+    async def chat(messages, temperature, operation):
+        job_ids = [int(line.split(": ")[1]) for line in map(str.strip, messages[1]["content"].splitlines()) if line.startswith("Job ID: ")]
+        prompts.append(job_ids)
+        chunk = len(prompts) - 1
+        running.append(chunk)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(chunk)
+        if chunk in failing_chunks:
+            raise ConnectionError("upstream unavailable")
+        return json.dumps({"matches": [{"job_id": job_id, "match_score": job_id % 97} for job_id in job_ids]})
+
+    monkeypatch.setattr(service, "_chat_async", chat)
+    return prompts, peak
+
+
+def test_job_matching_sends_the_local_shortlist_in_parallel_chunks(service, monkeypatch):
+    from app.services.matching_service import matching_engine
+
+    monkeypatch.setattr(settings, "JOB_MATCH_SHORTLIST_SIZE", 6)
+    monkeypatch.setattr(settings, "JOB_MATCH_CHUNK_SIZE", 2)
+    prompts, peak = _fake_matching(service, monkeypatch)
+    cv_analysis = {"skills": ["Skill-1", "Skill-2"], "education": [], "experience": [], "summary": ""}
+
+    matches = asyncio.run(service.match_jobs_with_openai_async(cv_analysis, top_k=4))
+    shortlist = [job["id"] for job in matching_engine.shortlist(cv_analysis["skills"], 6)]
+    assert sorted(prompts) == sorted(shortlist[start:start + 2] for start in range(0, 6, 2))
+    assert max(peak) == 3
+    scores = [match["match_score"] for match in matches]
+    assert scores == sorted((job_id % 97 for job_id in shortlist), reverse=True)[:4]
+
+
+def test_job_matching_keeps_the_chunks_that_succeeded(service, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MATCH_SHORTLIST_SIZE", 4)
+    monkeypatch.setattr(settings, "JOB_MATCH_CHUNK_SIZE", 2)
+    cv_analysis = {"skills": ["Skill-1"], "education": [], "experience": [], "summary": ""}
+
+    prompts, _ = _fake_matching(service, monkeypatch, failing_chunks={0})
+    matches = asyncio.run(service.match_jobs_with_openai_async(cv_analysis))
+    assert {match["job_id"] for match in matches} == set(prompts[1])
+
+    _fake_matching(service, monkeypatch, failing_chunks={0, 1})
+    with pytest.raises(AIUpstreamError):
+        asyncio.run(service.match_jobs_with_openai_async(cv_analysis, fallback=False))
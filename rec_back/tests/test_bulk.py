@@ -0,0 +1,101 @@
+import json
+
+USERS = [
+    {
+        "id": 1001,
+        "email": "ada.lovelace@example.com",
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "role": "candidate",
+        "is_active": True,
+        "created_at": "2024-02-01T09:00:00",
+        "updated_at": "2024-02-02T09:30:00",
+        "last_login": None,
+    },
+]
+
+SKILLS = [{"id": 1001, "name": "Analytical Engines"}]
+
+CANDIDATES = [
+    {
+        "id": 1001,
+        "user_id": 1001,
+        "phone": "+44 20 0000 0000",
+        "location": "London, UK",
+        "cv_urls": ["https://example.com/ada.pdf"],
+        "profile_completed": True,
+        "preferences": {"contract_types": ["Full-time"], "desired_locations": ["London"]},
+        "notification_settings": {"email": True},
+        "education": [{"degree": "Mathematics"}],
+        "experience": [{"title": "Analyst", "company": "Babbage & Co"}],
+        "status": "new",
+        "skill_ids": [1001],
+    },
+]
+
+
+def _files(**datasets):
+    return [("files", (f"{name}.json", json.dumps(records))) for name, records in datasets.items()]
+
+
+def test_import_export_round_trip(client, admin_headers):
+    response = client.post("/api/v1/admin/import", headers=admin_headers, files=_files(users=USERS, skills=SKILLS, candidate_profiles=CANDIDATES))
+    assert response.status_code == 200
+    report = response.json()["datasets"]
+    assert {filename: stats["rows"] for filename, stats in report.items()} == {
+        "users.json": 1,
+        "skills.json": 1,
+        "candidate_profiles.json": 1,
+    }
+
+    for filename, records in (("users.json", USERS), ("skills.json", SKILLS), ("candidate_profiles.json", CANDIDATES)):
+        exported = client.get(f"/api/v1/admin/export/{filename}", headers=admin_headers).json()
+        assert [record for record in exported if record["id"] == 1001] == records
+
+
+def test_invalid_records_are_skipped_with_a_reason(client, admin_headers):
+    jobs = [
+        {"id": 99},
+        {"title": "No id"},
+        {"id": "100", "title": "Text id"},
+        {"id": 101, "title": "Bad date", "posting_date": "yesterday"},
+        {"id": 102, "title": "Valid"},
+        {"id": 102, "title": "Repeated id"},
+    ]
+    response = client.post("/api/v1/admin/import", headers=admin_headers, files=_files(jobs=jobs))
+    assert response.status_code == 200
+    stats = response.json()["datasets"]["jobs.json"]
+    assert stats["rows"] == 1
+    assert stats["skipped"] == 5
+    assert stats["skippedReasons"] == {
+        "missing title": 1,
+        "missing id": 1,
+        "id is not an integer": 1,
+        "invalid date": 1,
+        "duplicate id": 1,
+    }
+
+
+def test_a_failed_import_reports_what_it_wrote(client, admin_headers):
+    users = [{"id": 1002, "email": "charles.babbage@example.com", "role": "candidate"}]
+    # User 1 already has a candidate profile in fake_data: the batch is rejected, the users before it are kept
+    candidates = [{"id": 1002, "user_id": 1}]
+    response = client.post("/api/v1/admin/import", headers=admin_headers, files=_files(users=users, candidate_profiles=candidates))
+    assert response.status_code == 409
+    report = response.json()["datasets"]
+    assert report["users.json"]["rows"] == 1
+    assert report["candidate_profiles.json"]["rows"] == 0
+    assert "error" in report["candidate_profiles.json"]
+
+    exported = client.get("/api/v1/admin/export/users.json", headers=admin_headers).json()
+    assert 1002 in [user["id"] for user in exported]
+
+
+def test_exports_leave_out_password_hashes(client, admin_headers):
+    users = client.get("/api/v1/admin/export/users.json", headers=admin_headers).json()
+    assert users and all("password_hash" not in user for user in users)
+
+
+def test_admin_endpoints_require_the_token(client):
+    assert client.get("/api/v1/admin/export/users.json").status_code == 403
+    assert client.post("/api/v1/admin/import", headers={"X-Admin-Token": "wrong"}, files=_files(skills=[])).status_code == 403
@@ -0,0 +1,93 @@
+import asyncio
+
+from app.services.cv_cache import AnalysisCache
+
+
+def _cache(tmp_path, **options):
+    return AnalysisCache(tmp_path / "cv_analysis.sqlite3", **{"max_entries": 2, "max_disk_entries": 10, "ttl": 3600, **options})
+
+
+def _computing(calls, delay=0):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"skills": ["Python"], "call": len(calls)}
+
+    return compute
+
+
+def test_keys_depend_on_the_content_model_and_prompt_version():
+    key = AnalysisCache.key("Ada Lovelace\n\nPython,  SQL", "gpt", "1")
+    assert AnalysisCache.key("  Ada Lovelace Python, SQL ", "gpt", "1") == key
+    assert AnalysisCache.key("Ada Lovelace Python, SQL", "other-model", "1") != key
+    assert AnalysisCache.key("Ada Lovelace Python, SQL", "gpt", "2") != key
+    assert AnalysisCache.key("Grace Hopper COBOL", "gpt", "1") != key
+
+
+def test_analyses_are_computed_once_and_kept_on_disk(tmp_path):
+    calls = []
+
+    async def run(cache):
+        first = await cache.get_or_compute("a", _computing(calls))
+        second = await cache.get_or_compute("a", _computing(calls))
+        return first, second
+
+    cache = _cache(tmp_path)
+    first, second = asyncio.run(run(cache))
+    assert first == second == {"skills": ["Python"], "call": 1}
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+    cache.close()
+
+    # A new process finds it on disk
+    cache = _cache(tmp_path)
+    assert asyncio.run(run(cache))[0] == first
+    assert len(calls) == 1
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = _cache(tmp_path, max_disk_entries=3)
+    calls = []
+
+    async def run():
+        for key in ("a", "b", "a", "c"):
+            await cache.get_or_compute(key, _computing(calls))
+        # "b" was the least recently used in memory, it is read back from disk
+        await cache.get_or_compute("b", _computing(calls))
+        assert cache.stats()["disk_hits"] == 1
+        # and the oldest entry on disk makes room for a new one
+        await cache.get_or_compute("d", _computing(calls))
+        assert cache.stats()["memory_entries"] == 2
+        cache._memory.clear()
+        await cache.get_or_compute("a", _computing(calls))
+
+    asyncio.run(run())
+    assert len(calls) == 5
+    cache.close()
+
+
+def test_expired_entries_are_recomputed(tmp_path):
+    cache = _cache(tmp_path, ttl=0.05)
+    calls = []
+
+    async def run():
+        await cache.get_or_compute("a", _computing(calls))
+        await asyncio.sleep(0.1)
+        return await cache.get_or_compute("a", _computing(calls))
+
+    assert asyncio.run(run())["call"] == 2
+    cache.close()
+
+
+def test_concurrent_requests_share_one_computation(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("a", _computing(calls, delay=0.05)) for _ in range(5)))
+
+    assert len({id(result) for result in asyncio.run(run())}) == 1
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+    cache.close()
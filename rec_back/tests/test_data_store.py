@@ -0,0 +1,49 @@
+import json
+import os
+
+from app.services.data_store import DataStore
+
+
+def _write(path, records, mtime):
+    path.write_text(json.dumps(records), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_datasets_are_loaded_once_and_reloaded_when_the_file_changes(tmp_path):
+    store = DataStore(tmp_path)
+    path = tmp_path / "jobs.json"
+    _write(path, [{"id": 1, "title": "Analyst"}, {"id": 2, "title": "Engineer"}], 1_000_000_000)
+
+    dataset = store.dataset("jobs.json")
+    assert store.dataset("jobs.json") is dataset
+    records = store.load("jobs.json")
+    assert [record["title"] for record in records] == ["Analyst", "Engineer"]
+    # Served from memory while the file is unchanged
+    assert store.load("jobs.json") is records
+    version = dataset.version
+
+    _write(path, [{"id": 1, "title": "Analyst"}, {"id": 2, "title": "Senior Engineer"}, {"id": 3, "title": "Designer"}], 2_000_000_000)
+    assert [record["title"] for record in store.load("jobs.json")] == ["Analyst", "Senior Engineer", "Designer"]
+    assert dataset.get_by("id", "3")["title"] == "Designer"
+    assert dataset.version == version + 1
+    assert dataset.changes_since(version) == {2, 3}
+    assert dataset.changes_since(dataset.version) == set()
+
+
+def test_a_half_written_file_keeps_the_previous_records(tmp_path):
+    store = DataStore(tmp_path)
+    path = tmp_path / "users.json"
+    _write(path, [{"id": 1, "email": "ada@example.com"}], 1_000_000_000)
+    records = store.load("users.json")
+
+    path.write_text('[{"id": 1, "email": "ada@exa', encoding="utf-8")
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert store.load("users.json") is records
+
+    # Retried on the next read, since the failed load was not recorded
+    _write(path, [{"id": 1, "email": "ada.lovelace@example.com"}], 3_000_000_000)
+    assert store.dataset("users.json").get_by("email", "ada.lovelace@example.com")["id"] == 1
+
+
+def test_missing_files_are_empty_datasets(tmp_path):
+    assert DataStore(tmp_path).load("skills.json") == []
@@ -0,0 +1,60 @@
+import json
+
+from app.services.email_templates import CompiledTemplate, EmailTemplate, compile_templates, format_inline_value
+
+
+def _reference_render(record, context):
+    """The replace() loops the compiled templates replace"""
+    subject = record["subject"]
+    body = record["template"]
+    for key, value in context.items():
+        subject = subject.replace("{{" + key + "}}", str(value))
+    for key, value in context.items():
+        if isinstance(value, list) and key == "matching_skills":
+            body = body.replace("{{" + key + "}}", "\n".join([f"- {skill}" for skill in value]))
+        else:
+            body = body.replace("{{" + key + "}}", str(value))
+    return {"subject": subject, "body": body}
+
+
+def test_rendering_matches_the_replace_loops():
+    with open("fake_data/email_templates.json", encoding="utf-8") as f:
+        records = json.load(f)
+    templates = compile_templates(records)
+    context = {
+        "candidate_name": "Ada Lovelace",
+        "job_title": "Analyst",
+        "company_name": "Engines Ltd",
+        "consultant_name": "Grace",
+        "matching_skills": ["Python", "SQL"],
+        "cv_analysis": "Strong analytical background",
+        "interview_date": "1 March",
+        "unused": "value",
+    }
+    for record in records:
+        assert templates[record["id"]].render(context) == _reference_render(record, context)
+        # Missing values leave their placeholders in place
+        assert templates[record["id"]].render({}) == {"subject": record["subject"], "body": record["template"]}
+
+
+def test_placeholders_are_extracted_once_in_order():
+    template = CompiledTemplate("Hi {{name}}, {{job}} at {{company}} ({{job}})")
+    assert template.placeholders == ["name", "job", "company"]
+    assert template.render({"job": "Analyst", "name": "Ada"}) == "Hi Ada, Analyst at {{company}} (Analyst)"
+    assert template.render({"job": ["Python", "SQL"]}, format_inline_value) == "Hi {{name}}, ['Python', 'SQL'] at {{company}} (['Python', 'SQL'])"
+    assert CompiledTemplate("no placeholders").render({"name": "Ada"}) == "no placeholders"
+
+
+def test_values_are_not_expanded_again():
+    # A single pass: a value that looks like a placeholder is inserted as is
+    template = EmailTemplate({"id": "t", "subject": "{{a}} {{b}}", "template": "{{matching_skills}}"})
+    assert template.render({"a": "{{b}}", "b": "B", "matching_skills": ["Python", "SQL"]}) == {
+        "subject": "{{b}} B",
+        "body": "- Python\n- SQL",
+    }
+
+
+def test_templates_endpoint_lists_the_placeholders(client):
+    templates = {template["id"]: template for template in client.get("/api/v1/ai-tools/email-templates").json()}
+    assert "candidate_name" in templates["cv_acknowledgment"]["placeholders"]
+    assert templates["cv_acknowledgment"]["subject"] == "Thank you for your application to {{company_name}}"
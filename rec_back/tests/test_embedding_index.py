@@ -0,0 +1,94 @@
+import json
+import os
+import random
+
+from app.services import embedding_index
+from app.services.data_store import DataStore
+from app.services.embedding_index import SemanticJobIndex
+
+WORDS = (
+    "python django kubernetes react typescript accounting payroll nursing welding forklift "
+    "marketing seo copywriting sales negotiation excel tableau spark kafka terraform rust "
+    "photoshop figma illustration carpentry plumbing logistics warehouse teaching chemistry"
+).split()
+
+
+def _jobs(count, seed=3):
+    generator = random.Random(seed)
+    return [
+        {
+            "id": n,
+            "title": f"{generator.choice(WORDS)} {generator.choice(WORDS)} specialist",
+            "employer_id": n % 7,
+            "description": " ".join(generator.sample(WORDS, 6)),
+            "requirements": generator.sample(WORDS, 3),
+        }
+        for n in range(1, count + 1)
+    ]
+
+
+def _write_jobs(path, jobs, mtime):
+    path.write_text(json.dumps(jobs), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def _index(tmp_path, nprobe=4):
+    return SemanticJobIndex(DataStore(tmp_path), tmp_path / "index" / "jobs.npz", dim=1024, nprobe=nprobe)
+
+
+def test_cvs_match_the_jobs_closest_to_them(tmp_path):
+    jobs = _jobs(50)
+    jobs.append({"id": 99, "title": "Welding inspector", "employer_id": 1, "description": "Certified welding inspection", "requirements": ["Welding"]})
+    _write_jobs(tmp_path / "jobs.json", jobs, 1_000_000_000)
+
+    matches = _index(tmp_path).search({"skills": ["Welding", "Inspection"], "summary": "Certified welding inspector"}, top_k=3)
+    assert matches[0]["job_id"] == 99
+    assert matches[0]["matching_skills"] == ["Welding", "Inspection"]
+    assert [match["match_score"] for match in matches] == sorted((match["match_score"] for match in matches), reverse=True)
+    assert _index(tmp_path).search({"skills": ["zzz"]}) == []
+
+
+def test_the_index_is_persisted_and_follows_job_changes(tmp_path, monkeypatch):
+    jobs = _jobs(40)
+    _write_jobs(tmp_path / "jobs.json", jobs, 1_000_000_000)
+    cv = {"skills": ["Astronomy"], "summary": "Telescope astronomy"}
+    index = _index(tmp_path)
+    assert jobs[5]["id"] not in [match["job_id"] for match in index.search(cv, top_k=3)]
+    before = index.refresh()
+
+    jobs[5] = {**jobs[5], "title": "Astronomy technician", "description": "Telescope maintenance"}
+    _write_jobs(tmp_path / "jobs.json", jobs, 2_000_000_000)
+    assert index.search(cv)[0]["job_id"] == jobs[5]["id"]
+    # Updates publish a new state, searches already holding the old one are unaffected
+    assert index.refresh() is not before
+    query = before.embedder.embed("Telescope astronomy")
+    assert jobs[5]["id"] not in [before.ids[row] for row, _ in before.search(query, 3, 1)]
+
+    # A new process loads the index from disk instead of embedding every job again
+    index._save(index.refresh())
+
+    def no_build(jobs):
+        raise AssertionError("rebuilt")
+
+    reloaded = _index(tmp_path)
+    monkeypatch.setattr(reloaded, "_build", no_build)
+    assert reloaded.search(cv)[0]["job_id"] == jobs[5]["id"]
+
+
+def test_clustered_search_finds_the_exact_nearest_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_index, "IVF_MIN_ROWS", 100)
+    jobs = _jobs(400)
+    _write_jobs(tmp_path / "jobs.json", jobs, 1_000_000_000)
+    nprobe = 4
+    index = _index(tmp_path, nprobe=nprobe)
+    state = index.refresh()
+    assert len(state.centroids) == 20
+
+    found = 0
+    for job in jobs[:50]:
+        query = state.embedder.embed(embedding_index.job_text(job))
+        exact = max(range(state.size), key=lambda row: (float(state.vectors[row] @ query), -row))
+        approximate = state.search(query, 1, nprobe)
+        found += approximate[0][0] == exact
+    # Only a few clusters are scanned, yet the nearest job is almost always in them
+    assert found >= 45
@@ -0,0 +1,35 @@
+from sqlalchemy import event
+
+
+def _facets(client):
+    return client.get("/api/v1/stats/facets/candidates").json()
+
+
+def test_facet_counts_follow_writes_without_scanning_the_tables(client):
+    from app.db.session import engine
+
+    before = _facets(client)
+    response = client.post("/api/v1/candidates/", json={
+        "firstName": "Katherine",
+        "email": "katherine.johnson@example.com",
+        "status": "interview",
+        "tags": ["Orbital Mechanics"],
+    })
+    candidate_id = response.json()["id"]
+
+    statements = []
+    listener = lambda connection, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        after = _facets(client)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    assert after["total"] == before["total"] + 1
+    assert after["facets"]["status"]["interview"] == before["facets"]["status"].get("interview", 0) + 1
+    assert after["facets"]["skills"]["Orbital Mechanics"] == 1
+    # Only the records written since the last request are read, the counts are not recomputed
+    assert not any("GROUP BY" in statement or "count(" in statement.lower() for statement in statements)
+    assert all(" IN (" in statement for statement in statements if "FROM candidate_profiles" in statement)
+
+    client.delete(f"/api/v1/candidates/{candidate_id}")
+    assert _facets(client) == before
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+from app.api.v1.listing import decode_cursor, encode_cursor
+from app.services.data_store import DataStore, MaterializedView
+
+
+def _pages(client, path, limit, **params):
+    rows, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        rows.extend(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return rows
+
+
+def test_cursor_pages_cover_every_row_once(client):
+    exported = [json.loads(line) for line in client.get("/api/v1/candidates/export").text.splitlines()]
+    paged = _pages(client, "/api/v1/candidates/", 7)
+    assert [row["id"] for row in paged] == [row["id"] for row in exported]
+    assert paged == exported
+
+    open_jobs = _pages(client, "/api/v1/jobs/", 3, status="open")
+    assert open_jobs and all(row["status"] == "open" for row in open_jobs)
+    assert len({row["id"] for row in open_jobs}) == len(open_jobs)
+
+
+def test_invalid_cursors_are_rejected(client):
+    assert client.get("/api/v1/jobs/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_csv_exports_have_a_header_and_a_line_per_row(client):
+    response = client.get("/api/v1/jobs/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="jobs.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    ndjson = [json.loads(line) for line in client.get("/api/v1/jobs/export").text.splitlines()]
+    assert [row["id"] for row in rows] == [row["id"] for row in ndjson]
+    assert rows[0]["title"] == ndjson[0]["title"]
+
+
+def test_cursors_resume_after_the_last_row_seen(tmp_path):
+    store = DataStore(tmp_path)
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps([{"id": n} for n in range(1, 7)]), encoding="utf-8")
+    view = MaterializedView(store, "jobs.json", lambda job, related: {"id": str(job["id"])})
+
+    rows, last_position = view.page(limit=3)
+    assert [row["id"] for row in rows] == ["1", "2", "3"]
+    cursor = encode_cursor(last_position, rows[-1]["id"])
+
+    # Rows removed before the cursor do not make the next page skip any
+    path.write_text(json.dumps([{"id": n} for n in (2, 3, 4, 5, 6)]) + " ", encoding="utf-8")
+    rows, _ = view.page(limit=3, after=decode_cursor(view, cursor))
+    assert [row["id"] for row in rows] == ["4", "5", "6"]
+
+
+def test_unchanged_lists_and_records_answer_304(client):
+    response = client.get("/api/v1/jobs/", params={"limit": 5})
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/api/v1/jobs/", params={"limit": 5}, headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get("/api/v1/jobs/", params={"limit": 5}, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    job_id = client.get("/api/v1/jobs/", params={"limit": 1}).json()[0]["id"]
+    record_etag = client.get(f"/api/v1/jobs/{job_id}").headers["etag"]
+    assert client.get(f"/api/v1/jobs/{job_id}", headers={"If-None-Match": record_etag}).status_code == 304
+
+
+def test_writes_change_the_etag(client):
+    etag = client.get("/api/v1/candidates/").headers["etag"]
+    candidate_id = client.post("/api/v1/candidates/", json={"firstName": "Mary", "email": "mary.jackson@example.com"}).json()["id"]
+    try:
+        response = client.get("/api/v1/candidates/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    finally:
+        client.delete(f"/api/v1/candidates/{candidate_id}")
+
+
+def test_view_etags_follow_the_content(tmp_path):
+    from app.api.v1.listing import view_etag
+
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps([{"id": 1}]), encoding="utf-8")
+    view = MaterializedView(DataStore(tmp_path), "jobs.json", lambda job, related: {"id": str(job["id"])})
+    etag = view_etag(view)
+    # The same content has the same ETag in every process
+    assert view_etag(MaterializedView(DataStore(tmp_path), "jobs.json", lambda job, related: {"id": str(job["id"])})) == etag
+    path.write_text(json.dumps([{"id": 1}, {"id": 2}]), encoding="utf-8")
+    assert view_etag(view) != etag
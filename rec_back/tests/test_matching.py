@@ -0,0 +1,63 @@
+import json
+import os
+import random
+
+import pytest
+
+from app.services.data_store import DataStore
+from app.services.matching_service import MatchingEngine
+
+
+def _reference_match(jobs, skills):
+    """The job matching loop the engine replaces, one job at a time"""
+    matches = []
+    for job in jobs:
+        job_skills = [f"Skill-{skill_id}" for skill_id in job.get("skills", [])]
+        matching_skills = [skill for skill in skills if any(
+            skill.lower() in js.lower() or js.lower() in skill.lower() for js in job_skills
+        )]
+        match_score = len(matching_skills) / max(len(job_skills), 1) * 100
+        if match_score > 30:
+            matches.append({
+                "job_id": job["id"],
+                "job_title": job["title"],
+                "employer_id": job["employer_id"],
+                "match_score": match_score,
+                "matching_skills": matching_skills,
+            })
+    matches.sort(key=lambda match: match["match_score"], reverse=True)
+    return matches
+
+
+def _write_jobs(path, jobs, mtime):
+    path.write_text(json.dumps(jobs), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    generator = random.Random(7)
+    jobs = [
+        {"id": n, "title": f"Job {n}", "employer_id": n % 5, "skills": generator.sample(range(1, 40), generator.randint(0, 6))}
+        for n in range(1, 301)
+    ]
+    _write_jobs(tmp_path / "jobs.json", jobs, 1_000_000_000)
+    return jobs
+
+
+def test_matches_equal_the_job_by_job_scores(tmp_path, jobs):
+    engine = MatchingEngine(DataStore(tmp_path))
+    for skills in (["Skill-1", "skill-2", "Skill-3"], ["Skill-1"], ["skill-12", "Skill-3", "Python"], ["Python"], []):
+        assert engine.match(skills) == _reference_match(jobs, skills)
+
+    top = engine.match(["Skill-1", "Skill-2", "Skill-3"], top_k=5)
+    assert top == engine.match(["Skill-1", "Skill-2", "Skill-3"])[:5]
+
+
+def test_the_index_follows_the_jobs(tmp_path, jobs):
+    engine = MatchingEngine(DataStore(tmp_path))
+    assert engine.match(["Skill-0"]) == []
+    jobs.append({"id": 999, "title": "Job 999", "employer_id": 1, "skills": [0]})
+    _write_jobs(tmp_path / "jobs.json", jobs, 2_000_000_000)
+    assert [match["job_id"] for match in engine.match(["Skill-0"])] == [999]
+    assert engine.shortlist(["Skill-0"], 3)[0]["id"] == 999
@@ -0,0 +1,42 @@
+import re
+
+from app.core.metrics import Gauge, Registry
+
+
+def _samples(text):
+    """Sample lines of the Prometheus text format, by name and labels"""
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def test_gauges_are_set_to_the_current_value():
+    registry = Registry()
+    gauge = registry.gauge("queue_depth", "Items waiting", ("queue",))
+    gauge.set(5, "emails")
+    gauge.set(2, "emails")
+    gauge.inc("emails")
+    assert _samples(registry.render()) == {'queue_depth{queue="emails"}': "3"}
+    assert "# TYPE queue_depth gauge" in registry.render()
+
+    ratio = Gauge("hit_ratio", "Share of hits")
+    ratio.set(0.25)
+    ratio.set(0.5)
+    assert [value for _, (_, _, value) in ratio.samples()] == [0.5]
+
+
+def test_metrics_count_requests_by_route_template(client):
+    for path in ("/api/v1/jobs/1", "/api/v1/jobs/2", "/api/v1/jobs/999999"):
+        client.get(path)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    samples = _samples(response.text)
+    # Ids are folded into the route, so that the series stay bounded
+    assert int(samples['http_requests_total{method="GET",route="/api/v1/jobs/{job_id}",status="200"}']) >= 2
+    assert int(samples['http_requests_total{method="GET",route="/api/v1/jobs/{job_id}",status="404"}']) >= 1
+    assert not any("/api/v1/jobs/999999" in name for name in samples)
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/jobs/{job_id}",le="+Inf"}' in samples
+
+    # Figures of the task queue and CV cache, read on every scrape
+    assert re.fullmatch(r"\d+", samples["task_queue_pending"])
+    assert 0 <= float(samples["cv_analysis_cache_hit_ratio"]) <= 1
@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.fixture
+def without_mirror(monkeypatch):
+    # The endpoints then read the tables, as in a database-mode deployment without DB_MIRROR
+    monkeypatch.setattr(settings, "DB_MIRROR", False)
+
+
+def _both_modes(client, monkeypatch, request):
+    mirrored = request()
+    monkeypatch.setattr(settings, "DB_MIRROR", False)
+    try:
+        return mirrored, request()
+    finally:
+        monkeypatch.setattr(settings, "DB_MIRROR", True)
+
+
+def test_in_memory_endpoints_need_the_mirror(client, without_mirror):
+    assert client.get("/api/v1/candidates/search", params={"q": "python"}).status_code == 503
+    assert client.get("/api/v1/jobs/search", params={"q": "developer"}).status_code == 503
+    assert client.get("/api/v1/candidates/query", params={"skills": "Python"}).status_code == 503
+    assert client.post("/api/v1/ai-tools/match-jobs/semantic", json={"skills": ["Python"]}).status_code == 503
+    response = client.post("/api/v1/ai-tools/tasks", json={"kind": "match-jobs", "payload": {"cv_analysis": {}}})
+    assert response.status_code == 503
+
+
+def test_exports_read_the_tables_without_the_mirror(client, monkeypatch):
+    response = client.post("/api/v1/candidates/", json={
+        "firstName": "Dorothy",
+        "lastName": "Vaughan",
+        "email": "dorothy.vaughan@example.com",
+        "tags": ["FORTRAN"],
+    })
+    candidate_id = response.json()["id"]
+    try:
+        for path in ("/api/v1/candidates/export", "/api/v1/jobs/export?format=csv", "/api/v1/companies/export", "/api/v1/users/export"):
+            mirrored, tables = _both_modes(client, monkeypatch, lambda: client.get(path).content)
+            assert tables == mirrored
+
+        tables = _both_modes(client, monkeypatch, lambda: client.get("/api/v1/candidates/export").text)[1]
+        rows = [json.loads(line) for line in tables.splitlines()]
+        assert candidate_id in [row["id"] for row in rows]
+    finally:
+        client.delete(f"/api/v1/candidates/{candidate_id}")
+
+
+def test_facet_counts_query_the_tables_without_the_mirror(client, monkeypatch):
+    for path, params in (
+        ("/api/v1/stats/facets/candidates", {"status": ["new", "interview"]}),
+        ("/api/v1/stats/facets/jobs", {"office_id": "1"}),
+        ("/api/v1/stats/facets/companies", {}),
+    ):
+        mirrored, tables = _both_modes(client, monkeypatch, lambda: client.get(path, params=params).json())
+        assert tables == mirrored
+
+
+def test_email_contexts_read_the_tables_without_the_mirror(client, monkeypatch):
+    mirrored, tables = _both_modes(client, monkeypatch, lambda: client.get("/api/v1/ai-tools/candidates/1/email-context").json())
+    assert tables == mirrored and mirrored["candidate_id"] == "1"
+
+    def merge():
+        response = client.post("/api/v1/ai-tools/generate-email/batch", json={
+            "template_id": "interview_invitation",
+            "candidate_ids": ["1", "2", "unknown"],
+            "job_id": 1,
+        })
+        return sorted((json.loads(line) for line in response.text.splitlines()), key=lambda result: result["index"])
+
+    mirrored, tables = _both_modes(client, monkeypatch, merge)
+    assert tables == mirrored
+    assert mirrored[0]["subject"] and mirrored[2]["error"] == "Candidate not found"
+
+
+def test_workers_catch_up_with_other_workers_writes_at_most_every_interval(client, tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from app.db.mirror import DatabaseMirror, log_changes
+    from app.models import Skill
+    from app.services.data_store import DataStore
+
+    async def write(engine, skill_id=None):
+        # As another worker would: the skill is added, or removed, and logged
+        async with AsyncSession(engine) as db:
+            if skill_id is None:
+                skill = Skill(name="Punched Cards")
+                db.add(skill)
+                await db.flush()
+                skill_id = skill.id
+            else:
+                await db.delete(await db.get(Skill, skill_id))
+            log_changes(db, {"skills.json": [skill_id]})
+            await db.commit()
+        return skill_id
+
+    async def run():
+        engine = create_async_engine(settings.DATABASE_URL)
+        worker = DatabaseMirror(DataStore(tmp_path))
+        skills = worker.store.dataset("skills.json")
+        try:
+            monkeypatch.setattr(settings, "DB_MIRROR_SYNC_INTERVAL", 60000)
+            await worker.load(engine)
+            skill_id = await write(engine)
+            await worker.catch_up(engine)
+            assert skill_id not in skills.snapshot().by_id
+
+            # Right away once this worker wrote itself
+            worker.invalidate()
+            await worker.catch_up(engine)
+            assert skills.snapshot().by_id[skill_id]["name"] == "Punched Cards"
+
+            monkeypatch.setattr(settings, "DB_MIRROR_SYNC_INTERVAL", 0)
+            await write(engine, skill_id)
+            await worker.catch_up(engine)
+            assert skill_id not in skills.snapshot().by_id
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_old_changes_are_compacted_but_the_newest(client):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from app.db.mirror import compact_changes
+    from app.models import DataChange
+
+    async def run():
+        engine = create_async_engine(settings.DATABASE_URL)
+        try:
+            long_ago = datetime.now() - timedelta(days=2)
+            async with AsyncSession(engine) as db:
+                db.add_all(DataChange(dataset="skills.json", record_id=1, created_at=long_ago) for _ in range(3))
+                await db.commit()
+                newest = await db.scalar(select(func.max(DataChange.id)))
+
+            assert await compact_changes(engine, retention=86400) >= 2
+            async with AsyncSession(engine) as db:
+                remaining = list(await db.scalars(select(DataChange.id).where(DataChange.created_at < datetime.now() - timedelta(days=1))))
+                assert remaining == [newest]
+                # Recent changes are kept
+                assert await db.scalar(select(func.count(DataChange.id)).where(DataChange.created_at >= datetime.now() - timedelta(days=1)))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+import time
+
+
+def _reports(client, headers):
+    return client.get("/api/v1/admin/profiles", headers=headers).json()["profiles"]
+
+
+def _wait_for_report(client, headers, report_id):
+    # Reports are saved in the background
+    for _ in range(50):
+        if report_id in [report["id"] for report in _reports(client, headers)]:
+            return
+        time.sleep(0.05)
+    raise AssertionError(f"Report {report_id} was not saved")
+
+
+def test_requests_with_the_token_are_profiled(client, profile_headers):
+    response = client.get("/api/v1/candidates/query", params={"skills": "Python"}, headers=profile_headers)
+    report_id = response.headers["X-Profile-Id"]
+    _wait_for_report(client, profile_headers, report_id)
+
+    report = next(report for report in _reports(client, profile_headers) if report["id"] == report_id)
+    assert (report["method"], report["path"], report["status"]) == ("GET", "/api/v1/candidates/query", 200)
+    # Counted once the sampling thread stopped
+    assert report["samples"] >= 0 and report["duration"] > 0
+    stacks = client.get(f"/api/v1/admin/profiles/{report_id}", headers=profile_headers).text
+    # Collapsed stacks: frames separated by semicolons, then the weight
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.splitlines())
+
+    assert "X-Profile-Id" not in client.get("/api/v1/skills/").headers
+    assert "X-Profile-Id" not in client.get("/api/v1/skills/", headers={"X-Profile-Token": "wrong"}).headers
+
+
+def test_reading_the_reports_is_not_profiled(client, profile_headers):
+    report_id = client.get("/api/v1/skills/", headers=profile_headers).headers["X-Profile-Id"]
+    _wait_for_report(client, profile_headers, report_id)
+
+    listing = client.get("/api/v1/admin/profiles", headers=profile_headers)
+    download = client.get(f"/api/v1/admin/profiles/{report_id}", headers=profile_headers)
+    assert "X-Profile-Id" not in listing.headers and "X-Profile-Id" not in download.headers
+    time.sleep(0.2)
+    assert len(_reports(client, profile_headers)) == len(listing.json()["profiles"])
+    assert client.get("/api/v1/admin/profiles").status_code == 403
@@ -0,0 +1,22 @@
+import json
+
+from app.services.column_store import ColumnStore, NumberColumn
+from app.services.data_store import DataStore, MaterializedView
+
+
+def test_pages_sorted_on_tied_values_neither_repeat_nor_skip_rows(tmp_path):
+    # Few distinct salaries, and many missing ones sorted last: most rows tie with others
+    records = [{"id": index, "salary": [None, 30000, 40000, None, 50000][index % 5]} for index in range(1, 3001)]
+    (tmp_path / "people.json").write_text(json.dumps(records))
+    view = MaterializedView(DataStore(tmp_path), "people.json", lambda record, related: {"id": str(record["id"])})
+    store = ColumnStore(view, {"salary": NumberColumn(lambda record, related: record["salary"])})
+
+    for sort in ("salary", "-salary"):
+        total, expected = store.query([], sort, 0, len(records))
+        assert total == len(records)
+        paged = []
+        for skip in range(0, total, 100):
+            paged += store.query([], sort, skip, 100)[1]
+        assert paged == expected
+        # Ties broken by id
+        assert expected[-1200:] == [str(record["id"]) for record in records if record["salary"] is None]
@@ -0,0 +1,34 @@
+def _candidate_ids(client, query):
+    results = client.get("/api/v1/candidates/search", params={"q": query}).json()["results"]
+    return [result["candidate"]["id"] for result in results]
+
+
+def test_created_candidates_become_searchable(client):
+    response = client.post("/api/v1/candidates/", json={
+        "firstName": "Grace",
+        "lastName": "Hopperton",
+        "email": "grace.hopperton@example.com",
+        "tags": ["COBOL"],
+    })
+    assert response.status_code == 200
+    candidate_id = response.json()["id"]
+    assert _candidate_ids(client, "Hopperton") == [candidate_id]
+    assert _candidate_ids(client, "cobol") == [candidate_id]
+
+    client.put(f"/api/v1/candidates/{candidate_id}", json={"lastName": "Brewster"})
+    assert _candidate_ids(client, "Hopperton") == []
+    assert _candidate_ids(client, "Brewster") == [candidate_id]
+
+    client.delete(f"/api/v1/candidates/{candidate_id}")
+    assert _candidate_ids(client, "Brewster") == []
+
+
+def test_created_jobs_become_searchable(client):
+    response = client.post("/api/v1/jobs/", json={"title": "Lighthouse Keeper", "companyId": "1"})
+    assert response.status_code == 200
+    job_id = response.json()["id"]
+    results = client.get("/api/v1/jobs/search", params={"q": "lighthouse"}).json()["results"]
+    assert [result["job"]["id"] for result in results] == [job_id]
+
+    client.delete(f"/api/v1/jobs/{job_id}")
+    assert client.get("/api/v1/jobs/search", params={"q": "lighthouse"}).json()["results"] == []
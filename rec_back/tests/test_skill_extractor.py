@@ -0,0 +1,33 @@
+import json
+
+from app.services.data_store import DataStore
+from app.services.skill_extractor import SkillExtractor
+
+
+def _extractor(tmp_path, skills=()):
+    (tmp_path / "skills.json").write_text(json.dumps(list(skills)), encoding="utf-8")
+    return SkillExtractor(DataStore(tmp_path))
+
+
+def test_whole_words_are_found_in_any_case(tmp_path):
+    extract = _extractor(tmp_path).extract
+    text = "Built APIs in python and javascript on aws; some C# and node.js.\nJavaScript again, no Javas here."
+    assert extract(text) == ["Python", "JavaScript", "C#", "Node.js", "AWS"]
+    # Words containing a skill do not count
+    assert extract("Javanese sequel reacting") == []
+    # Multi-word skills, whatever the spacing or line breaks
+    assert extract("Digital\n  marketing and social media") == ["Digital Marketing", "Social Media"]
+
+
+def test_synonyms_map_to_the_canonical_skill(tmp_path):
+    extract = _extractor(tmp_path).extract
+    assert extract("ReactJS, K8s, Amazon Web Services and Search Engine Optimisation") == ["React", "AWS", "Kubernetes", "SEO"]
+    assert extract("React.js and React") == ["React"]
+
+
+def test_the_vocabulary_includes_skills_json(tmp_path):
+    extractor = _extractor(tmp_path, [{"id": 1, "name": "Terraform"}, {"id": 2, "name": "C++", "aliases": ["CPP"]}])
+    assert extractor.extract("Terraform modules and cpp, also C++ and SQL") == ["SQL", "Terraform", "C++"]
+
+    (tmp_path / "skills.json").write_text(json.dumps([{"id": 1, "name": "Ansible"}]) + "\n", encoding="utf-8")
+    assert extractor.extract("Terraform and Ansible") == ["Ansible"]
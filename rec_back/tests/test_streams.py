@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+from app.core.config import settings
+
+
+def _events(text):
+    """(event, data) pairs of a server-sent events stream"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_batch_analyses_stream_one_json_line_per_cv(client):
+    with open("developer_cv.txt") as f:
+        cv_text = f.read()
+    response = client.post("/api/v1/ai-tools/analyze-cv/batch", json=[{"id": "a", "cv_text": cv_text}, {"id": "b"}])
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda result: result["index"])
+    assert [result["id"] for result in results] == ["a", "b"]
+    assert "React" in results[0]["analysis"]["skills"]
+    assert results[1]["error"] == "cv_text is required"
+
+
+
+def test_batch_analyses_run_concurrently_within_the_cap():
+    from app.api.v1.ai_tools import run_bounded
+
+    running = []
+    peak = []
+    cancelled = []
+
+    async def analyze(index, delay):
+        running.append(index)
+        peak.append(len(running))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        finally:
+            running.remove(index)
+        return {"index": index}
+
+    async def run():
+        # Results come back as they are ready, not in request order
+        results = [result["index"] async for result in run_bounded([0.06, 0.02, 0.04, 0.01], analyze, 2)]
+        # A client leaving early cancels the analyses left
+        stream = run_bounded([0.01, 1, 1], analyze, 2)
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return results, first
+
+    results, first = asyncio.run(run())
+    assert sorted(results) == [0, 1, 2, 3] and results[0] == 1
+    assert max(peak) == 2
+    assert first == {"index": 0}
+    assert sorted(cancelled) == [1, 2]
+
+
+def test_oversized_batches_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "CV_BATCH_MAX_ITEMS", 2)
+    response = client.post("/api/v1/ai-tools/analyze-cv/batch", json=[{"cv_text": "Python"}] * 3)
+    assert response.status_code == 413
+
+def test_mail_merge_streams_server_sent_events(client):
+    response = client.post("/api/v1/ai-tools/generate-email/batch?format=sse", json={
+        "template_id": "cv_acknowledgment",
+        "candidate_ids": ["1", "2"],
+        "context": {"consultant_name": "Ada"},
+    })
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [event for event, _ in events] == ["result", "result", "done"]
+    assert events[-1][1] == {"count": 2}
+    assert all(data["subject"] and data["email"] for _, data in events[:2])
+
+
+
+def test_mail_merge_renders_each_candidate_in_order(client):
+    from app.api.v1.ai_tools import ai_service
+
+    response = client.post("/api/v1/ai-tools/generate-email/batch", json={
+        "template_id": "cv_acknowledgment",
+        "candidate_ids": ["2", "unknown", "1"],
+        "context": {"consultant_name": "Ada"},
+    })
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(result["index"], result["candidate_id"]) for result in results] == [(0, "2"), (1, "unknown"), (2, "1")]
+    assert results[1]["error"] == "Candidate not found"
+    for result in (results[0], results[2]):
+        context = client.get(f"/api/v1/ai-tools/candidates/{result['candidate_id']}/email-context").json()
+        expected = ai_service.generate_email("cv_acknowledgment", {**context, "consultant_name": "Ada"})
+        assert (result["email"], result["subject"], result["body"]) == (context["email"], expected["subject"], expected["body"])
+
+
+def test_mail_merge_rejects_unknown_templates_and_jobs(client, monkeypatch):
+    path = "/api/v1/ai-tools/generate-email/batch"
+    assert client.post(path, json={"template_id": "nope", "candidate_ids": ["1"]}).status_code == 404
+    assert client.post(path, json={"template_id": "cv_acknowledgment", "candidate_ids": ["1"], "job_id": 999999}).status_code == 404
+    monkeypatch.setattr(settings, "EMAIL_BATCH_MAX_ITEMS", 1)
+    assert client.post(path, json={"template_id": "cv_acknowledgment", "candidate_ids": ["1", "2"]}).status_code == 413
+
+def test_task_events_end_with_the_final_status(client):
+    task = client.post("/api/v1/ai-tools/tasks", json={
+        "kind": "generate-email",
+        "payload": {"template_id": "cv_acknowledgment", "context": {"first_name": "Ada"}},
+    }).json()
+    events = _events(client.get(f"/api/v1/ai-tools/tasks/{task['id']}/events").text)
+    assert events[-1] == ("done", {})
+    assert events[-2][0] == "status" and events[-2][1]["status"] == "succeeded"
+    assert events[-2][1]["result"]["subject"]
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+from app.services.task_queue import CANCELLED, FAILED, SUCCEEDED, TaskQueue
+
+
+def _run(queue, kind, payload=None, timeout=5):
+    async def run():
+        queue.start()
+        try:
+            task = queue.submit(kind, payload or {})
+            return await queue.wait(task, timeout)
+        finally:
+            await queue.stop()
+
+    return asyncio.run(run())
+
+
+def _queue(**options):
+    return TaskQueue(**{"workers": 2, "max_pending": 10, "max_retries": 2, "retry_backoff": 0.01, "result_ttl": 60, **options})
+
+
+def _flaky(failures, result="done"):
+    calls = []
+
+    async def handler(payload):
+        calls.append(payload)
+        if len(calls) <= failures:
+            raise ConnectionError("upstream unavailable")
+        return result
+
+    return handler, calls
+
+
+def test_failing_handlers_are_retried_until_they_succeed():
+    queue = _queue()
+    handler, calls = _flaky(failures=2)
+    queue.register("flaky", handler)
+    task = _run(queue, "flaky")
+    assert (task.status, task.result, task.attempts, len(calls)) == (SUCCEEDED, "done", 3, 3)
+
+
+def test_the_fallback_only_runs_after_the_last_retry():
+    queue = _queue()
+    handler, calls = _flaky(failures=10)
+    fallback, fallback_calls = _flaky(failures=0, result="degraded")
+    queue.register("flaky", handler, fallback=fallback)
+    task = _run(queue, "flaky")
+    assert (task.status, task.result, task.attempts) == (SUCCEEDED, "degraded", 3)
+    assert len(calls) == 3 and len(fallback_calls) == 1
+
+    queue = _queue()
+    queue.register("flaky", _flaky(failures=10)[0])
+    task = _run(queue, "flaky")
+    assert (task.status, task.error) == (FAILED, "upstream unavailable")
+
+
+def test_invalid_input_is_not_retried():
+    async def handler(payload):
+        raise ValueError("no such template")
+
+    queue = _queue()
+    queue.register("invalid", handler, fallback=_flaky(failures=0)[0])
+    task = _run(queue, "invalid")
+    assert (task.status, task.error, task.attempts) == (FAILED, "no such template", 1)
+
+
+def test_results_expire_after_their_ttl():
+    async def run():
+        queue = _queue(result_ttl=0.05)
+        queue.register("quick", _flaky(failures=0)[0])
+        queue.start()
+        try:
+            task = await queue.wait(queue.submit("quick", {}), 5)
+            assert queue.get(task.id) is task
+            await asyncio.sleep(0.1)
+            assert queue.get(task.id) is None
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_cancelling_a_running_task():
+    async def slow(payload):
+        await asyncio.sleep(60)
+
+    async def run():
+        queue = _queue()
+        queue.register("slow", slow)
+        queue.start()
+        try:
+            task = queue.submit("slow", {})
+            await asyncio.sleep(0.05)
+            queue.cancel(task.id)
+            return await queue.wait(task, 5)
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(run()).status == CANCELLED
+
+
+def test_llm_errors_in_tasks_are_retried_before_falling_back(client, monkeypatch):
+    from app.api.v1.ai_tools import ai_service
+    from app.services.task_queue import task_queue
+
+    replies = [ConnectionError("upstream unavailable"), json.dumps({"subject": "Hello Ada", "body": "Polished"})]
+
+    async def chat(messages, temperature, operation):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(ai_service, "openai_api_key", "test-key")
+    monkeypatch.setattr(ai_service, "_chat_async", chat)
+    monkeypatch.setattr(task_queue, "retry_backoff", 0.01)
+    response = client.post("/api/v1/ai-tools/tasks", json={
+        "kind": "generate-email",
+        "payload": {"template_id": "interview_invitation", "context": {"first_name": "Ada"}},
+    })
+    assert response.status_code == 202
+    task = client.get(f"/api/v1/ai-tools/tasks/{response.json()['id']}", params={"wait": 5}).json()
+    assert (task["status"], task["attempts"]) == ("succeeded", 2)
+    assert task["result"] == {"subject": "Hello Ada", "body": "Polished"}
@@ -0,0 +1,104 @@
+import asyncio
+import io
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+from app.services.cv_extraction import CVExtractionError, receive_cv_upload
+
+UPLOAD = "/api/v1/ai-tools/analyze-cv/upload"
+
+DOCUMENT = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    "{paragraphs}</w:body></w:document>"
+)
+
+
+def _docx(*paragraphs, padding=""):
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", DOCUMENT.format(paragraphs=body + padding))
+    return buffer.getvalue()
+
+
+def test_text_and_docx_cvs_are_analyzed(client):
+    with open("developer_cv.txt", "rb") as f:
+        response = client.post(UPLOAD, files={"file": ("cv.txt", f, "text/plain")})
+    assert response.status_code == 200
+    assert response.json()["filename"] == "cv.txt"
+    assert "React" in response.json()["analysis"]["skills"]
+
+    docx = _docx("Ada Lovelace", "Skills: Python, SQL")
+    response = client.post(UPLOAD, files={"file": ("cv.docx", docx, "application/octet-stream")})
+    assert response.status_code == 200
+    assert response.json()["text"] == "Ada Lovelace\nSkills: Python, SQL"
+
+
+def test_zip_bombs_are_rejected(client):
+    # A few kilobytes inflating to megabytes of XML
+    bomb = _docx("Ada Lovelace", padding=" " * 5_000_000)
+    assert len(bomb) < 50_000
+    response = client.post(UPLOAD, files={"file": ("cv.docx", bomb, "application/octet-stream")})
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Invalid DOCX file: suspicious compression ratio"
+
+
+def test_unsupported_and_missing_files_are_rejected(client):
+    assert client.post(UPLOAD, files={"file": ("cv.exe", b"MZ", "application/octet-stream")}).status_code == 415
+    assert client.post(UPLOAD, files={"other": ("cv.txt", b"text", "text/plain")}).status_code == 422
+    assert client.post(UPLOAD, content=b"cv", headers={"Content-Type": "text/plain"}).status_code == 400
+
+
+def test_oversized_uploads_stop_early_and_leave_no_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    chunks_read = []
+
+    async def body():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="cv.txt"\r\n\r\n'
+        for _ in range(100):
+            chunks_read.append(1)
+            yield b"x" * 1000
+
+    async def receive():
+        return await receive_cv_upload("multipart/form-data; boundary=b", body(), max_bytes=10_000)
+
+    with pytest.raises(CVExtractionError) as error:
+        asyncio.run(receive())
+    assert error.value.status_code == 413
+    assert len(chunks_read) < 20
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_uploads_are_written_off_the_event_loop(monkeypatch):
+    import threading
+
+    from app.services import cv_extraction
+
+    writers = []
+    write = cv_extraction._CVUpload._write
+
+    def recording_write(upload):
+        writers.append(threading.current_thread())
+        write(upload)
+
+    monkeypatch.setattr(cv_extraction._CVUpload, "_write", recording_write)
+
+    async def body():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="cv.txt"\r\n\r\n'
+        yield b"Ada Lovelace, "
+        yield b"analyst\r\n--b--\r\n"
+
+    async def receive():
+        return await receive_cv_upload("multipart/form-data; boundary=b", body(), max_bytes=10_000)
+
+    filename, cv_format, path = asyncio.run(receive())
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == b"Ada Lovelace, analyst"
+    finally:
+        os.unlink(path)
+    assert (filename, cv_format) == ("cv.txt", "txt")
+    assert writers and threading.main_thread() not in writers
@@ -0,0 +1,144 @@
+import json
+import os
+from itertools import count
+
+import pytest
+
+from app.services.data_store import DataStore, MaterializedView
+
+_mtimes = count(1_000_000_000, 1_000_000_000)
+
+
+def _write(store, filename, records):
+    path = store.data_dir / filename
+    path.write_text(json.dumps(records), encoding="utf-8")
+    mtime = next(_mtimes)
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DataStore(tmp_path)
+    _write(store, "users.json", [{"id": 1, "name": "Ada"}, {"id": 2, "name": "Grace"}, {"id": 3, "name": "Alan"}])
+    _write(store, "profiles.json", [
+        {"id": 10, "user_id": 1, "office": "1", "status": "new"},
+        {"id": 11, "user_id": 2, "office": "2", "status": "hired"},
+        {"id": 12, "user_id": 3, "office": "1", "status": "hired"},
+    ])
+    return store
+
+
+def _view(store, built):
+    def build(profile, related):
+        built.append(profile["id"])
+        return {"id": f"p-{profile['id']}", "name": related["users.json"][profile["user_id"]]["name"], "status": profile["status"]}
+
+    return MaterializedView(
+        store,
+        "profiles.json",
+        build,
+        dependencies={"users.json": lambda profile: [profile["user_id"]]},
+        key=lambda profile: f"p-{profile['id']}",
+        indexes={"officeId": lambda profile: profile["office"], "status": lambda profile: profile["status"]},
+    )
+
+
+def test_rows_are_rebuilt_only_when_their_records_change(store):
+    built = []
+    view = _view(store, built)
+    assert [row["name"] for row in view.rows()] == ["Ada", "Grace", "Alan"]
+    assert sorted(built) == [10, 11, 12]
+
+    built.clear()
+    view.rows()
+    assert built == []
+
+    # A change to a related record rebuilds the rows that read it
+    _write(store, "users.json", [{"id": 1, "name": "Ada"}, {"id": 2, "name": "Grace Hopper"}, {"id": 3, "name": "Alan"}])
+    assert [row["name"] for row in view.rows()] == ["Ada", "Grace Hopper", "Alan"]
+    assert built == [11]
+
+    built.clear()
+    _write(store, "profiles.json", [
+        {"id": 10, "user_id": 1, "office": "1", "status": "interview"},
+        {"id": 12, "user_id": 3, "office": "1", "status": "hired"},
+        {"id": 13, "user_id": 1, "office": "2", "status": "new"},
+    ])
+    assert [(row["id"], row["status"]) for row in view.rows()] == [("p-10", "interview"), ("p-12", "hired"), ("p-13", "new")]
+    assert sorted(built) == [10, 13]
+
+
+def test_listeners_receive_the_changed_ids(store):
+    view = _view(store, [])
+    changes = []
+    view.subscribe(lambda ids, reset: changes.append((ids, reset)))
+    view.sync()
+    assert changes == [({10, 11, 12}, True)]
+
+    _write(store, "users.json", [{"id": 1, "name": "Ada Lovelace"}, {"id": 2, "name": "Grace"}, {"id": 3, "name": "Alan"}])
+    view.sync()
+    assert changes[-1] == ({10}, False)
+
+
+def test_companies_count_their_open_jobs():
+    from app.services.data_store import data_store
+    from app.services.record_views import companies_view, job_status
+
+    jobs = data_store.dataset("jobs.json").snapshot().by_id
+    rows = companies_view.rows()
+    assert rows
+    for row in rows:
+        company = data_store.dataset("company_profiles.json").get_by("id", row["id"][len("comp-"):])
+        expected = sum(1 for job_id in company.get("job_ids", []) if job_id in jobs and job_status(jobs[job_id]) == "open")
+        assert row["openPositions"] == expected
+    # fake_data jobs say "Open": the count must not compare the raw status
+    assert any(row["openPositions"] > 0 for row in rows)
+
+
+def test_single_rows_are_looked_up_without_building_the_others(store):
+    built = []
+    view = _view(store, built)
+    assert view.get("p-11")["name"] == "Grace"
+    assert built == [11]
+    assert view.get("p-99") is None and view.get("11") is None
+    assert store.dataset("users.json").get_by("name", "Alan")["id"] == 3
+
+
+def test_unknown_ids_are_not_found(client):
+    assert client.get("/api/v1/users/999999").status_code == 404
+    for path in ("/api/v1/candidates/999999", "/api/v1/jobs/999999", "/api/v1/companies/comp-999999"):
+        assert client.get(path).status_code == 404
+        assert client.put(path, json={}).status_code == 404
+        assert client.delete(path).status_code == 404
+
+    job = client.get("/api/v1/jobs/", params={"limit": 1}).json()[0]
+    assert client.get(f"/api/v1/jobs/{job['id']}").json() == job
+
+
+def test_queries_filter_on_the_indexes_before_formatting(store):
+    built = []
+    view = _view(store, built)
+    assert [row["id"] for row in view.query({"status": "hired"})] == ["p-11", "p-12"]
+    assert [row["id"] for row in view.query({"status": "hired", "officeId": "1"})] == ["p-12"]
+    assert view.query({"status": "rejected"}) == []
+    # Empty filters are ignored
+    assert len(view.query({"status": None, "officeId": ""})) == 3
+    assert [row["id"] for row in view.query({"officeId": "1"}, skip=1, limit=1)] == ["p-12"]
+    assert sorted(built) == [10, 11, 12]
+
+    # The indexes follow the records
+    _write(store, "profiles.json", [
+        {"id": 10, "user_id": 1, "office": "1", "status": "hired"},
+        {"id": 11, "user_id": 2, "office": "2", "status": "new"},
+        {"id": 12, "user_id": 3, "office": "1", "status": "hired"},
+    ])
+    assert [row["id"] for row in view.query({"status": "hired"})] == ["p-10", "p-12"]
+    assert [row["id"] for row in view.query({"status": "new"})] == ["p-11"]
+
+
+def test_list_filters_match_the_rows(client):
+    rows = [json.loads(line) for line in client.get("/api/v1/jobs/export").text.splitlines()]
+    office_id = rows[0]["officeId"]
+    company_id = rows[0]["companyId"]
+    filtered = client.get("/api/v1/jobs/", params={"office_id": office_id, "company_id": company_id}).json()
+    assert filtered == [row for row in rows if row["officeId"] == office_id and row["companyId"] == company_id][:100]